@@ -3,3 +3,6 @@ from django.apps import AppConfig
 class CompetitorIntelConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'competitor_intel'
+
+    def ready(self):
+        from . import signals  # noqa: F401
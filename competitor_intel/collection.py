@@ -0,0 +1,288 @@
+"""
+Concurrent competitor data collection.
+
+CompetitorAgent gathers three things per location: the competitors nearby
+(places), their recent visit levels (traffic, like Google Maps "Popular
+Times") and their current promotions (deals). Each comes from a source in
+settings.COMPETITOR_SOURCES: an HTTP endpoint returning JSON, or, without a
+URL, the built-in simulation.
+
+Fetching runs on one asyncio event loop:
+- a semaphore bounds the requests in flight (COMPETITOR_COLLECT_CONCURRENCY);
+- every source has its own token bucket (`rate` requests/second, `burst`);
+- timeouts, transport errors, 429 and 5xx responses are retried with
+  exponential backoff and jitter (Retry-After is honoured);
+- requests are coalesced: a place ID listed twice, or asked for by two tasks
+  at once, is fetched once and the result shared.
+
+Lookups go through competitor_intel.tool_cache first, so a location analyzed
+shortly before costs no requests at all.
+
+Results are written afterwards with one bulk upsert per table, so a city with
+dozens of competitors costs a handful of queries. A source that fails for
+one place doesn't fail the location: that place's data is skipped and the
+error reported in CollectionResult.errors.
+
+Endpoint contract (GET, JSON):
+    places   ?location=<name>              -> [{place_id, name, address, cuisine}]
+    traffic  ?place_id=<id>&days=<n>       -> [{date, estimated_visits, traffic_score}]
+    deals    ?place_id=<id>                -> [{title, url}]
+
+Deals are stored as observed on the day they were fetched, which for a
+cached lookup may be before the analysis. Deal impact is not collected:
+competitor_intel.impact derives it from the traffic around each deal.
+"""
+import asyncio
+import functools
+import random
+import time
+from datetime import date, timedelta
+
+import httpx2
+from django.conf import settings
+from django.db import transaction
+
+from core.caching import bump_versions
+from .models import Competitor, CompetitorDeal, CompetitorTraffic
+from .tool_cache import CachedSource
+
+TRAFFIC_DAYS = 14
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class SourceError(Exception):
+    """A source request failed after all retries."""
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average, up to `burst` at once."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class Coalescer:
+    """Runs one coroutine per key; concurrent and repeated calls share its result."""
+
+    def __init__(self):
+        self._tasks = {}
+
+    def run(self, key, factory):
+        if key not in self._tasks:
+            self._tasks[key] = asyncio.ensure_future(factory())
+        return self._tasks[key]
+
+
+class HttpSource:
+    def __init__(self, name, url, client, semaphore, rate=10, burst=None, retries=3, backoff=0.5):
+        self.name = name
+        self.url = url
+        self.client = client
+        self.semaphore = semaphore
+        self.bucket = TokenBucket(rate, burst)
+        self.retries = retries
+        self.backoff = backoff
+
+    async def fetch(self, **params):
+        for attempt in range(self.retries + 1):
+            await self.bucket.acquire()
+            retry_after = None
+            try:
+                async with self.semaphore:
+                    response = await self.client.get(self.url, params=params)
+                if response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    return response.json()
+                error = f'HTTP {response.status_code}'
+                retry_after = response.headers.get('Retry-After')
+            except (httpx2.TransportError, httpx2.HTTPStatusError, ValueError) as e:
+                if isinstance(e, httpx2.HTTPStatusError):
+                    # 4xx other than 429: retrying won't help
+                    raise SourceError(f'{self.name} {params}: HTTP {e.response.status_code}')
+                error = f'{type(e).__name__}: {e}'
+
+            if attempt < self.retries:
+                delay = self.backoff * 2 ** attempt * (1 + random.random())
+                if retry_after and retry_after.isdigit():
+                    delay = max(delay, float(retry_after))
+                await asyncio.sleep(delay)
+        raise SourceError(f'{self.name} {params}: {error} after {self.retries + 1} attempts')
+
+
+class SimulatedSource:
+    """Stand-in data for sources without a URL (the MCP tools are not wired up yet)."""
+
+    DEALS = [
+        "Happy Hour 50% Off Drinks",
+        "Buy One Get One Pizza",
+        "Lunch Special: Salad + Soda for $12",
+        "No active deals",
+    ]
+
+    def __init__(self, name):
+        self.name = name
+
+    async def fetch(self, **params):
+        return getattr(self, self.name)(**params)
+
+    def places(self, location):
+        return [
+            {'name': f'Green Bistro {location}', 'place_id': f'place_{location}_1', 'address': f'123 Teal St, {location}', 'cuisine': 'Healthy'},
+            {'name': f'Urban Eats {location}', 'place_id': f'place_{location}_2', 'address': f'456 Mint Ave, {location}', 'cuisine': 'Fusion'},
+            {'name': f'The Healthy Hub {location}', 'place_id': f'place_{location}_3', 'address': f'789 Sage Rd, {location}', 'cuisine': 'Vegan'},
+        ]
+
+    def traffic(self, place_id, days):
+        return [
+            {
+                'date': (date.today() - timedelta(days=i)).isoformat(),
+                'estimated_visits': random.randint(50, 200),
+                'traffic_score': random.randint(30, 95),
+            }
+            for i in range(days)
+        ]
+
+    def deals(self, place_id):
+        title = random.choice(self.DEALS)
+        if title == "No active deals":
+            return []
+        return [{'title': title, 'url': 'https://example.com/deals'}]
+
+
+class CollectionResult:
+    def __init__(self, location):
+        self.location = location
+        self.places = []
+        self.traffic = {}
+        self.deals = {}
+        self.deals_observed = {}  # place_id -> date the deals were fetched
+        self.errors = []
+
+
+def make_source(name, client, semaphore):
+    config = settings.COMPETITOR_SOURCES[name]
+    if not config.get('url'):
+        return SimulatedSource(name)
+    return HttpSource(
+        name, config['url'], client, semaphore,
+        rate=config.get('rate', 10), burst=config.get('burst'),
+        retries=settings.COMPETITOR_COLLECT_RETRIES, backoff=settings.COMPETITOR_COLLECT_BACKOFF,
+    )
+
+
+def make_sources(client, semaphore):
+    """All sources, behind the lookup cache (competitor_intel.tool_cache)."""
+    return {
+        name: CachedSource(make_source(name, client, semaphore), functools.partial(fetch_uncached, name))
+        for name in settings.COMPETITOR_SOURCES
+    }
+
+
+def fetch_uncached(name, **params):
+    """One request to source `name` on its own event loop; used by background cache refreshes."""
+    async def run():
+        async with httpx2.AsyncClient(timeout=settings.COMPETITOR_COLLECT_TIMEOUT) as client:
+            return await make_source(name, client, asyncio.Semaphore(1)).fetch(**params)
+    return asyncio.run(run())
+
+
+async def collect(location):
+    """Fetches places, then traffic and deals for every unique place concurrently."""
+    result = CollectionResult(location)
+    semaphore = asyncio.Semaphore(settings.COMPETITOR_COLLECT_CONCURRENCY)
+    coalescer = Coalescer()
+    async with httpx2.AsyncClient(timeout=settings.COMPETITOR_COLLECT_TIMEOUT) as client:
+        sources = make_sources(client, semaphore)
+        places = await sources['places'].fetch(location=location)
+
+        # Duplicate place IDs (chains listed twice, overlapping searches) collapse into one
+        unique = {}
+        for place in places:
+            unique.setdefault(place['place_id'], place)
+        result.places = list(unique.values())
+
+        async def gather_place(place_id):
+            traffic, deals = await asyncio.gather(
+                coalescer.run(('traffic', place_id), lambda: sources['traffic'].fetch(place_id=place_id, days=TRAFFIC_DAYS)),
+                coalescer.run(('deals', place_id), lambda: sources['deals'].fetch_entry(place_id=place_id)),
+                return_exceptions=True,
+            )
+            if not isinstance(deals, Exception):
+                result.deals_observed[place_id] = date.fromtimestamp(deals['fetched_at'])
+                deals = deals['value']
+            for name, value, store in (('traffic', traffic, result.traffic), ('deals', deals, result.deals)):
+                if isinstance(value, Exception):
+                    result.errors.append(f'{name} {place_id}: {value}')
+                else:
+                    store[place_id] = value
+
+        await asyncio.gather(*(gather_place(place_id) for place_id in unique))
+    return result
+
+
+def save_collection(result):
+    """Bulk-upserts the collected competitors, traffic and deals; returns the competitors."""
+    today = date.today()
+    with transaction.atomic():
+        Competitor.objects.bulk_create(
+            [
+                Competitor(
+                    google_place_id=p['place_id'], name=p['name'], location_name=result.location,
+                    address=p.get('address'), cuisine_type=p.get('cuisine'),
+                )
+                for p in result.places
+            ],
+            update_conflicts=True,
+            unique_fields=['google_place_id'],
+            update_fields=['name', 'location_name', 'address', 'cuisine_type'],
+        )
+        competitors = Competitor.objects.in_bulk([p['place_id'] for p in result.places], field_name='google_place_id')
+
+        CompetitorTraffic.objects.bulk_create(
+            [
+                CompetitorTraffic(
+                    competitor=competitors[place_id], date=date.fromisoformat(row['date']),
+                    estimated_visits=row['estimated_visits'], traffic_score=row['traffic_score'],
+                )
+                for place_id, rows in result.traffic.items()
+                for row in rows
+            ],
+            update_conflicts=True,
+            unique_fields=['competitor', 'date'],
+            update_fields=['estimated_visits', 'traffic_score'],
+        )
+        # A deal seen twice on one day keeps its last reading
+        deals = {
+            (place_id, result.deals_observed.get(place_id, today), d['title']): d
+            for place_id, rows in result.deals.items()
+            for d in rows
+        }
+        CompetitorDeal.objects.bulk_create(
+            [
+                CompetitorDeal(
+                    competitor=competitors[place_id], date_observed=observed, deal_title=title,
+                    deal_source_url=d.get('url'),
+                )
+                for (place_id, observed, title), d in deals.items()
+            ],
+            update_conflicts=True,
+            unique_fields=['competitor', 'date_observed', 'deal_title'],
+            update_fields=['deal_source_url'],
+        )
+        bump_versions(Competitor, CompetitorTraffic, CompetitorDeal)
+    return [competitors[p['place_id']] for p in result.places]
@@ -0,0 +1,178 @@
+"""
+Deal impact: an event study of every competitor deal.
+
+For a deal observed on day d, the pre window is the COMPETITOR_IMPACT_WINDOW_DAYS
+days before d and the post window the same number of days from d on. Per deal:
+- impact_on_traffic: relative change of the competitor's mean estimated
+  visits, post vs pre;
+- impact_on_own_sales: relative change of our mean daily quantity (from the
+  daily sales rollup) over the same windows;
+- sales_correlation: Pearson correlation of their visits and our sales across
+  both windows; negative when their gains were our losses.
+A window with fewer than COMPETITOR_IMPACT_MIN_DAYS readings leaves the
+value None.
+
+All deals are computed at once: traffic is pivoted into one dense
+date x competitor matrix (NaN where there is no reading), our sales into a
+date vector, and every window sum is the difference of two rows of a
+cumulative sum, picked for all deals with one fancy-indexing step. Two
+queries load the data however many deals there are.
+
+refresh_impacts recomputes only the deals whose windows overlap newly
+collected traffic or newly imported sales, plus deals never computed.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from core.caching import bump_versions
+from sales.models import DailySalesRollup
+from .models import CompetitorDeal, CompetitorTraffic
+
+IMPACT_FIELDS = ['impact_on_traffic', 'impact_on_own_sales', 'sales_correlation', 'impact_updated_at']
+
+
+def load_matrices(start, end, competitor_ids):
+    """
+    (traffic, own): a (days x competitors) matrix of estimated visits and a
+    vector of our daily quantity for [start, end]. Missing readings are NaN;
+    our sales are 0 on days without sales within the rollup's range.
+    """
+    import numpy as np
+
+    n_days = (end - start).days + 1
+    column = {cid: i for i, cid in enumerate(competitor_ids)}
+    traffic = np.full((n_days, len(competitor_ids)), np.nan)
+    rows = CompetitorTraffic.objects.filter(
+        competitor_id__in=competitor_ids, date__range=(start, end),
+    ).values_list('date', 'competitor_id', 'estimated_visits')
+    if rows:
+        dates, cids, visits = zip(*rows)
+        traffic[[(d - start).days for d in dates], [column[c] for c in cids]] = visits
+
+    own = np.full(n_days, np.nan)
+    sales = list(
+        DailySalesRollup.objects.filter(date__range=(start, end))
+        .values('date').annotate(total_qty=Sum('quantity')).values_list('date', 'total_qty')
+    )
+    if sales:
+        days = np.array([(d - start).days for d, _ in sales])
+        own[days.min():days.max() + 1] = 0
+        own[days] = [q for _, q in sales]
+    return traffic, own
+
+
+def window_sums(values, rows, cols, window):
+    """
+    Sums and counts of the finite values in the `window` rows before and from
+    each (row, col): ((pre_sum, pre_count), (post_sum, post_count)).
+    """
+    import numpy as np
+
+    finite = np.isfinite(values)
+    pad = np.zeros((1, values.shape[1]))
+    csum = np.concatenate([pad, np.cumsum(np.where(finite, values, 0), axis=0)])
+    ccount = np.concatenate([pad, np.cumsum(finite, axis=0)])
+    pre = (csum[rows, cols] - csum[rows - window, cols], ccount[rows, cols] - ccount[rows - window, cols])
+    post = (csum[rows + window, cols] - csum[rows, cols], ccount[rows + window, cols] - ccount[rows, cols])
+    return pre, post
+
+
+def relative_change(pre, post, min_days):
+    import numpy as np
+
+    (pre_sum, pre_n), (post_sum, post_n) = pre, post
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pre_mean, post_mean = pre_sum / pre_n, post_sum / post_n
+        change = (post_mean - pre_mean) / pre_mean
+    return np.where((pre_n >= min_days) & (post_n >= min_days) & (pre_mean > 0), change, np.nan)
+
+
+def event_study(traffic, own, rows, cols, window, min_days):
+    """
+    Impact columns for deals at (date row, competitor column) pairs, as
+    arrays aligned with `rows`. Needs `window` days of matrix on both sides.
+    """
+    import numpy as np
+
+    traffic_impact = relative_change(*window_sums(traffic, rows, cols, window), min_days)
+    own_impact = relative_change(*window_sums(own[:, None], rows, np.zeros_like(cols), window), min_days)
+
+    # Correlation over the 2 * window days, on the days both series have a value
+    x, y = traffic, np.broadcast_to(own[:, None], traffic.shape)
+    both = np.isfinite(x) & np.isfinite(y)
+    x, y = np.where(both, x, np.nan), np.where(both, y, np.nan)
+    sums = {}
+    for name, values in (('x', x), ('y', y), ('xx', x * x), ('yy', y * y), ('xy', x * y)):
+        (pre_sum, pre_n), (post_sum, post_n) = window_sums(values, rows, cols, window)
+        sums[name] = pre_sum + post_sum
+    # The same for every product: NaN wherever either series is
+    n = pre_n + post_n
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = sums['xy'] - sums['x'] * sums['y'] / n
+        var_x = sums['xx'] - sums['x'] ** 2 / n
+        var_y = sums['yy'] - sums['y'] ** 2 / n
+        corr = cov / np.sqrt(var_x * var_y)
+    valid = (n >= 2 * min_days) & (var_x > 1e-9) & (var_y > 1e-9)
+    correlation = np.where(valid, np.clip(corr, -1, 1), np.nan)
+    return traffic_impact, own_impact, correlation
+
+
+def stale_deals(competitor_ids=None, first_day=None, last_day=None):
+    """
+    Deals never computed, plus those whose windows overlap [first_day,
+    last_day] (for `competitor_ids` only, when given).
+    """
+    window = settings.COMPETITOR_IMPACT_WINDOW_DAYS
+    stale = Q(impact_updated_at__isnull=True)
+    if first_day is not None:
+        changed = Q(
+            date_observed__gt=first_day - timedelta(days=window),
+            date_observed__lte=(last_day or first_day) + timedelta(days=window),
+        )
+        if competitor_ids is not None:
+            changed &= Q(competitor_id__in=competitor_ids)
+        stale |= changed
+    return CompetitorDeal.objects.filter(stale)
+
+
+def refresh_impacts(competitor_ids=None, first_day=None, last_day=None, force=False):
+    """
+    Recomputes the impact of stale deals (all deals with `force`) and saves
+    them with one bulk update. Returns the number of deals computed.
+    """
+    import numpy as np
+
+    window = settings.COMPETITOR_IMPACT_WINDOW_DAYS
+    min_days = settings.COMPETITOR_IMPACT_MIN_DAYS
+    deals = CompetitorDeal.objects.all() if force else stale_deals(competitor_ids, first_day, last_day)
+    deals = list(deals.only('id', 'competitor_id', 'date_observed'))
+    if not deals:
+        return 0
+
+    # 1. One matrix spanning every deal's windows
+    start = min(d.date_observed for d in deals) - timedelta(days=window)
+    end = max(d.date_observed for d in deals) + timedelta(days=window - 1)
+    competitor_ids = sorted({d.competitor_id for d in deals})
+    traffic, own = load_matrices(start, end, competitor_ids)
+
+    # 2. All deals in one pass
+    column = {cid: i for i, cid in enumerate(competitor_ids)}
+    rows = np.array([(d.date_observed - start).days for d in deals])
+    cols = np.array([column[d.competitor_id] for d in deals])
+    results = event_study(traffic, own, rows, cols, window, min_days)
+
+    # 3. Save
+    now = timezone.now()
+    for i, deal in enumerate(deals):
+        deal.impact_on_traffic, deal.impact_on_own_sales, deal.sales_correlation = (
+            None if np.isnan(values[i]) else float(values[i]) for values in results
+        )
+        deal.impact_updated_at = now
+    with transaction.atomic():
+        CompetitorDeal.objects.bulk_update(deals, IMPACT_FIELDS, batch_size=500)
+        bump_versions(CompetitorDeal)
+    return len(deals)
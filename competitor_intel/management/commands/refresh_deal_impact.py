@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+from competitor_intel.impact import refresh_impacts
+
+
+class Command(BaseCommand):
+    help = 'Compute the event-study impact of competitor deals not computed yet (all deals with --all)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Recompute every deal')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        computed = refresh_impacts(force=options['all'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Computed impact of {computed} deals in {time.perf_counter() - start:.1f}s'
+        ))
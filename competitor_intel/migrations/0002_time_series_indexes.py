@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:49
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def drop_duplicates(apps, schema_editor):
+    # Keep the newest row of each key so the unique constraints can be added
+    for model_name, fields in [
+        ('CompetitorTraffic', ('competitor', 'date')),
+        ('CompetitorDeal', ('competitor', 'date_observed', 'deal_title')),
+    ]:
+        model = apps.get_model('competitor_intel', model_name)
+        keep = model.objects.values(*fields).annotate(keep_id=Max('id')).values_list('keep_id', flat=True)
+        model.objects.exclude(id__in=list(keep)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competitor_intel', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicates, reverse_code=migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='competitortraffic',
+            name='date',
+            field=models.DateField(db_index=True),
+        ),
+        migrations.AddConstraint(
+            model_name='competitordeal',
+            constraint=models.UniqueConstraint(fields=('competitor', 'date_observed', 'deal_title'), name='unique_competitor_deal'),
+        ),
+        migrations.AddConstraint(
+            model_name='competitortraffic',
+            constraint=models.UniqueConstraint(fields=('competitor', 'date'), name='unique_competitor_traffic_day'),
+        ),
+    ]
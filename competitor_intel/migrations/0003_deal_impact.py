@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competitor_intel', '0002_time_series_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='competitordeal',
+            name='impact_on_own_sales',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='competitordeal',
+            name='impact_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='competitordeal',
+            name='sales_correlation',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
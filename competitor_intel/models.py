@@ -12,10 +12,16 @@ class Competitor(models.Model):
 
 class CompetitorTraffic(models.Model):
     competitor = models.ForeignKey(Competitor, on_delete=models.CASCADE, related_name='traffic_logs')
-    date = models.DateField()
+    date = models.DateField(db_index=True)
     estimated_visits = models.IntegerField() # Derived from Google Maps "Popular Times"
     traffic_score = models.IntegerField() # Normalized 0-100
 
+    class Meta:
+        constraints = [
+            # One reading per competitor per day; CompetitorAgent upserts on this key
+            models.UniqueConstraint(fields=['competitor', 'date'], name='unique_competitor_traffic_day'),
+        ]
+
     def __str__(self):
         return f"{self.competitor.name} - {self.date}"
 
@@ -24,7 +30,17 @@ class CompetitorDeal(models.Model):
     date_observed = models.DateField()
     deal_title = models.CharField(max_length=300)
     deal_source_url = models.URLField(max_length=500, null=True, blank=True)
-    impact_on_traffic = models.FloatField(null=True, blank=True) # Calculated correlation
+    # Event study around date_observed (competitor_intel.impact); None until
+    # both windows have enough readings
+    impact_on_traffic = models.FloatField(null=True, blank=True) # Relative change in the competitor's visits
+    impact_on_own_sales = models.FloatField(null=True, blank=True) # Relative change in our sales
+    sales_correlation = models.FloatField(null=True, blank=True) # Their visits vs our sales across both windows
+    impact_updated_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['competitor', 'date_observed', 'deal_title'], name='unique_competitor_deal'),
+        ]
 
     def __str__(self):
         return f"{self.competitor.name} - {self.deal_title}"
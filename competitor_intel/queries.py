@@ -0,0 +1,48 @@
+"""Aggregate queries behind the competitor dashboard."""
+from itertools import groupby
+
+from django.db.models import Sum
+
+from core.queries import window_start
+from sales.models import DailySalesRollup
+from .models import CompetitorDeal, CompetitorTraffic
+
+
+def own_sales_by_day(start):
+    """[(date, total quantity)] from the daily rollup, from `start` on."""
+    return list(
+        DailySalesRollup.objects.filter(date__gte=start)
+        .values('date').annotate(total_qty=Sum('quantity'))
+        .order_by('date').values_list('date', 'total_qty')
+    )
+
+
+def traffic_by_competitor(start):
+    """
+    {competitor id: (name, [dates], [traffic scores])} for every competitor
+    with readings from `start` on, in one query regardless of competitor count.
+    Keyed by id since names are not unique; the name is only the label.
+    """
+    rows = (
+        CompetitorTraffic.objects.filter(date__gte=start)
+        .order_by('competitor__name', 'competitor_id', 'date')
+        .values_list('competitor_id', 'competitor__name', 'date', 'traffic_score')
+    )
+    pivot = {}
+    for (competitor_id, name), readings in groupby(rows, key=lambda r: (r[0], r[1])):
+        readings = list(readings)
+        pivot[competitor_id] = (name, [r[2] for r in readings], [r[3] for r in readings])
+    return pivot
+
+
+def deals_in_window(start):
+    """Deals observed from `start` on, with competitor names (one joined query)."""
+    deals = CompetitorDeal.objects.select_related('competitor').order_by('-date_observed')
+    if start is not None:
+        deals = deals.filter(date_observed__gte=start)
+    return list(deals)
+
+
+def dashboard_window(days=None):
+    """Window start anchored on the latest own sales day."""
+    return window_start(DailySalesRollup.objects.all(), 'date', days)
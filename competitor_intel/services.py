@@ -1,83 +1,87 @@
+import asyncio
+import logging
 import os
-from openai import OpenAI
-from .models import Competitor, CompetitorTraffic, CompetitorDeal
-from datetime import date, timedelta
-import random
+from datetime import date
+from functools import cached_property
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
 
 class CompetitorAgent:
     def __init__(self):
         self.api_key = os.getenv("OPENAI_API_KEY")
-        # Initialize client only if key is available, else we will use mock data
-        self.client = OpenAI(api_key=self.api_key) if self.api_key else None
+        self.last_result = None
+
+    @cached_property
+    def client(self):
+        # Built on first use only: openai takes most of a second to import and
+        # most agents (cached summaries, no key) never call it
+        if not self.api_key:
+            return None
+        from openai import OpenAI
+        return OpenAI(api_key=self.api_key)
 
     def analyze_location(self, location_name):
         """
         Main workflow for competitor analysis using simulated MCP tools.
+        Sources are fetched concurrently through the lookup cache, then
+        written with bulk upserts; see competitor_intel.collection. Returns
+        the location's competitors.
         """
-        # 1. Search for competitors (Simulating mcp-google-map)
-        competitors_data = self._get_competitors(location_name)
-        
-        results = []
-        for comp_data in competitors_data:
-            # Save or update competitor
-            competitor, created = Competitor.objects.update_or_create(
-                google_place_id=comp_data['place_id'],
-                defaults={
-                    'name': comp_data['name'],
-                    'location_name': location_name,
-                    'address': comp_data['address'],
-                    'cuisine_type': comp_data['cuisine']
-                }
-            )
-            
-            # 2. Get traffic data (Simulating Google Map Popular Times)
-            self._fetch_traffic_data(competitor)
-            
-            # 3. Get deals (Simulating Firecrawl/Browser scraping)
-            self._fetch_deals(competitor)
-            
-            results.append(competitor)
-            
-        return results
+        from .collection import collect, save_collection
+
+        # 1-3. Search for competitors, then their traffic (Google Map Popular Times)
+        # and deals (Firecrawl/Browser scraping), all on one event loop
+        self.last_result = asyncio.run(collect(location_name))
+
+        # 4. Save everything in one transaction
+        competitors = save_collection(self.last_result)
+
+        # 5. Event study of the deals whose windows the new traffic touches
+        from .impact import refresh_impacts
+        days = [date.fromisoformat(row['date']) for rows in self.last_result.traffic.values() for row in rows]
+        refresh_impacts([c.id for c in competitors], min(days, default=None), max(days, default=None))
+        return competitors
+
+    def summarize(self, location_name):
+        """
+        Short LLM summary of the last analysis, or None without an API key or
+        when the API call fails. Cached per location and deal set
+        (competitor_intel.tool_cache); failures are not cached.
+        """
+        from . import tool_cache
 
-    def _get_competitors(self, location):
-        # In a real MCP setup, this would be a tool call to google-maps todo
-        # Simulation:
-        return [
-            {'name': f'Green Bistro {location}', 'place_id': f'place_{location}_1', 'address': f'123 Teal St, {location}', 'cuisine': 'Healthy'},
-            {'name': f'Urban Eats {location}', 'place_id': f'place_{location}_2', 'address': f'456 Mint Ave, {location}', 'cuisine': 'Fusion'},
-            {'name': f'The Healthy Hub {location}', 'place_id': f'place_{location}_3', 'address': f'789 Sage Rd, {location}', 'cuisine': 'Vegan'}
-        ]
+        if not self.api_key or self.last_result is None:
+            return None
+        deals = sorted(
+            f"{place['name']}: {deal['title']}"
+            for place in self.last_result.places
+            for deal in self.last_result.deals.get(place['place_id'], [])
+        )
+        prompt = (
+            f"Competitors near {location_name}: {', '.join(p['name'] for p in self.last_result.places)}.\n"
+            "Current deals:\n" + "\n".join(deals or ["none"]) + "\n"
+            "In two sentences, what should a restaurant in this area watch out for?"
+        )
 
-    def _fetch_traffic_data(self, competitor):
-        # Simulate fetching last 14 days of traffic
-        for i in range(14):
-            d = date.today() - timedelta(days=i)
-            CompetitorTraffic.objects.update_or_create(
-                competitor=competitor,
-                date=d,
-                defaults={
-                    'estimated_visits': random.randint(50, 200),
-                    'traffic_score': random.randint(30, 95)
-                }
+        def complete():
+            response = self.client.chat.completions.create(
+                model=settings.COMPETITOR_SUMMARY_MODEL,
+                messages=[{"role": "user", "content": prompt}],
             )
+            return response.choices[0].message.content
 
-    def _fetch_deals(self, competitor):
-        # Simulate finding a deal with Firecrawl
-        deals = [
-            "Happy Hour 50% Off Drinks",
-            "Buy One Get One Pizza",
-            "Lunch Special: Salad + Soda for $12",
-            "No active deals"
-        ]
-        deal_title = random.choice(deals)
-        if deal_title != "No active deals":
-            CompetitorDeal.objects.update_or_create(
-                competitor=competitor,
-                date_observed=date.today(),
-                deal_title=deal_title,
-                defaults={
-                    'deal_source_url': 'https://example.com/deals',
-                    'impact_on_traffic': random.uniform(0.05, 0.25)
-                }
+        try:
+            return tool_cache.cached_call(
+                'summary', {'location': location_name, 'model': settings.COMPETITOR_SUMMARY_MODEL, 'prompt': prompt},
+                complete,
             )
+        except Exception as e:
+            # Imported by the failed call already; the analysis is saved either way
+            from openai import OpenAIError
+            if not isinstance(e, OpenAIError):
+                raise
+            logger.warning('Summary of %s failed: %s', location_name, e)
+            return None
@@ -0,0 +1,11 @@
+from django.dispatch import receiver
+
+from sales.signals import sales_imported
+
+
+@receiver(sales_imported)
+def refresh_deal_impact_after_import(sender, first_day, last_day, **kwargs):
+    # Our sales are one side of each deal's event study; only deals whose
+    # windows overlap the imported days change. numpy is imported on use.
+    from .impact import refresh_impacts
+    refresh_impacts(first_day=first_day, last_day=last_day)
@@ -0,0 +1,365 @@
+import json
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from sales.models import DailySalesRollup
+from . import tool_cache
+from .impact import refresh_impacts
+from .models import Competitor, CompetitorDeal, CompetitorTraffic
+from .queries import traffic_by_competitor
+from .services import CompetitorAgent
+
+
+# Measures the queries behind the page, so the view cache stays out of the way
+@override_settings(VIEW_CACHE_ENABLED=False)
+class CompetitorDashboardQueryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('analyst', password='pw')
+        self.client.force_login(self.user)
+        self.start = date(2025, 1, 1)
+        self.days = 0
+        self.competitors = []
+
+    def grow(self, competitors, days):
+        """Adds competitors and extends every series by `days` days."""
+        for i in range(competitors):
+            n = len(self.competitors)
+            self.competitors.append(Competitor.objects.create(
+                name=f'Competitor {n}', google_place_id=f'place_{n}', location_name='Test'
+            ))
+        new_days = [self.start + timedelta(days=d) for d in range(self.days, self.days + days)]
+        self.days += days
+
+        DailySalesRollup.objects.bulk_create([
+            DailySalesRollup(date=d, item_category='Pizza', location_id='Loc_A', quantity=10, revenue=120)
+            for d in new_days
+        ])
+        # Existing competitors get the new days; new ones get the full history
+        all_days = [self.start + timedelta(days=d) for d in range(self.days)]
+        for comp in self.competitors:
+            have = set(comp.traffic_logs.values_list('date', flat=True))
+            CompetitorTraffic.objects.bulk_create([
+                CompetitorTraffic(competitor=comp, date=d, estimated_visits=100, traffic_score=50)
+                for d in all_days if d not in have
+            ])
+            CompetitorDeal.objects.get_or_create(
+                competitor=comp, date_observed=all_days[-1], deal_title='Happy hour',
+                defaults={'impact_on_traffic': 0.5},
+            )
+
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse('competitor_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        return len(captured)
+
+    def test_query_count_is_constant(self):
+        self.grow(competitors=2, days=10)
+        baseline = self.count_queries()
+
+        self.grow(competitors=8, days=60)
+        with self.assertNumQueries(baseline):
+            response = self.client.get(reverse('competitor_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Competitor 9 Traffic')
+
+    def test_window_limits_history(self):
+        self.grow(competitors=1, days=30)
+        with self.settings(DASHBOARD_WINDOW_DAYS=7):
+            response = self.client.get(reverse('competitor_dashboard'))
+        # Own sales plus one competitor, 7 days each
+        self.assertContains(response, '"2025-01-30"')
+        self.assertNotContains(response, '"2025-01-23"')
+
+    def test_same_named_competitors_keep_separate_series(self):
+        first = Competitor.objects.create(name='Luigi', google_place_id='place_1', location_name='North')
+        second = Competitor.objects.create(name='Luigi', google_place_id='place_2', location_name='South')
+        CompetitorTraffic.objects.create(competitor=first, date=self.start, estimated_visits=100, traffic_score=40)
+        CompetitorTraffic.objects.create(competitor=second, date=self.start, estimated_visits=100, traffic_score=70)
+        traffic = traffic_by_competitor(self.start)
+        self.assertEqual(traffic, {
+            first.pk: ('Luigi', [self.start], [40]),
+            second.pk: ('Luigi', [self.start], [70]),
+        })
+
+    def test_empty_charts_are_left_out(self):
+        # Traffic but no own sales and no deals: no figure to draw
+        comp = Competitor.objects.create(name='Solo', google_place_id='place_solo', location_name='Test')
+        CompetitorTraffic.objects.create(competitor=comp, date=self.start, estimated_visits=100, traffic_score=50)
+        response = self.client.get(reverse('competitor_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'var fig = ;')
+        self.assertNotContains(response, 'chart-deals')
+
+
+class StubSources(ThreadingHTTPServer):
+    """
+    Local HTTP server with the places/traffic/deals endpoints of
+    competitor_intel.collection. Every response takes `latency` seconds;
+    `fail_once` place IDs answer 503 on their first traffic request and
+    `missing` place IDs answer 404 for deals.
+    """
+    daemon_threads = True
+
+    def __init__(self, places, latency=0.1, fail_once=(), missing=()):
+        super().__init__(('127.0.0.1', 0), StubHandler)
+        self.places = places
+        self.latency = latency
+        self.fail_once = set(fail_once)
+        self.missing = set(missing)
+        self.hits = Counter()
+        self.lock = threading.Lock()
+
+    def url(self, name):
+        return f'http://127.0.0.1:{self.server_address[1]}/{name}'
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        name, place_id = url.path.strip('/'), query.get('place_id')
+        with server.lock:
+            server.hits[(name, place_id)] += 1
+            first = server.hits[(name, place_id)] == 1
+        time.sleep(server.latency)
+
+        if name == 'traffic' and place_id in server.fail_once and first:
+            return self.reply(503, {'error': 'busy'})
+        if name == 'deals' and place_id in server.missing:
+            return self.reply(404, {'error': 'not found'})
+        if name == 'places':
+            body = server.places
+        elif name == 'traffic':
+            body = [
+                {'date': (date(2025, 3, 1) - timedelta(days=i)).isoformat(), 'estimated_visits': 100 + i, 'traffic_score': 50}
+                for i in range(int(query['days']))
+            ]
+        else:
+            body = [{'title': f'Deal at {place_id}', 'url': 'https://example.com/deal'}]
+        self.reply(200, body)
+
+    def reply(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class CompetitorCollectionTests(TestCase):
+    def setUp(self):
+        tool_cache.get_cache().clear()
+        # 50 competitors, five of them listed twice
+        self.places = [
+            {'place_id': f'p{i}', 'name': f'Place {i}', 'address': f'{i} Main St', 'cuisine': 'Fusion'}
+            for i in range(50)
+        ]
+        self.places += self.places[:5]
+
+    def analyze(self, server):
+        sources = {
+            name: {'url': server.url(name), 'rate': 1000, 'burst': 100}
+            for name in ('places', 'traffic', 'deals')
+        }
+        with self.settings(COMPETITOR_SOURCES=sources, COMPETITOR_COLLECT_CONCURRENCY=20,
+                           COMPETITOR_COLLECT_BACKOFF=0.01):
+            agent = CompetitorAgent()
+            with CaptureQueriesContext(connection) as queries:
+                competitors = agent.analyze_location('Metro')
+        return agent, competitors, len(queries)
+
+    def test_city_is_collected_concurrently_with_bulk_writes(self):
+        with StubSources(self.places, latency=0.1, fail_once={'p7'}) as server:
+            start = time.perf_counter()
+            agent, competitors, n_queries = self.analyze(server)
+            elapsed = time.perf_counter() - start
+
+        # 101 requests of 0.1s each would take over 10s one after another
+        self.assertLess(elapsed, 3)
+        self.assertEqual(len(competitors), 50)
+        self.assertEqual(agent.last_result.errors, [])
+        self.assertEqual(CompetitorTraffic.objects.count(), 50 * 14)
+        self.assertEqual(CompetitorDeal.objects.count(), 50)
+        # Duplicate place IDs were coalesced; p7 was retried once after its 503
+        self.assertEqual(server.hits[('traffic', 'p0')], 1)
+        self.assertEqual(server.hits[('deals', 'p0')], 1)
+        self.assertEqual(server.hits[('traffic', 'p7')], 2)
+        self.assertLess(n_queries, 20)
+
+    def test_rerun_upserts_in_place(self):
+        with StubSources(self.places, latency=0) as server:
+            self.analyze(server)
+            CompetitorTraffic.objects.update(estimated_visits=0)
+            self.analyze(server)
+        self.assertEqual(Competitor.objects.count(), 50)
+        self.assertEqual(CompetitorTraffic.objects.count(), 50 * 14)
+        self.assertFalse(CompetitorTraffic.objects.filter(estimated_visits=0).exists())
+
+    def test_failed_lookups_are_skipped(self):
+        with StubSources(self.places, latency=0, missing={'p3'}) as server:
+            agent, competitors, _ = self.analyze(server)
+        self.assertEqual(len(competitors), 50)
+        self.assertEqual(len(agent.last_result.errors), 1)
+        self.assertIn('p3', agent.last_result.errors[0])
+        self.assertFalse(CompetitorDeal.objects.filter(competitor__google_place_id='p3').exists())
+        self.assertEqual(CompetitorDeal.objects.count(), 49)
+
+    def test_repeat_analysis_is_served_from_cache(self):
+        with StubSources(self.places, latency=0) as server:
+            self.analyze(server)
+            hits = sum(server.hits.values())
+            sources = {name: {'url': server.url(name)} for name in ('places', 'traffic', 'deals')}
+            with self.settings(COMPETITOR_SOURCES=sources):
+                competitors = CompetitorAgent().analyze_location('  metro ')
+        self.assertEqual(sum(server.hits.values()), hits)
+        self.assertEqual(len(competitors), 50)
+
+    def test_cached_deals_keep_their_fetch_date(self):
+        with StubSources(self.places, latency=0) as server:
+            self.analyze(server)
+            # Deals fetched yesterday: stale, served as they were and refreshed
+            cache = tool_cache.get_cache()
+            fetched_at = time.time() - 24 * 3600
+            for i in range(50):
+                key = tool_cache.cache_key('deals', {'place_id': f'p{i}'})
+                cache.set(key, dict(cache.get(key), fetched_at=fetched_at))
+            CompetitorDeal.objects.all().delete()
+            self.analyze(server)
+            tool_cache.wait_for_refreshes(timeout=5)
+        self.assertEqual(set(CompetitorDeal.objects.values_list('date_observed', flat=True)), {date.fromtimestamp(fetched_at)})
+
+
+@override_settings(COMPETITOR_CACHE_TTLS={'summary': {'ttl': 60, 'stale': 60}})
+class ToolCacheTests(TestCase):
+    def setUp(self):
+        tool_cache.get_cache().clear()
+        self.calls = 0
+
+    def fetch(self):
+        self.calls += 1
+        return f'summary {self.calls}'
+
+    def call(self, location='Downtown'):
+        return tool_cache.cached_call('summary', {'location': location}, self.fetch)
+
+    def test_fresh_entries_skip_the_fetch(self):
+        self.assertEqual(self.call(), 'summary 1')
+        self.assertEqual(self.call(' downtown'), 'summary 1')
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.call('Uptown'), 'summary 2')
+
+    def test_failed_summaries_return_none_and_are_not_cached(self):
+        import openai
+
+        from .collection import CollectionResult
+
+        agent = CompetitorAgent()
+        agent.api_key = 'test'
+        agent.last_result = CollectionResult('Downtown')
+        agent.__dict__['client'] = mock.Mock(**{'chat.completions.create.side_effect': openai.OpenAIError('rate limited')})
+        with self.assertLogs('competitor_intel.services', 'WARNING'):
+            self.assertIsNone(agent.summarize('Downtown'))
+
+        agent.client.chat.completions.create.side_effect = None
+        agent.client.chat.completions.create.return_value.choices = [mock.Mock(**{'message.content': 'Watch Urban Eats.'})]
+        self.assertEqual(agent.summarize('Downtown'), 'Watch Urban Eats.')
+
+    def test_stale_entries_are_served_while_refreshing(self):
+        now = time.time()
+        self.call()
+        with mock.patch.object(tool_cache.time, 'time', return_value=now + 90):
+            self.assertEqual(self.call(), 'summary 1')
+            tool_cache.wait_for_refreshes(timeout=5)
+            self.assertEqual(self.calls, 2)
+            self.assertEqual(self.call(), 'summary 2')
+        # Past ttl + stale (of the refreshed entry) the fetch is inline again
+        with mock.patch.object(tool_cache.time, 'time', return_value=now + 300):
+            self.assertEqual(self.call(), 'summary 3')
+
+    @override_settings(COMPETITOR_CACHE_TTLS={})
+    def test_unlisted_sources_are_not_cached(self):
+        self.call()
+        self.call()
+        self.assertEqual(self.calls, 2)
+
+
+class DealImpactTests(TestCase):
+    def setUp(self):
+        self.start = date(2025, 1, 1)
+        self.deal_day = self.start + timedelta(days=14)
+        self.rival = Competitor.objects.create(name='Rival', google_place_id='rival', location_name='Test')
+        self.quiet = Competitor.objects.create(name='Quiet', google_place_id='quiet', location_name='Test')
+        days = [self.start + timedelta(days=d) for d in range(28)]
+        # The rival's visits jump 50% with its deal while our sales drop 25%
+        CompetitorTraffic.objects.bulk_create(
+            [CompetitorTraffic(competitor=self.rival, date=d, estimated_visits=150 if d >= self.deal_day else 100,
+                               traffic_score=50) for d in days]
+            # The quiet competitor has no readings after its deal yet
+            + [CompetitorTraffic(competitor=self.quiet, date=d, estimated_visits=80, traffic_score=40)
+               for d in days if d < self.deal_day]
+        )
+        DailySalesRollup.objects.bulk_create([
+            DailySalesRollup(date=d, item_category='Pizza', location_id='Loc_A',
+                             quantity=15 if d >= self.deal_day else 20, revenue=100)
+            for d in days
+        ])
+        self.rival_deal = CompetitorDeal.objects.create(
+            competitor=self.rival, date_observed=self.deal_day, deal_title='Half price',
+        )
+        self.quiet_deal = CompetitorDeal.objects.create(
+            competitor=self.quiet, date_observed=self.deal_day, deal_title='Free drink',
+        )
+
+    def test_event_study_of_all_deals(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(refresh_impacts(), 2)
+        self.assertLess(len(queries), 8)
+
+        self.rival_deal.refresh_from_db()
+        self.assertAlmostEqual(self.rival_deal.impact_on_traffic, 0.5)
+        self.assertAlmostEqual(self.rival_deal.impact_on_own_sales, -0.25)
+        self.assertAlmostEqual(self.rival_deal.sales_correlation, -1.0)
+        self.quiet_deal.refresh_from_db()
+        self.assertIsNone(self.quiet_deal.impact_on_traffic)
+        self.assertAlmostEqual(self.quiet_deal.impact_on_own_sales, -0.25)
+        self.assertIsNotNone(self.quiet_deal.impact_updated_at)
+
+    def test_refresh_touches_only_overlapping_deals(self):
+        refresh_impacts()
+        self.assertEqual(refresh_impacts(), 0)
+        computed_at = CompetitorDeal.objects.get(pk=self.rival_deal.pk).impact_updated_at
+
+        new_days = [self.deal_day + timedelta(days=d) for d in range(7)]
+        CompetitorTraffic.objects.bulk_create([
+            CompetitorTraffic(competitor=self.quiet, date=d, estimated_visits=60, traffic_score=30) for d in new_days
+        ])
+        self.assertEqual(refresh_impacts([self.quiet.id], new_days[0], new_days[-1]), 1)
+
+        self.quiet_deal.refresh_from_db()
+        self.assertAlmostEqual(self.quiet_deal.impact_on_traffic, -0.25)
+        self.assertEqual(CompetitorDeal.objects.get(pk=self.rival_deal.pk).impact_updated_at, computed_at)
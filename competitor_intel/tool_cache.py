@@ -0,0 +1,179 @@
+"""
+Cache for the agent's external lookups: place search, popular times, deal
+scrapes and LLM summaries.
+
+Every lookup is keyed by its source and its normalized query (whitespace
+collapsed, free-text params such as the location casefolded, params sorted),
+so "Downtown" and " downtown " share an entry. Entries live in the Django
+cache named by COMPETITOR_CACHE_ALIAS, which makes the store pluggable: the
+default local-memory cache is a size-bounded LRU per process, a Redis or
+Memcached alias shares the entries between workers.
+
+Each source has its own lifetime in COMPETITOR_CACHE_TTLS:
+- younger than `ttl`: served from the cache;
+- up to `stale` seconds older: still served at once, and one background
+  refresh is started (stale-while-revalidate);
+- older, or missing: fetched inline and stored.
+Sources without an entry in COMPETITOR_CACHE_TTLS are never cached. Failed
+lookups are not cached.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+KEY_VERSION = 1
+# Params compared case-insensitively; IDs such as place_id are case-sensitive
+TEXT_PARAMS = {'location'}
+# How long a background refresh holds its lock, in case its process dies
+REFRESH_LOCK_SECONDS = 60
+
+FRESH, STALE, MISS = 'fresh', 'stale', 'miss'
+
+_executor = None
+_refreshing = {}
+_lock = threading.Lock()
+
+
+def get_cache():
+    return caches[settings.COMPETITOR_CACHE_ALIAS]
+
+
+def normalize(name, value):
+    if isinstance(value, str):
+        value = ' '.join(value.split())
+        if name in TEXT_PARAMS:
+            value = value.casefold()
+    return value
+
+
+def cache_key(source, params):
+    query = json.dumps({k: normalize(k, v) for k, v in params.items()}, sort_keys=True, default=str)
+    digest = hashlib.sha1(query.encode()).hexdigest()
+    return f'competitor_tools:v{KEY_VERSION}:{source}:{digest}'
+
+
+def lifetimes(source):
+    """(ttl, stale) seconds for `source`, or None when it is not cached."""
+    config = settings.COMPETITOR_CACHE_TTLS.get(source)
+    if config is None:
+        return None
+    return config['ttl'], config.get('stale', 0)
+
+
+def lookup(source, params):
+    """(state, entry): FRESH or STALE with the cached {value, fetched_at}, or (MISS, None)."""
+    config = lifetimes(source)
+    if config is None:
+        return MISS, None
+    entry = get_cache().get(cache_key(source, params))
+    if entry is None:
+        return MISS, None
+    ttl, stale = config
+    age = time.time() - entry['fetched_at']
+    if age < ttl:
+        return FRESH, entry
+    if age < ttl + stale:
+        return STALE, entry
+    return MISS, None
+
+
+def store(source, params, value):
+    """Caches `value` as fetched now; returns the entry ({value, fetched_at}) either way."""
+    entry = {'value': value, 'fetched_at': time.time()}
+    config = lifetimes(source)
+    if config is not None:
+        ttl, stale = config
+        get_cache().set(cache_key(source, params), entry, ttl + stale)
+    return entry
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.COMPETITOR_CACHE_REFRESH_WORKERS, thread_name_prefix='competitor-cache',
+            )
+        return _executor
+
+
+def revalidate(source, params, refresh):
+    """
+    Refreshes the entry in the background with `refresh()` (a plain callable).
+    At most one refresh per key runs at a time, across processes when the
+    cache is shared.
+    """
+    key = cache_key(source, params)
+    with _lock:
+        if key in _refreshing:
+            return
+        # cache.add is atomic: only one worker wins the lock
+        if not get_cache().add(f'{key}:refreshing', True, REFRESH_LOCK_SECONDS):
+            return
+        _refreshing[key] = None
+
+    def run():
+        try:
+            store(source, params, refresh())
+        except Exception:
+            logger.warning('Refreshing %s %s failed; the stale entry is kept', source, params, exc_info=True)
+        finally:
+            get_cache().delete(f'{key}:refreshing')
+            with _lock:
+                _refreshing.pop(key, None)
+
+    future = _get_executor().submit(run)
+    with _lock:
+        if key in _refreshing:
+            _refreshing[key] = future
+
+
+def wait_for_refreshes(timeout=None):
+    """Blocks until the background refreshes started so far have finished."""
+    with _lock:
+        futures = [f for f in _refreshing.values() if f is not None]
+    wait(futures, timeout=timeout)
+
+
+def cached_call(source, params, fetch):
+    """`fetch()` through the cache, for blocking lookups such as LLM calls."""
+    state, entry = lookup(source, params)
+    if state == STALE:
+        revalidate(source, params, fetch)
+    if state != MISS:
+        return entry['value']
+    return store(source, params, fetch())['value']
+
+
+class CachedSource:
+    """
+    Wraps a collection source (see competitor_intel.collection). Misses are
+    awaited on the caller's event loop; stale entries are refreshed by
+    `refresh(**params)`, a blocking callable run on the background pool,
+    since the caller's loop and HTTP client are gone once its request ends.
+    """
+
+    def __init__(self, source, refresh):
+        self.source = source
+        self.name = source.name
+        self.refresh = refresh
+
+    async def fetch(self, **params):
+        return (await self.fetch_entry(**params))['value']
+
+    async def fetch_entry(self, **params):
+        """{value, fetched_at}: when the value was actually fetched, which a cached one predates."""
+        state, entry = lookup(self.name, params)
+        if state == STALE:
+            revalidate(self.name, params, lambda: self.refresh(**params))
+        if state != MISS:
+            return entry
+        return store(self.name, params, await self.source.fetch(**params))
@@ -1,90 +1,119 @@
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
-from .models import Competitor, CompetitorTraffic, CompetitorDeal
+from django.contrib import messages
+from .models import Competitor, CompetitorDeal, CompetitorTraffic
 from .services import CompetitorAgent
-import plotly.express as px
-import plotly.graph_objects as go
-import pandas as pd
+from . import queries
+from core.caching import cached
+from core.instrumentation import stage
 from sales.models import SalesData
-from django.db.models import Sum
 
 @login_required
 def competitor_dashboard(request):
-    competitors = Competitor.objects.all()
-    
-    # Traffic Battle Chart
-    # Compare own sales (quantity) with competitor traffic scores
-    own_sales = SalesData.objects.values('transaction_date').annotate(
-        total_qty=Sum('quantity_sold')
-    ).order_by('transaction_date')
+    # Rebuilt only after agent runs, impact refreshes or sales imports
+    context = cached(
+        'competitor_intel:dashboard', [Competitor, CompetitorTraffic, CompetitorDeal, SalesData],
+        competitor_dashboard_context,
+    )
+    with stage('render'):
+        return render(request, 'competitor_intel/dashboard.html', context)
+
+
+def competitor_dashboard_context():
+    # Imported per call: the charting stack stays out of process startup
+    import plotly.express as px
+    import plotly.graph_objects as go
+    import pandas as pd
+    from core.charts import figure_json
+
+    with stage('fetch'):
+        competitors = list(Competitor.objects.all())
+        start = queries.dashboard_window()
+        own_sales = queries.own_sales_by_day(start) if start is not None else []
+        traffic = queries.traffic_by_competitor(start) if start is not None else {}
+        deals = queries.deals_in_window(start)
     
-    chart_traffic = ""
-    if own_sales.exists():
-        df_own = pd.DataFrame(own_sales)
-        df_own['date'] = df_own['transaction_date'].dt.date
-        df_own = df_own.groupby('date')['total_qty'].sum().reset_index()
-        
-        fig = go.Figure()
-        # My Sales
-        fig.add_trace(go.Scatter(
-            x=df_own['date'], 
-            y=df_own['total_qty'], 
-            name='My Sales (Qty)', 
-            line=dict(color='#2DD4BF', width=4)
-        ))
-        
-        # Competitor Traffic
-        for comp in competitors:
-            traffic_data = list(comp.traffic_logs.all().order_by('date').values('date', 'traffic_score'))
-            if traffic_data:
-                df_comp = pd.DataFrame(traffic_data)
+    with stage('chart'):
+        # Traffic Battle Chart
+        # Compare own sales (quantity) with competitor traffic scores
+        chart_traffic = ""
+        if start is not None:
+            own_dates, own_qty = zip(*own_sales)
+
+            fig = go.Figure()
+            # My Sales
+            fig.add_trace(go.Scatter(
+                x=own_dates, 
+                y=own_qty, 
+                name='My Sales (Qty)', 
+                line=dict(color='#2DD4BF', width=4)
+            ))
+
+            # Competitor Traffic, all competitors from one query
+            for name, dates, scores in traffic.values():
                 fig.add_trace(go.Scatter(
-                    x=df_comp['date'], 
-                    y=df_comp['traffic_score'], 
-                    name=f'{comp.name} Traffic', 
+                    x=dates, 
+                    y=scores, 
+                    name=f'{name} Traffic', 
                     line=dict(dash='dot')
                 ))
-        
-        fig.update_layout(
-            title="Traffic Battle: My Sales vs Competitors", 
-            template="plotly_white",
-            xaxis_title="Date",
-            yaxis_title="Volume / Score"
-        )
-        chart_traffic = fig.to_html(full_html=False)
 
-    # Deal Impact (Scatter Plot)
-    chart_deals = ""
-    deals = CompetitorDeal.objects.select_related('competitor').all()
-    if deals.exists():
-        deal_data = []
-        for d in deals:
-            deal_data.append({
-                'Competitor': d.competitor.name,
-                'Deal': d.deal_title,
-                'Impact Score': d.impact_on_traffic,
-                'Date': d.date_observed
+            fig.update_layout(
+                title="Traffic Battle: My Sales vs Competitors", 
+                template="plotly_white",
+                xaxis_title="Date",
+                yaxis_title="Volume / Score"
+            )
+            chart_traffic = figure_json(fig)
+
+        # Deal Impact (Scatter Plot)
+        chart_deals = ""
+        if deals:
+            df_deals = pd.DataFrame({
+                'Competitor': [d.competitor.name for d in deals],
+                'Deal': [d.deal_title for d in deals],
+                'Traffic Impact': [d.impact_on_traffic for d in deals],
+                'Our Sales Impact': [d.impact_on_own_sales for d in deals],
+                'Sales Correlation': [d.sales_correlation for d in deals],
+                'Date': [d.date_observed for d in deals],
             })
-        df_deals = pd.DataFrame(deal_data)
-        fig_deals = px.scatter(
-            df_deals, x='Date', y='Impact Score', color='Competitor', 
-            hover_data=['Deal'], title="Competitor Deal Impact Analysis",
-            template="plotly_white", color_discrete_sequence=px.colors.qualitative.Antique
-        )
-        chart_deals = fig_deals.to_html(full_html=False)
+            # Impacts are relative changes, post vs pre deal (competitor_intel.impact);
+            # deals whose windows lack readings have none and are not plotted
+            fig_deals = px.scatter(
+                df_deals, x='Date', y='Traffic Impact', color='Competitor',
+                hover_data=['Deal', 'Our Sales Impact', 'Sales Correlation'], title="Competitor Deal Impact Analysis",
+                template="plotly_white", color_discrete_sequence=px.colors.qualitative.Antique
+            )
+            fig_deals.update_yaxes(tickformat='+.0%')
+            chart_deals = figure_json(fig_deals)
 
-    context = {
+    return {
         'competitors': competitors,
         'chart_traffic': chart_traffic,
         'chart_deals': chart_deals,
         'deals': deals[:10]
     }
-    return render(request, 'competitor_intel/dashboard.html', context)
 
 @login_required
 def run_competitor_analysis(request):
     if request.method == 'POST':
         location = request.POST.get('location', 'Downtown')
+        from .collection import SourceError
         agent = CompetitorAgent()
-        agent.analyze_location(location)
+        try:
+            with stage('collect'):
+                competitors = agent.analyze_location(location)
+        except SourceError as e:
+            messages.error(request, f"Competitor search failed: {e}")
+        else:
+            with stage('summary'):
+                summary = agent.summarize(location)
+            if summary:
+                messages.info(request, summary)
+            if agent.last_result.errors:
+                messages.warning(
+                    request,
+                    f"Analyzed {len(competitors)} competitors; {len(agent.last_result.errors)} lookups failed "
+                    f"and were skipped.",
+                )
     return redirect('competitor_dashboard')
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -52,7 +53,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its timings cover the rest of the stack
+    'core.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'django.middleware.gzip.GZipMiddleware',
+    'django.middleware.http.ConditionalGetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -139,3 +144,153 @@ LOGOUT_REDIRECT_URL = 'login'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Sales CSV import: rows read per pandas chunk and rows per INSERT batch
+SALES_IMPORT_CHUNK_SIZE = 50000
+SALES_IMPORT_BATCH_SIZE = 5000
+
+# Model training runs on a process pool (forecast.jobs). Each fit already uses
+# every core via n_jobs=-1, so keep the pool small to avoid oversubscription.
+# Set TRAINING_JOBS_EAGER to run jobs inline, e.g. in tests.
+TRAINING_JOB_WORKERS = 2
+TRAINING_JOBS_EAGER = False
+# The process that queued a pooled job refreshes its heartbeat this often;
+# unfinished jobs without one for TRAINING_JOB_STALE_SECONDS were orphaned by
+# a restart or crash and are marked failed when jobs are next read.
+TRAINING_JOB_HEARTBEAT_SECONDS = 30
+TRAINING_JOB_STALE_SECONDS = 120
+
+# Number of future days forecast by each training run
+FORECAST_HORIZON_DAYS = 14
+
+# Model registry (forecast.registry): versioned artifacts plus a per-process
+# LRU of loaded models. Artifacts at least MODEL_MMAP_MIN_BYTES are memory-mapped.
+MODEL_ARTIFACT_DIR = BASE_DIR / 'data' / 'models'
+MODEL_CACHE_MAX_ENTRIES = 8
+MODEL_CACHE_MAX_BYTES = 512 * 1024 * 1024
+MODEL_MMAP_MIN_BYTES = 10 * 1024 * 1024
+
+# Parallel workers for per item/location series fits (joblib n_jobs; -1 = all cores)
+FORECAST_SERIES_N_JOBS = -1
+
+# Parallel workers for backtest folds (forecast.backtest; joblib n_jobs, -1 = all cores)
+BACKTEST_N_JOBS = -1
+
+# Charts (core.charts): traces longer than this are LTTB-downsampled before
+# being sent to the browser; roughly one point per horizontal pixel of a chart.
+CHART_MAX_POINTS = 1000
+
+# Days of history shown on the reservation and competitor dashboards
+DASHBOARD_WINDOW_DAYS = 180
+
+# Columnar training-data snapshots (forecast.snapshots), rebuilt when the rollup
+# changes and memory-mapped otherwise; rows fetched per cursor batch while building.
+DATASET_SNAPSHOT_DIR = BASE_DIR / 'data' / 'snapshots'
+DATASET_SNAPSHOT_FETCH_SIZE = 50000
+
+# Incremental forecast updates (forecast.incremental): trees added per update,
+# cap on forest size (oldest trees retire first) and days each update fits on.
+FORECAST_INCREMENTAL_TREES = 10
+FORECAST_INCREMENTAL_MAX_TREES = 300
+FORECAST_INCREMENTAL_WINDOW_DAYS = 28
+# Queue an incremental forecast update whenever a sales import commits
+FORECAST_UPDATE_ON_IMPORT = False
+
+# Prediction intervals stored with each forecast (confidence_lower/upper):
+# quantiles of the per-tree predictions of the fitted forest, or the quantiles
+# the hist_gb engine fits quantile-loss models for.
+FORECAST_INTERVAL_QUANTILES = (0.1, 0.9)
+
+# Hyperparameter search (forecast.tuning, `manage.py tune_model`): sampled
+# candidates, CV folds, successive-halving factor, pool workers and the
+# wall-clock budget of one search. Fold datasets are cached in TUNING_CACHE_DIR.
+TUNING_CANDIDATES = 16
+TUNING_FOLDS = 3
+TUNING_ETA = 3
+TUNING_WORKERS = 2
+TUNING_BUDGET_SECONDS = 600
+TUNING_CACHE_DIR = BASE_DIR / 'data' / 'tuning'
+
+# Cold-start import budget per startup path (core.startup, `manage.py
+# benchmark_startup`). Heavy libraries load lazily, at the point of use.
+STARTUP_IMPORT_BUDGET_MS = {'check': 1000, 'wsgi': 1000}
+
+# Competitor data collection (competitor_intel.collection). Sources without a
+# URL use the built-in simulation; `rate`/`burst` are per-source requests/second.
+COMPETITOR_SOURCES = {
+    'places': {'url': os.getenv('COMPETITOR_PLACES_URL'), 'rate': 5, 'burst': 5},
+    'traffic': {'url': os.getenv('COMPETITOR_TRAFFIC_URL'), 'rate': 20, 'burst': 20},
+    'deals': {'url': os.getenv('COMPETITOR_DEALS_URL'), 'rate': 10, 'burst': 10},
+}
+COMPETITOR_COLLECT_CONCURRENCY = 10
+COMPETITOR_COLLECT_RETRIES = 3
+COMPETITOR_COLLECT_BACKOFF = 0.5  # seconds, doubled per retry
+COMPETITOR_COLLECT_TIMEOUT = 10
+
+# Caches, on the backend named by the CACHE_BACKEND environment variable:
+# locmem (default; per process), file (data/cache/, shared by the processes of
+# one host) or redis (REDIS_URL, e.g. a local Redis; shared by all workers).
+# `default` holds data-versioned view contexts and chart fragments
+# (core.caching); `competitor_tools` the agent's external lookups
+# (competitor_intel.tool_cache). MAX_ENTRIES bounds locmem and file caches.
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
+
+
+def _cache(name, max_entries):
+    if CACHE_BACKEND == 'file':
+        return {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': BASE_DIR / 'data' / 'cache' / name,
+            'OPTIONS': {'MAX_ENTRIES': max_entries},
+        }
+    if CACHE_BACKEND == 'redis':
+        return {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL', 'redis://127.0.0.1:6379/0'),
+            'KEY_PREFIX': name,
+        }
+    return {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': name,
+        'OPTIONS': {'MAX_ENTRIES': max_entries},
+    }
+
+
+CACHES = {
+    'default': _cache('default', 1000),
+    'competitor_tools': _cache('competitor-tools', 5000),
+}
+COMPETITOR_CACHE_ALIAS = 'competitor_tools'
+# Per-source lifetimes in seconds: served fresh for `ttl`, then served stale
+# and refreshed in the background for up to `stale` more. Unlisted sources
+# are not cached.
+COMPETITOR_CACHE_TTLS = {
+    'places': {'ttl': 24 * 3600, 'stale': 7 * 24 * 3600},
+    'traffic': {'ttl': 3600, 'stale': 6 * 3600},
+    'deals': {'ttl': 6 * 3600, 'stale': 24 * 3600},
+    'summary': {'ttl': 24 * 3600, 'stale': 3 * 24 * 3600},
+}
+COMPETITOR_CACHE_REFRESH_WORKERS = 2
+COMPETITOR_SUMMARY_MODEL = 'gpt-4o-mini'
+
+# Deal impact event study (competitor_intel.impact): days in each of the
+# pre/post windows around a deal and the readings a window needs to count.
+COMPETITOR_IMPACT_WINDOW_DAYS = 7
+COMPETITOR_IMPACT_MIN_DAYS = 3
+
+# Request instrumentation (core.instrumentation): per-request SQL count/time,
+# view stages and peak memory as histograms on /metrics. Requests slower than
+# INSTRUMENTATION_SLOW_REQUEST_MS are logged with their stages (None: never).
+# /metrics is served to staff users and, with INSTRUMENTATION_METRICS_TOKEN set, to
+# "Authorization: Bearer <token>"; INSTRUMENTATION_METRICS_PUBLIC opens it to anyone.
+INSTRUMENTATION_ENABLED = True
+INSTRUMENTATION_SLOW_REQUEST_MS = 1000
+INSTRUMENTATION_MEMORY_INTERVAL = 0.01  # seconds between RSS samples
+INSTRUMENTATION_METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+INSTRUMENTATION_METRICS_PUBLIC = os.getenv('METRICS_PUBLIC') == '1'
+
+# Data-versioned view caching (core.caching): dashboards cache their contexts
+# and chart JSON under keys that change with every write to the models they read.
+VIEW_CACHE_ENABLED = True
+VIEW_CACHE_ALIAS = 'default'
+VIEW_CACHE_TIMEOUT = 24 * 3600  # superseded entries age out after this
@@ -1,3 +1,7 @@
 from django.contrib import admin
+from .models import DataVersion
 
-# Register your models here.
+@admin.register(DataVersion)
+class DataVersionAdmin(admin.ModelAdmin):
+    list_display = ('name', 'version')
+    readonly_fields = ('name', 'version')
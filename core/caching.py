@@ -0,0 +1,93 @@
+"""
+Data-versioned caching of view contexts and chart fragments.
+
+Dashboards only change when their data does (imports, training runs, agent
+runs), so what they compute (aggregates, Plotly figure JSON, the exploded
+BOM) is cached under a key that embeds the write counter (DataVersion) of
+every model it reads:
+
+    charts = cached('reservations:charts', [ReservationSignal], build_charts)
+
+A write bumps the model's counter in the same transaction, so the next read
+builds a new key: nothing is ever served from before a write, and nothing is
+rebuilt without one. Old entries are never deleted, they just stop being
+asked for and age out of the cache (VIEW_CACHE_TIMEOUT).
+
+Counters are bumped by post_save/post_delete signals on TRACKED_MODELS (see
+core.signals) and explicitly by bulk paths that bypass signals: bulk_create,
+bulk_update, raw SQL imports. They live in the database rather than the
+cache, so a training job in a worker process invalidates the web processes'
+entries too, whichever backend VIEW_CACHE_ALIAS points at (locmem, file,
+Redis; see CACHE_BACKEND in settings).
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+
+from .models import DataVersion
+
+# Models whose writes invalidate cached views, as app_label.ModelName
+TRACKED_MODELS = [
+    'sales.SalesData',
+    'sales.BillOfMaterial',
+    'sales.Ingredient',
+    'forecast.TrainingRun',
+    'forecast.SalesPrediction',
+    'reservations.ReservationSignal',
+    'reservations.NoShowTrainingRun',
+    'competitor_intel.Competitor',
+    'competitor_intel.CompetitorTraffic',
+    'competitor_intel.CompetitorDeal',
+]
+
+
+def model_label(model):
+    return model if isinstance(model, str) else model._meta.label
+
+
+def bump_versions(*models):
+    """Increments the counters of `models` (classes or labels); call after a write signals don't see."""
+    names = sorted({model_label(m) for m in models})
+    counter = DataVersion.objects.filter(name__in=names)
+    if counter.update(version=F('version') + 1) < len(names):
+        # First write of some model: create its row and bump again (a counter
+        # only has to change, so bumping the others twice is harmless)
+        DataVersion.objects.bulk_create([DataVersion(name=name) for name in names], ignore_conflicts=True)
+        counter.update(version=F('version') + 1)
+
+
+def data_versions(*models):
+    """{label: counter} of `models` in one query; never-written models are 0."""
+    names = sorted({model_label(m) for m in models})
+    versions = dict(DataVersion.objects.filter(name__in=names).values_list('name', 'version'))
+    return {name: versions.get(name, 0) for name in names}
+
+
+def cache_key(name, models, *parts):
+    payload = json.dumps([data_versions(*models), parts], sort_keys=True, default=str)
+    return f'view:{name}:{hashlib.sha1(payload.encode()).hexdigest()}'
+
+
+def get_cache():
+    return caches[settings.VIEW_CACHE_ALIAS]
+
+
+def cached(name, models, build, *parts):
+    """
+    build() cached under `name`, the data versions of `models` and any extra
+    key `parts` (e.g. the run shown). The value must be picklable.
+    """
+    if not settings.VIEW_CACHE_ENABLED:
+        return build()
+    cache = get_cache()
+    # Versions are read before the data: an entry may hold data newer than its
+    # key, never older
+    key = cache_key(name, models, *parts)
+    value = cache.get(key)
+    if value is None:
+        value = build()
+        cache.set(key, value, settings.VIEW_CACHE_TIMEOUT)
+    return value
@@ -0,0 +1,86 @@
+"""
+Server-side chart rendering.
+
+Views build Plotly figures as before, but only the figure JSON is sent to the
+page; plotly.js itself is loaded once by base.html. Long traces are
+downsampled with Largest-Triangle-Three-Buckets (LTTB), which keeps the visual
+shape (peaks, dips) of a series with a fixed number of points, so page weight
+and render time don't grow with history length.
+
+Templates render a chart with:
+    {% include 'core/chart.html' with chart_id='my-chart' figure=chart_json %}
+"""
+import numpy as np
+from django.conf import settings
+from django.utils.safestring import mark_safe
+
+# Per-point trace attributes that must be subset together with x/y
+POINT_ATTRS = ('x', 'y', 'customdata', 'text', 'hovertext', 'ids')
+
+
+def lttb(x, y, threshold):
+    """
+    Indices of the `threshold` points LTTB selects from (x, y); x must be
+    ascending and numeric. Always keeps the first and last point.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    # Buckets between the fixed first and last points
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+
+    prev = 0
+    for b in range(threshold - 2):
+        lo, hi = edges[b], edges[b + 1]
+        # Average of the next bucket (or the last point) is the third vertex
+        nlo, nhi = edges[b + 1], edges[b + 2] if b + 2 < len(edges) else n
+        avg_x, avg_y = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+
+        area = np.abs(
+            (x[prev] - avg_x) * (y[lo:hi] - y[prev]) - (x[prev] - x[lo:hi]) * (avg_y - y[prev])
+        )
+        prev = lo + int(np.argmax(area))
+        selected[b + 1] = prev
+    return selected
+
+
+def _numeric_x(x):
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.number):
+        return x.astype(float)
+    # Dates/datetimes (numpy or python objects) -> epoch nanoseconds
+    return np.asarray(x, dtype='datetime64[ns]').astype(np.int64).astype(float)
+
+
+def downsample_figure(fig, max_points=None):
+    """Downsamples every x/y trace of `fig` longer than `max_points` in place."""
+    max_points = max_points or settings.CHART_MAX_POINTS
+    for trace in fig.data:
+        if trace.x is None or trace.y is None or len(trace.x) <= max_points:
+            continue
+        x = _numeric_x(trace.x)
+        order = np.argsort(x, kind='stable')
+        y = np.nan_to_num(np.asarray(trace.y, dtype=float)[order])
+        keep = order[lttb(x[order], y, max_points)]
+
+        updates = {}
+        for attr in POINT_ATTRS:
+            values = trace[attr]
+            if values is not None and not isinstance(values, str) and len(values) == len(x):
+                updates[attr] = np.asarray(values)[keep]
+        trace.update(updates)
+    return fig
+
+
+def figure_json(fig, max_points=None):
+    """
+    Downsampled figure JSON, safe to embed in a <script> block (`<` is escaped
+    so trace text can't close the tag).
+    """
+    downsample_figure(fig, max_points)
+    return mark_safe(fig.to_json().replace('<', '\\u003c'))
@@ -0,0 +1,261 @@
+"""
+Request-level performance instrumentation.
+
+InstrumentationMiddleware wraps every request and records how long it took,
+how many SQL queries it ran and for how long (through
+connection.execute_wrapper), and how far the process's resident memory
+peaked above where it started. Views mark their pipeline stages with
+`stage()` so a slow page can be pinned on SQL, pandas or template rendering:
+
+    with stage('fetch'):
+        daily = daily_noshow_stats()
+
+Stages may nest; each is timed on its own and counts the queries run inside
+it. Everything lands in per-process histograms, served in the Prometheus
+text format by core.views.metrics (/metrics). Requests slower than
+INSTRUMENTATION_SLOW_REQUEST_MS are logged with their stage breakdown.
+
+Peak memory comes from one sampler thread per process that reads RSS every
+INSTRUMENTATION_MEMORY_INTERVAL seconds while requests are in flight, so it
+is the process's peak during the request: concurrent requests share it.
+
+Only the standard library is used here: the middleware loads at startup.
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = 'foreat'
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+BYTES_BUCKETS = tuple(mb * 1024 * 1024 for mb in (1, 4, 16, 64, 128, 256, 512, 1024, 2048))
+
+_current = ContextVar('request_metrics', default=None)
+
+
+def rss_bytes():
+    """Current resident set size of this process, or 0 where it can't be read."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes elsewhere
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, as Prometheus expects it."""
+
+    def __init__(self, name, documentation, labels, buckets):
+        self.name = f'{METRIC_PREFIX}_{name}'
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['buckets'][i] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def samples(self, **labels):
+        """(count, sum) of one label set; (0, 0.0) when never observed."""
+        series = self._series.get(tuple(str(labels[name]) for name in self.labels))
+        return (series['count'], series['sum']) if series else (0, 0.0)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                labels = ','.join(f'{name}="{escape(value)}"' for name, value in zip(self.labels, key))
+                for bound, count in zip(self.buckets, series['buckets']):
+                    lines.append(f'{self.name}_bucket{{{labels},le="{bound:g}"}} {count}')
+                lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {series["count"]}')
+                lines.append(f'{self.name}_sum{{{labels}}} {series["sum"]:.6g}')
+                lines.append(f'{self.name}_count{{{labels}}} {series["count"]}')
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+def escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+REQUEST_SECONDS = Histogram(
+    'request_duration_seconds', 'Wall time of a request.', ('view', 'method', 'status'), SECONDS_BUCKETS,
+)
+SQL_QUERIES = Histogram('request_sql_queries', 'SQL queries run by a request.', ('view',), QUERY_BUCKETS)
+SQL_SECONDS = Histogram('request_sql_seconds', 'Time a request spent in SQL.', ('view',), SECONDS_BUCKETS)
+STAGE_SECONDS = Histogram('stage_duration_seconds', 'Wall time of a named view stage.', ('view', 'stage'), SECONDS_BUCKETS)
+PEAK_MEMORY = Histogram(
+    'request_peak_memory_bytes', 'Peak resident memory during a request, above its start.', ('view',), BYTES_BUCKETS,
+)
+HISTOGRAMS = [REQUEST_SECONDS, SQL_QUERIES, SQL_SECONDS, STAGE_SECONDS, PEAK_MEMORY]
+
+
+def render_metrics():
+    """All histograms plus the process's resident memory, in the Prometheus text format."""
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    lines += [
+        f'# HELP {METRIC_PREFIX}_process_resident_memory_bytes Resident memory of this process.',
+        f'# TYPE {METRIC_PREFIX}_process_resident_memory_bytes gauge',
+        f'{METRIC_PREFIX}_process_resident_memory_bytes {rss_bytes()}',
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+def reset_metrics():
+    for histogram in HISTOGRAMS:
+        histogram.clear()
+
+
+class RequestMetrics:
+    def __init__(self, request):
+        self.request = request
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.stages = []
+        self.start_rss = self.peak_rss = rss_bytes()
+
+    @property
+    def view(self):
+        match = getattr(self.request, 'resolver_match', None)
+        return (match.view_name or match._func_path) if match else 'unresolved'
+
+    def sql_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_seconds += time.perf_counter() - start
+            self.sql_count += 1
+
+
+class MemorySampler:
+    """One thread per process raising `peak_rss` of every request in flight."""
+
+    def __init__(self):
+        self.active = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def add(self, metrics):
+        with self._lock:
+            self.active.add(metrics)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='request-memory', daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def remove(self, metrics):
+        with self._lock:
+            self.active.discard(metrics)
+        metrics.peak_rss = max(metrics.peak_rss, rss_bytes())
+
+    def _run(self):
+        while True:
+            with self._lock:
+                active = list(self.active)
+                if not active:
+                    self._wake.clear()
+            if not active:
+                self._wake.wait()
+                continue
+            rss = rss_bytes()
+            for metrics in active:
+                metrics.peak_rss = max(metrics.peak_rss, rss)
+            time.sleep(settings.INSTRUMENTATION_MEMORY_INTERVAL)
+
+
+_sampler = MemorySampler()
+
+
+@contextmanager
+def stage(name):
+    """Times the block as stage `name` of the current request (also outside requests)."""
+    metrics = _current.get()
+    queries = metrics.sql_count if metrics else 0
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        view = metrics.view if metrics else '-'
+        STAGE_SECONDS.observe(seconds, view=view, stage=name)
+        if metrics is not None:
+            metrics.stages.append((name, seconds, metrics.sql_count - queries))
+
+
+class InstrumentationMiddleware:
+    """Records every request in the histograms above; goes first in MIDDLEWARE."""
+
+    def __init__(self, get_response):
+        if not settings.INSTRUMENTATION_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics(request)
+        token = _current.set(metrics)
+        _sampler.add(metrics)
+        start = time.perf_counter()
+        status = 500
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics.sql_wrapper))
+                response = self.get_response(request)
+            status = response.status_code
+            return response
+        finally:
+            seconds = time.perf_counter() - start
+            _sampler.remove(metrics)
+            _current.reset(token)
+            self.record(request, metrics, seconds, status)
+
+    def record(self, request, metrics, seconds, status):
+        view = metrics.view
+        peak = max(0, metrics.peak_rss - metrics.start_rss)
+        REQUEST_SECONDS.observe(seconds, view=view, method=request.method, status=status)
+        SQL_QUERIES.observe(metrics.sql_count, view=view)
+        SQL_SECONDS.observe(metrics.sql_seconds, view=view)
+        PEAK_MEMORY.observe(peak, view=view)
+
+        slow_ms = settings.INSTRUMENTATION_SLOW_REQUEST_MS
+        if slow_ms is not None and seconds * 1000 >= slow_ms:
+            stages = ', '.join(f'{name} {s * 1000:.0f}ms ({q} queries)' for name, s, q in metrics.stages)
+            logger.warning(
+                'Slow request %s %s (%s) %d: %.0fms; SQL %d queries %.0fms; peak memory +%.1fMB; stages: %s',
+                request.method, request.path, view, status, seconds * 1000,
+                metrics.sql_count, metrics.sql_seconds * 1000, peak / 1024 / 1024, stages or 'none',
+            )
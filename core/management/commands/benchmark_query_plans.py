@@ -0,0 +1,204 @@
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from competitor_intel.models import Competitor, CompetitorTraffic
+from forecast.models import TrainingRun, SalesPrediction
+from reservations.models import ReservationSignal
+from sales.models import SalesData
+
+MODELS = [SalesData, TrainingRun, SalesPrediction, Competitor, CompetitorTraffic, ReservationSignal]
+
+
+def table_sql(model):
+    """CREATE TABLE for `model` with columns only: no secondary indexes or constraints."""
+    qn = connection.ops.quote_name
+    cols = []
+    for f in model._meta.local_fields:
+        if f.primary_key:
+            cols.append(f'{qn(f.column)} integer NOT NULL PRIMARY KEY')
+        else:
+            cols.append(f'{qn(f.column)} {f.db_type(connection)}')
+    return f'CREATE TABLE {qn(model._meta.db_table)} ({", ".join(cols)})'
+
+
+def index_sql(model):
+    """The index DDL the migrations create for `model` (db_index, Meta.indexes, unique constraints)."""
+    qn = connection.ops.quote_name
+    with connection.schema_editor(collect_sql=True) as editor:
+        editor.create_model(model)
+    statements = [
+        s.rstrip(';') for s in editor.collected_sql
+        if s.startswith('CREATE INDEX') or s.startswith('CREATE UNIQUE INDEX')
+    ]
+    for constraint in model._meta.constraints:
+        cols = ', '.join(qn(model._meta.get_field(name).column) for name in constraint.fields)
+        statements.append(f'CREATE UNIQUE INDEX {qn(constraint.name)} ON {qn(model._meta.db_table)} ({cols})')
+    return statements
+
+
+def ts_strings(days, base):
+    stamps = np.datetime64(base, 's') + (days * 86400).astype('timedelta64[s]')
+    return np.char.replace(np.datetime_as_string(stamps, unit='s'), 'T', ' ').tolist()
+
+
+class Command(BaseCommand):
+    help = 'Seed a scratch SQLite DB at production scale and compare query plans/timings before and after the time-series indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2_000_000, help='SalesData rows to seed')
+        parser.add_argument('--days', type=int, default=730, help='Days of history')
+        parser.add_argument('--competitors', type=int, default=200)
+        parser.add_argument('--repeat', type=int, default=5, help='Timed executions per query')
+        parser.add_argument('--db', type=str, default=None, help='Scratch DB path (default: temp file)')
+        parser.add_argument('--overwrite', action='store_true', help='Replace the file at --db if it exists')
+
+    def handle(self, *args, **options):
+        path = options['db'] or os.path.join(tempfile.mkdtemp(), 'benchmark.sqlite3')
+        if os.path.exists(path):
+            # The scratch DB is rebuilt from nothing; never drop a file the user did not mark as scratch.
+            if not options['overwrite']:
+                raise CommandError(f'{path} already exists; pass --overwrite to replace it.')
+            os.remove(path)
+        db = sqlite3.connect(path)
+
+        self.stdout.write(f'Seeding {path} ...')
+        start = time.perf_counter()
+        for model in MODELS:
+            db.execute(table_sql(model))
+        self.seed(db, options)
+        self.stdout.write(f'Seeded in {time.perf_counter() - start:.1f}s\n')
+
+        queries = self.queries(options)
+        before = self.run_queries(db, queries, options['repeat'])
+
+        start = time.perf_counter()
+        for model in MODELS:
+            for statement in index_sql(model):
+                db.execute(statement)
+        db.execute('ANALYZE')
+        db.commit()
+        self.stdout.write(f'Built indexes in {time.perf_counter() - start:.1f}s\n')
+
+        after = self.run_queries(db, queries, options['repeat'])
+
+        for name in queries:
+            b_ms, b_plan = before[name]
+            a_ms, a_plan = after[name]
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(f'  before: {b_ms:9.2f} ms  {b_plan}')
+            self.stdout.write(f'  after:  {a_ms:9.2f} ms  {a_plan}')
+            self.stdout.write(f'  speedup: {b_ms / a_ms if a_ms else float("inf"):.1f}x')
+        db.close()
+
+    def seed(self, db, options):
+        rng = np.random.default_rng(42)
+        rows, days = options['rows'], options['days']
+        self.base = datetime(2024, 1, 1)
+        items = np.array([f'Item_{i:03d}' for i in range(300)], dtype=object)
+        locations = np.array([f'Loc_{i:02d}' for i in range(20)], dtype=object)
+
+        chunk = 500_000
+        for offset in range(0, rows, chunk):
+            n = min(chunk, rows - offset)
+            day = rng.integers(0, days, n)
+            secs = rng.integers(8 * 3600, 22 * 3600, n)
+            stamps = np.datetime64(self.base, 's') + (day * 86400 + secs).astype('timedelta64[s]')
+            ts = np.char.replace(np.datetime_as_string(stamps, unit='s'), 'T', ' ').tolist()
+            qty = rng.integers(1, 6, n)
+            db.executemany(
+                'INSERT INTO sales_salesdata (transaction_date, order_id, item_category, total_price, location_id, quantity_sold) VALUES (?, ?, ?, ?, ?, ?)',
+                zip(ts, (f'{i:08x}' for i in range(offset, offset + n)), rng.choice(items, n).tolist(),
+                    (qty * 7.5).tolist(), rng.choice(locations, n).tolist(), qty.tolist()),
+            )
+
+        runs = 50
+        db.executemany(
+            'INSERT INTO forecast_trainingrun (id, model_id, training_date, metric_mae, metric_mape, model_path) VALUES (?, ?, ?, 0, 0, ?)',
+            [(i + 1, f'{i:032x}', '2024-01-01 00:00:00', '') for i in range(runs)],
+        )
+        run_ids = np.repeat(np.arange(1, runs + 1), len(items) * 14)
+        target_days = np.tile(np.arange(14), runs * len(items))
+        db.executemany(
+            'INSERT INTO forecast_salesprediction (training_run_id, item_category, target_date, predicted_qty) VALUES (?, ?, ?, 1.0)',
+            zip(run_ids.tolist(), np.tile(np.repeat(items, 14), runs).tolist(), ts_strings(target_days + days, self.base)),
+        )
+
+        n_comp = options['competitors']
+        db.executemany(
+            'INSERT INTO competitor_intel_competitor (id, name, google_place_id, location_name) VALUES (?, ?, ?, ?)',
+            [(i + 1, f'Competitor {i}', f'place_{i}', 'Benchmark') for i in range(n_comp)],
+        )
+        comp_ids = np.repeat(np.arange(1, n_comp + 1), days)
+        comp_days = np.tile(np.arange(days), n_comp)
+        db.executemany(
+            'INSERT INTO competitor_intel_competitortraffic (competitor_id, date, estimated_visits, traffic_score) VALUES (?, ?, ?, ?)',
+            zip(comp_ids.tolist(), [(self.base.date() + timedelta(days=int(d))).isoformat() for d in comp_days],
+                rng.integers(50, 200, len(comp_ids)).tolist(), rng.integers(30, 95, len(comp_ids)).tolist()),
+        )
+
+        res_days = np.repeat(np.arange(days), 3)
+        db.executemany(
+            'INSERT INTO reservations_reservationsignal (target_date, booking_count, party_size_total, actual_arrivals, platform) VALUES (?, ?, ?, ?, ?)',
+            zip([(self.base.date() + timedelta(days=int(d))).isoformat() for d in res_days],
+                [50] * len(res_days), [100] * len(res_days), [45] * len(res_days),
+                np.tile(['OpenTable', 'Internal', 'Resy'], days).tolist()),
+        )
+        db.commit()
+
+    def queries(self, options):
+        """The ORM queries the views and upsert paths issue, compiled to SQL."""
+        base = self.base.replace(tzinfo=dt_timezone.utc)
+        mid = base + timedelta(days=options['days'] // 2)
+        mid_day = mid.date()
+        window_start = (base + timedelta(days=options['days'] - 90)).date()
+        querysets = {
+            'Rollup refresh: sales for one day': SalesData.objects.filter(
+                transaction_date__gte=mid, transaction_date__lt=mid + timedelta(days=1)
+            ).values('item_category', 'location_id', 'quantity_sold', 'total_price'),
+            'Dashboard: latest 5 transactions': SalesData.objects.order_by('-transaction_date')[:5],
+            'One item over the last 30 days': SalesData.objects.filter(
+                item_category='Item_042', transaction_date__gte=mid - timedelta(days=30), transaction_date__lt=mid
+            ).values('transaction_date', 'quantity_sold'),
+            'One location over the last 30 days': SalesData.objects.filter(
+                location_id='Loc_07', transaction_date__gte=mid - timedelta(days=30), transaction_date__lt=mid
+            ).values('transaction_date', 'quantity_sold'),
+            'Training Hub: predictions of a run by date': SalesPrediction.objects.filter(
+                training_run_id=25
+            ).order_by('target_date').values('item_category', 'target_date', 'predicted_qty'),
+            'Agent upsert lookup: traffic of competitor/day': CompetitorTraffic.objects.filter(
+                competitor_id=100, date=mid_day
+            ),
+            'Competitor chart: 90 day traffic window': CompetitorTraffic.objects.filter(
+                date__gte=window_start
+            ).values('competitor_id', 'date', 'traffic_score'),
+            'Reservations: 90 day window by date': ReservationSignal.objects.filter(
+                target_date__gte=window_start
+            ).order_by('target_date'),
+        }
+        compiled = {}
+        for name, qs in querysets.items():
+            sql, params = qs.query.sql_with_params()
+            params = [connection.ops.adapt_datetimefield_value(p) if isinstance(p, datetime) else
+                      (p.isoformat() if isinstance(p, date) else p) for p in params]
+            compiled[name] = (sql.replace('%s', '?'), params)
+        return compiled
+
+    def run_queries(self, db, queries, repeat):
+        results = {}
+        for name, (sql, params) in queries.items():
+            plan = ' | '.join(row[-1] for row in db.execute(f'EXPLAIN QUERY PLAN {sql}', params))
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                db.execute(sql, params).fetchall()
+                timings.append((time.perf_counter() - start) * 1000)
+            results[name] = (statistics.median(timings), plan)
+        return results
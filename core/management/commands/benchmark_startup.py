@@ -0,0 +1,34 @@
+import statistics
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.startup import TARGETS, budget_ms, measure
+
+
+class Command(BaseCommand):
+    help = 'Measure cold-start import time of manage.py and the WSGI app (-X importtime) against STARTUP_IMPORT_BUDGET_MS'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=3, help='Fresh interpreters per target; the median is reported')
+        parser.add_argument('--top', type=int, default=5, help='Slowest top-level imports to list')
+
+    def handle(self, *args, **options):
+        failures = []
+        for target in TARGETS:
+            runs = [measure(target) for _ in range(options['repeat'])]
+            import_ms = statistics.median(r['import_ms'] for r in runs)
+            wall_ms = statistics.median(r['wall_ms'] for r in runs)
+            heavy = runs[-1]['heavy']
+
+            self.stdout.write(self.style.MIGRATE_HEADING(target))
+            self.stdout.write(f'  imports {import_ms:7.1f}ms  wall {wall_ms:7.1f}ms  (budget {budget_ms(target)}ms)')
+            for name, ms in runs[-1]['top'][:options['top']]:
+                self.stdout.write(f'    {ms:7.1f}ms  {name}')
+            if heavy:
+                failures.append(f'{target} imports {", ".join(heavy)} at startup')
+            if import_ms > budget_ms(target):
+                failures.append(f'{target} imports take {import_ms:.0f}ms, over the {budget_ms(target)}ms budget')
+
+        if failures:
+            raise CommandError('; '.join(failures))
+        self.stdout.write(self.style.SUCCESS('Startup within budget'))
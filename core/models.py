@@ -1,3 +1,14 @@
 from django.db import models
 
-# Create your models here.
+
+class DataVersion(models.Model):
+    """
+    Write counter of one tracked model (core.caching.TRACKED_MODELS), bumped
+    in the same transaction as the write, so cache keys built from it change
+    exactly when the data does, in every process.
+    """
+    name = models.CharField(max_length=100, unique=True)  # app_label.ModelName
+    version = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
@@ -0,0 +1,18 @@
+"""Helpers shared by the dashboard query modules (reservations.queries, competitor_intel.queries)."""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Max
+
+
+def window_start(queryset, field, days=None):
+    """
+    First day of the dashboard window: the last `days` (DASHBOARD_WINDOW_DAYS)
+    days up to the latest `field` value in `queryset`, or None if it is empty.
+    Anchored on the data rather than today so stale demo data still charts.
+    """
+    days = days or settings.DASHBOARD_WINDOW_DAYS
+    latest = queryset.aggregate(latest=Max(field))['latest']
+    if latest is None:
+        return None
+    return latest - timedelta(days=days - 1)
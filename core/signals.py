@@ -0,0 +1,21 @@
+from django.apps import apps
+from django.db.models.signals import post_delete, post_save
+
+from .caching import TRACKED_MODELS, bump_versions
+
+# Deletes of these are not tracked: a post_delete receiver would make every
+# cascading delete load the rows. Predictions only go with their TrainingRun,
+# whose own counter covers them.
+SAVE_ONLY = {'forecast.SalesPrediction'}
+
+
+def bump_data_version(sender, **kwargs):
+    bump_versions(sender)
+
+
+def connect_data_versions():
+    for label in TRACKED_MODELS:
+        model = apps.get_model(label)
+        post_save.connect(bump_data_version, sender=model, dispatch_uid=f'data_version_save:{label}')
+        if label not in SAVE_ONLY:
+            post_delete.connect(bump_data_version, sender=model, dispatch_uid=f'data_version_delete:{label}')
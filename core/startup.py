@@ -0,0 +1,73 @@
+"""
+Cold-start import cost.
+
+Views and app signals import the scientific stack (pandas, scikit-learn,
+plotly, openai, ...) at the point of use, so URL resolution, `manage.py`
+commands and worker boot don't pay for it. This module measures that: it runs
+a fresh interpreter with `-X importtime` for each startup target and parses
+the report into total import time and the modules that were loaded.
+
+Used by `manage.py benchmark_startup`, which checks STARTUP_IMPORT_BUDGET_MS,
+and the guard test in core.tests, which checks that no heavy module loads.
+"""
+import re
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+
+# Must not be imported while the project starts up
+HEAVY_MODULES = ('pandas', 'numpy', 'scipy', 'sklearn', 'plotly', 'openai', 'pyarrow', 'joblib')
+
+# Startup paths: the management command entry point and the WSGI app with its URLconf loaded
+TARGETS = {
+    'check': ['manage.py', 'check'],
+    'wsgi': ['-c', 'import config.wsgi; from django.urls import get_resolver; get_resolver().url_patterns'],
+}
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$')
+
+
+def parse_importtime(report):
+    """
+    ({module: cumulative microseconds}, {top-level module: cumulative
+    microseconds}) from an `-X importtime` report. Nested imports are counted
+    in their parent's cumulative time, so the top-level values sum to the total.
+    """
+    modules, top_level = {}, {}
+    for line in report.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        _, cumulative, indent, name = match.groups()
+        modules[name] = int(cumulative)
+        if not indent:
+            top_level[name] = int(cumulative)
+    return modules, top_level
+
+
+def measure(target):
+    """Runs `target` in a fresh interpreter; returns wall/import ms and the heavy modules it loaded."""
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', *TARGETS[target]],
+        cwd=settings.BASE_DIR, capture_output=True, text=True,
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    if proc.returncode != 0:
+        raise RuntimeError(f'{target} exited with {proc.returncode}: {proc.stderr[-2000:]}')
+
+    modules, top_level = parse_importtime(proc.stderr)
+    top = sorted(top_level.items(), key=lambda item: item[1], reverse=True)
+    return {
+        'target': target,
+        'wall_ms': wall_ms,
+        'import_ms': sum(top_level.values()) / 1000,
+        'heavy': sorted({name.split('.')[0] for name in modules} & set(HEAVY_MODULES)),
+        'top': [(name, us / 1000) for name, us in top[:10]],
+    }
+
+
+def budget_ms(target):
+    return settings.STARTUP_IMPORT_BUDGET_MS[target]
@@ -1,3 +1,186 @@
-from django.test import TestCase
+import os
+import tempfile
+from datetime import date, timedelta
+from io import StringIO
 
-# Create your tests here.
+import numpy as np
+import plotly.graph_objects as go
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.caching import bump_versions, data_versions
+from core.charts import figure_json, lttb
+from core.instrumentation import REQUEST_SECONDS, SQL_QUERIES, STAGE_SECONDS, reset_metrics
+from core.startup import TARGETS, measure
+from reservations.models import ReservationSignal
+from sales.bom import get_bom_explosion
+from sales.models import BillOfMaterial, Ingredient
+
+
+class StartupImportTests(SimpleTestCase):
+    """Cold start must not pull in the scientific stack; see core.startup."""
+
+    def test_startup_skips_heavy_imports(self):
+        for target in TARGETS:
+            with self.subTest(target=target):
+                result = measure(target)
+                # Milliseconds depend on the machine; benchmark_startup checks the budget
+                self.assertEqual(result['heavy'], [], f'{target} imports heavy modules at startup')
+
+
+@override_settings(CHART_MAX_POINTS=50)
+class ChartTests(SimpleTestCase):
+    def test_lttb_keeps_the_ends_and_the_peaks(self):
+        x = np.arange(500)
+        y = np.sin(x / 20.0)
+        y[250] = 10
+        keep = lttb(x, y, 50)
+        self.assertEqual(len(keep), 50)
+        self.assertEqual((keep[0], keep[-1]), (0, 499))
+        self.assertTrue((np.diff(keep) > 0).all())
+        self.assertIn(250, keep)
+
+    def test_long_traces_are_reduced_and_short_ones_pass_through(self):
+        days = [date(2024, 1, 1) + timedelta(days=d) for d in range(400)]
+        fig = go.Figure([
+            go.Scatter(x=days, y=list(range(400)), text=[f'day {d}' for d in range(400)], name='long'),
+            go.Scatter(x=days[:20], y=list(range(20)), name='short'),
+        ])
+        figure_json(fig)
+        # The figure is downsampled in place before it is serialized
+        long, short = fig.data
+        self.assertEqual(len(long.x), 50)
+        self.assertEqual((str(long.x[0]), str(long.x[-1])), ('2024-01-01', days[-1].isoformat()))
+        self.assertEqual((long.y[0], long.y[-1]), (0, 399))
+        # Per-point attributes follow the kept points
+        self.assertEqual(list(long.text), [f'day {y}' for y in long.y])
+        self.assertEqual(list(short.y), list(range(20)))
+        self.assertEqual(len(short.x), 20)
+
+    def test_json_cannot_close_the_script_tag(self):
+        fig = go.Figure([go.Scatter(x=[1, 2], y=[1, 2], name='</script><b>')])
+        self.assertNotIn('</script>', figure_json(fig))
+
+
+class BenchmarkQueryPlansTests(TransactionTestCase):
+    """The index DDL is collected with the schema editor, which cannot run inside TestCase's atomic block."""
+
+    def test_existing_db_is_kept_without_overwrite(self):
+        path = os.path.join(self.enterContext(tempfile.TemporaryDirectory()), 'keep.sqlite3')
+        with open(path, 'w') as f:
+            f.write('not scratch')
+        with self.assertRaises(CommandError):
+            call_command('benchmark_query_plans', db=path, rows=10, days=5, stdout=StringIO())
+        with open(path) as f:
+            self.assertEqual(f.read(), 'not scratch')
+
+    def test_overwrite_replaces_the_file(self):
+        path = os.path.join(self.enterContext(tempfile.TemporaryDirectory()), 'scratch.sqlite3')
+        open(path, 'w').close()
+        call_command('benchmark_query_plans', db=path, overwrite=True, rows=100, days=30,
+                     competitors=2, repeat=1, stdout=StringIO())
+        self.assertGreater(os.path.getsize(path), 0)
+
+
+@override_settings(VIEW_CACHE_ENABLED=False)
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        reset_metrics()
+        self.client.force_login(User.objects.create_user('admin', password='pw', is_staff=True))
+
+    def test_request_sql_and_stages_are_recorded(self):
+        self.client.get(reverse('competitor_dashboard'))
+
+        count, _ = REQUEST_SECONDS.samples(view='competitor_dashboard', method='GET', status=200)
+        self.assertEqual(count, 1)
+        self.assertGreater(SQL_QUERIES.samples(view='competitor_dashboard')[1], 0)
+        for name in ('fetch', 'chart', 'render'):
+            self.assertEqual(STAGE_SECONDS.samples(view='competitor_dashboard', stage=name)[0], 1)
+
+        body = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn(
+            'foreat_request_duration_seconds_count{view="competitor_dashboard",method="GET",status="200"} 1', body,
+        )
+        self.assertIn('foreat_stage_duration_seconds_bucket{view="competitor_dashboard",stage="render",le="+Inf"} 1', body)
+        self.assertIn('# TYPE foreat_request_peak_memory_bytes histogram', body)
+
+    @override_settings(INSTRUMENTATION_SLOW_REQUEST_MS=0)
+    def test_slow_requests_are_logged_with_stages(self):
+        with self.assertLogs('core.instrumentation', 'WARNING') as logs:
+            self.client.get(reverse('competitor_dashboard'))
+        self.assertIn('(competitor_dashboard) 200', logs.output[0])
+        self.assertIn('stages: fetch', logs.output[0])
+
+    def test_metrics_access(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+        self.client.force_login(User.objects.create_user('analyst', password='pw'))
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.client.logout()
+        # No token configured: closed, not open
+        self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer ').status_code, 403)
+        with self.settings(INSTRUMENTATION_METRICS_TOKEN='secret'):
+            self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+            self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret').status_code, 200)
+        with self.settings(INSTRUMENTATION_METRICS_PUBLIC=True):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+
+
+class DataVersionCacheTests(TestCase):
+    def setUp(self):
+        caches[settings.VIEW_CACHE_ALIAS].clear()
+        self.client.force_login(User.objects.create_user('analyst', password='pw'))
+        ReservationSignal.objects.create(
+            target_date=date(2025, 3, 1), booking_count=10, party_size_total=20, actual_arrivals=8, platform='Internal',
+        )
+
+    def load(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('reservation_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        return response.context['chart_bookings'], len(queries)
+
+    def test_repeat_loads_are_served_from_cache(self):
+        chart, cold = self.load()
+        again, warm = self.load()
+        self.assertEqual(again, chart)
+        self.assertLess(warm, cold)
+
+    def test_writes_invalidate_exactly(self):
+        chart, _ = self.load()
+        # Signal path
+        ReservationSignal.objects.create(
+            target_date=date(2025, 3, 2), booking_count=30, party_size_total=60, actual_arrivals=20, platform='Internal',
+        )
+        after_save, _ = self.load()
+        self.assertNotEqual(after_save, chart)
+        self.assertIn('2025-03-02', after_save)
+
+        # Bulk path, which sends no signals, bumps explicitly
+        ReservationSignal.objects.bulk_create([ReservationSignal(
+            target_date=date(2025, 3, 3), booking_count=5, party_size_total=10, actual_arrivals=5, platform='Internal',
+        )])
+        bump_versions(ReservationSignal)
+        after_bulk, _ = self.load()
+        self.assertIn('2025-03-03', after_bulk)
+
+        # Writes to other models leave the entry alone
+        versions = data_versions(ReservationSignal)
+        Ingredient.objects.create(name='Flour', unit='kg')
+        self.assertEqual(data_versions(ReservationSignal), versions)
+        self.assertEqual(self.load()[0], after_bulk)
+
+    def test_bom_explosion_follows_bom_writes(self):
+        flour = Ingredient.objects.create(name='Flour', unit='kg')
+        BillOfMaterial.objects.create(item_category='Pizza', ingredient=flour, quantity_per_unit=0.5)
+        self.assertEqual(get_bom_explosion().requirements({'Pizza': 2})[0]['qty'], 1.0)
+
+        BillOfMaterial.objects.filter(item_category='Pizza').first().delete()
+        BillOfMaterial.objects.create(item_category='Pizza', ingredient=flour, quantity_per_unit=0.25)
+        self.assertEqual(get_bom_explosion().requirements({'Pizza': 2})[0]['qty'], 0.5)
@@ -4,4 +4,5 @@ from . import views
 urlpatterns = [
     path('', views.dashboard, name='dashboard'),
     path('accounts/', include('django.contrib.auth.urls')),
+    path('metrics', views.metrics, name='metrics'),
 ]
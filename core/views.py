@@ -1,17 +1,40 @@
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
-from sales.models import SalesData
+from sales.models import SalesData, DailySalesRollup
 from forecast.models import TrainingRun, SalesPrediction
 from django.db.models import Sum
+from .caching import cached
 
 @login_required
 def dashboard(request):
-    total_sales = SalesData.objects.aggregate(Sum('total_price'))['total_price__sum'] or 0
+    context = cached('core:dashboard', [SalesData, TrainingRun], dashboard_context)
+    return render(request, 'core/dashboard.html', context)
+
+
+def dashboard_context():
+    total_sales = DailySalesRollup.objects.aggregate(Sum('revenue'))['revenue__sum'] or 0
     recent_training = TrainingRun.objects.last()
     
-    context = {
+    return {
         'total_sales': total_sales,
         'recent_training': recent_training,
-        'recent_sales': SalesData.objects.order_by('-transaction_date')[:5]
+        'recent_sales': list(SalesData.objects.order_by('-transaction_date')[:5])
     }
-    return render(request, 'core/dashboard.html', context)
\ No newline at end of file
+
+
+def metrics(request):
+    """Request histograms of this process in the Prometheus text format (core.instrumentation)."""
+    from .instrumentation import render_metrics
+
+    # Staff, a scraper with the bearer token, or anyone when explicitly public
+    token = settings.INSTRUMENTATION_METRICS_TOKEN
+    allowed = (
+        settings.INSTRUMENTATION_METRICS_PUBLIC
+        or request.user.is_staff
+        or (token and request.headers.get('Authorization') == f'Bearer {token}')
+    )
+    if not allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -1,14 +1,32 @@
 from django.contrib import admin
-from .models import TrainingRun, SalesPrediction
+from .models import TrainingRun, SalesPrediction, TrainingJob, BacktestResult, TuningResult
 
 @admin.register(TrainingRun)
 class TrainingRunAdmin(admin.ModelAdmin):
-    list_display = ('id', 'training_date', 'metric_mae', 'metric_mape')
-    list_filter = ('training_date',)
+    list_display = ('id', 'mode', 'engine', 'parent', 'training_date', 'metric_mae', 'metric_mape', 'fit_seconds', 'predict_ms', 'artifact_bytes')
+    list_filter = ('mode', 'engine', 'training_date')
     readonly_fields = ('training_date',)
 
 @admin.register(SalesPrediction)
 class SalesPredictionAdmin(admin.ModelAdmin):
-    list_display = ('item_category', 'target_date', 'predicted_qty', 'training_run')
-    list_filter = ('item_category', 'target_date', 'training_run')
-    search_fields = ('item_category',)
\ No newline at end of file
+    list_display = ('item_category', 'location_id', 'target_date', 'predicted_qty', 'training_run')
+    list_filter = ('item_category', 'location_id', 'target_date', 'training_run')
+    search_fields = ('item_category',)
+
+@admin.register(TrainingJob)
+class TrainingJobAdmin(admin.ModelAdmin):
+    list_display = ('job_id', 'kind', 'status', 'progress', 'stage', 'created_at', 'finished_at')
+    list_filter = ('kind', 'status')
+    readonly_fields = ('job_id', 'created_at', 'started_at', 'finished_at')
+
+@admin.register(BacktestResult)
+class BacktestResultAdmin(admin.ModelAdmin):
+    list_display = ('label', 'fold', 'cutoff', 'data_rows', 'mae', 'mape', 'fit_seconds', 'predict_ms', 'peak_memory_mb', 'created_at')
+    list_filter = ('label', 'created_at')
+    readonly_fields = ('batch_id', 'created_at')
+
+@admin.register(TuningResult)
+class TuningResultAdmin(admin.ModelAdmin):
+    list_display = ('engine', 'created_at', 'mae', 'baseline_mae', 'params', 'n_fits', 'elapsed_seconds', 'budget_exhausted')
+    list_filter = ('engine', 'created_at')
+    readonly_fields = ('created_at',)
@@ -0,0 +1,144 @@
+"""
+Rolling-origin backtesting for the global forecast model.
+
+Each fold trains on every day up to a calendar cutoff and forecasts the next
+`horizon` days recursively, exactly as a production run would, then scores
+against what actually sold. Cutoffs step back `horizon` days from the end of
+the data, so folds never overlap. Folds are independent and run in parallel
+over joblib workers; each records accuracy, fit time, predict latency and peak
+memory to BacktestResult.
+"""
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.metrics import mean_absolute_error
+
+from django.conf import settings
+from sales.ingest import rss_bytes
+from sales.models import SalesData
+from . import features
+from .models import BacktestResult
+from .training import TrainingError, encode_features, make_forecast_model, mape_nonzero, recursive_forecast
+
+
+class PeakMemory:
+    """Samples this process's RSS on a background thread; `peak_mb` is growth over the start."""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+
+    def __enter__(self):
+        self._start = self._peak = rss_bytes()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self._peak = max(self._peak, rss_bytes())
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._peak = max(self._peak, rss_bytes())
+        self.peak_mb = (self._peak - self._start) / 1024 / 1024
+
+
+def fold_cutoffs(dates, n_folds, horizon, min_train_days):
+    """Calendar cutoffs (last training day) for each fold, oldest first."""
+    last = dates.max()
+    cutoffs = [last - timedelta(days=horizon * k) for k in range(n_folds, 0, -1)]
+    cutoffs = [c for c in cutoffs if (c - dates.min()).days + 1 >= min_train_days]
+    if not cutoffs:
+        raise TrainingError(
+            f'Need at least {min_train_days + horizon} days of sales to backtest, have {len(dates)}.'
+        )
+    return cutoffs
+
+
+def run_fold(fold, panel, exog, cutoff, horizon, n_jobs, params=None):
+    """Fits and scores one fold; runs in a joblib worker."""
+    history = panel.loc[:cutoff]
+    actual = panel.loc[cutoff + timedelta(days=1):cutoff + timedelta(days=horizon)]
+    categories = list(panel.columns)
+
+    with PeakMemory() as memory:
+        feats = features.compute_features(history, exog)
+        X = encode_features(feats, categories)
+
+        start = time.perf_counter()
+        model = make_forecast_model(n_jobs=n_jobs, params=params)
+        model.fit(X, feats['quantity'])
+        fit_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        forecast = recursive_forecast(model, history, exog, horizon, categories)
+        predict_ms = (time.perf_counter() - start) * 1000
+
+    # Forecast rows are date-major like the panel, so they line up with actual
+    y_true = actual.to_numpy().ravel()
+    y_pred = forecast['predicted_qty'].to_numpy()
+    return {
+        'fold': fold,
+        'cutoff': cutoff.date(),
+        'train_days': len(history),
+        'mae': mean_absolute_error(y_true, y_pred),
+        'mape': mape_nonzero(y_true, y_pred),
+        'fit_seconds': fit_seconds,
+        'predict_ms': predict_ms,
+        'peak_memory_mb': memory.peak_mb,
+    }
+
+
+def run_backtest(panel=None, exog=None, n_folds=3, horizon=None, min_train_days=None,
+                 label='db', data_rows=0, n_jobs=None):
+    """
+    Backtests on `panel` (date x item quantities; default: the sales rollup)
+    and stores one BacktestResult per fold. Returns the saved rows.
+    """
+    horizon = horizon or settings.FORECAST_HORIZON_DAYS
+    min_train_days = min_train_days or 2 * features.MAX_LOOKBACK
+    n_jobs = settings.BACKTEST_N_JOBS if n_jobs is None else n_jobs
+
+    # 1. Fetch Data
+    if panel is None:
+        panel = features.load_sales_panel()
+        if panel.empty:
+            raise TrainingError('No sales data to backtest on.')
+        exog = features.load_exogenous(panel.index.min(), panel.index.max())
+        data_rows = SalesData.objects.count()
+
+    # 2. Folds in parallel; each fit is single-threaded so workers don't oversubscribe.
+    # The model is configured like a training run would be, tuned params included.
+    from .tuning import tuned_params
+    params = tuned_params('random_forest')
+    cutoffs = fold_cutoffs(panel.index, n_folds, horizon, min_train_days)
+    fit_jobs = -1 if n_jobs == 1 else 1
+    folds = Parallel(n_jobs=n_jobs)(
+        delayed(run_fold)(i, panel, exog, cutoff, horizon, fit_jobs, params)
+        for i, cutoff in enumerate(cutoffs, start=1)
+    )
+
+    # 3. Save Results
+    batch_id = uuid.uuid4()
+    return BacktestResult.objects.bulk_create([
+        BacktestResult(
+            batch_id=batch_id, label=label, data_rows=data_rows,
+            n_series=panel.shape[1], horizon=horizon, **fold,
+        )
+        for fold in folds
+    ])
+
+
+def summarize(results):
+    """Mean metrics over the folds of one backtest."""
+    return {
+        name: float(np.mean([getattr(r, name) for r in results]))
+        for name in ('mae', 'mape', 'fit_seconds', 'predict_ms', 'peak_memory_mb')
+    }
@@ -0,0 +1,102 @@
+"""
+Estimator engines for the training pipelines.
+
+Every training run picks its estimator by name (TrainingRun.ENGINE_CHOICES)
+and records it, so runs of different engines can be compared on accuracy and
+on cost (fit time, predict latency, artifact size) side by side.
+
+- random_forest: the original RandomForestRegressor. Items enter the model
+  as one-hot columns.
+- hist_gb: HistGradientBoostingRegressor. Inputs are binned into at most 256
+  levels, so fit and predict are much faster on long histories, and items
+  enter as one native categorical column instead of one column per item,
+  which keeps the matrix narrow and the artifact small. That caps the menu
+  at MAX_NATIVE_CATEGORIES items. Boosted trees are fitted in sequence, so
+  their spread says nothing about uncertainty; prediction intervals come
+  from a quantile-loss model per bound (QuantileBoostingRegressor).
+"""
+from django.conf import settings
+from sklearn.base import BaseEstimator, RegressorMixin, clone
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+
+DEFAULT_ENGINE = 'random_forest'
+# Most categories a native categorical column may have (HistGradientBoostingRegressor)
+MAX_NATIVE_CATEGORIES = 255
+
+
+class RandomForestEngine:
+    name = 'random_forest'
+    categorical = False
+    # Candidate params for forecast.tuning
+    search_space = {
+        'n_estimators': [50, 100, 200],
+        'max_depth': [None, 8, 16],
+        'min_samples_leaf': [1, 3, 5],
+        'max_features': [1.0, 0.5, 'sqrt'],
+    }
+
+    def make(self, n_jobs=-1, intervals=True, **params):
+        # Intervals come from the spread of the trees; nothing extra to fit
+        params = dict({'n_estimators': 100, 'random_state': 42}, **params)
+        return RandomForestRegressor(n_jobs=n_jobs, **params)
+
+
+class HistGradientBoostingEngine:
+    name = 'hist_gb'
+    # Categorical-dtype columns (the item) are split on natively
+    categorical = True
+    search_space = {
+        'learning_rate': [0.03, 0.1, 0.2],
+        'max_iter': [100, 200, 400],
+        'max_leaf_nodes': [15, 31, 63],
+        'min_samples_leaf': [10, 20, 40],
+        'l2_regularization': [0.0, 0.1, 1.0],
+    }
+
+    def make(self, n_jobs=-1, intervals=True, **params):
+        """The regressor; with `intervals`, wrapped to also fit the bound models."""
+        # Threads come from OpenMP (OMP_NUM_THREADS), not joblib; n_jobs is ignored
+        params = dict({'max_iter': 200, 'learning_rate': 0.1, 'random_state': 42}, **params)
+        model = HistGradientBoostingRegressor(categorical_features='from_dtype', **params)
+        if not intervals:
+            return model
+        return QuantileBoostingRegressor(model, quantiles=settings.FORECAST_INTERVAL_QUANTILES)
+
+
+class QuantileBoostingRegressor(RegressorMixin, BaseEstimator):
+    """
+    `estimator` for the point forecast plus one quantile-loss copy of it per
+    entry of `quantiles`, fitted on the same rows. predict() is the point
+    model alone; predict_interval() adds the bounds.
+    """
+
+    def __init__(self, estimator=None, quantiles=(0.1, 0.9)):
+        self.estimator = estimator
+        self.quantiles = quantiles
+
+    def fit(self, X, y):
+        self.estimator_ = clone(self.estimator).fit(X, y)
+        self.bounds_ = [
+            clone(self.estimator).set_params(loss='quantile', quantile=q).fit(X, y)
+            for q in self.quantiles
+        ]
+        return self
+
+    def predict(self, X):
+        return self.estimator_.predict(X)
+
+    def predict_interval(self, X):
+        """(point, lower, upper) predictions for the rows of X."""
+        lower, upper = (model.predict(X) for model in self.bounds_)
+        return self.predict(X), lower, upper
+
+
+ENGINES = {engine.name: engine for engine in (RandomForestEngine(), HistGradientBoostingEngine())}
+
+
+def get_engine(name=None):
+    """Engine registered under `name` (default: DEFAULT_ENGINE)."""
+    try:
+        return ENGINES[name or DEFAULT_ENGINE]
+    except KeyError:
+        raise ValueError(f'Unknown engine: {name}')
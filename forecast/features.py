@@ -0,0 +1,189 @@
+"""
+Time-series feature engineering for the forecast models.
+
+Sales are laid out as a dense panel: one row per calendar day, one column per
+series (item_category, or item_category x location_id), zero-filled where a
+series sold nothing. Lags and rolling statistics are computed with shifts and
+rolling windows over the whole panel at once, then flattened to one row per
+(date, series) and joined with the daily market signals.
+
+Every feature looks back at most MAX_LOOKBACK days, so features for newly
+appended days only need that tail of history: compute_features(panel,
+start=...) builds rows from `start` on (see forecast.incremental).
+"""
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+from django.db.models import Avg, Count, Max, Sum
+from django.db.models.functions import TruncDate
+
+from market_signals.models import WeatherSignal, LocalEvent
+from reservations.models import ReservationSignal
+from . import snapshots
+
+LAGS = (1, 7, 14, 28)
+WINDOWS = (7, 14, 28)
+MAX_LOOKBACK = max(max(LAGS), max(WINDOWS) + 1)
+
+CALENDAR_FEATURES = ['dow', 'month', 'day', 'is_weekend', 'is_month_start', 'is_month_end']
+EXOGENOUS_FEATURES = ['temperature', 'precipitation', 'event_impact', 'event_count', 'bookings', 'party_size']
+
+FEATURE_CONFIG = {
+    'lags': list(LAGS),
+    'windows': list(WINDOWS),
+    'calendar': CALENDAR_FEATURES,
+    'exogenous': EXOGENOUS_FEATURES,
+}
+
+
+def feature_columns():
+    lag_cols = [f'lag_{lag}' for lag in LAGS]
+    roll_cols = [f'roll_{stat}_{w}' for w in WINDOWS for stat in ('mean', 'std')]
+    return lag_cols + roll_cols + CALENDAR_FEATURES + EXOGENOUS_FEATURES
+
+
+def load_sales_panel(by_location=False, start_date=None, end_date=None):
+    """Dense date x series panel of daily quantity from the rollup snapshot."""
+    keys = ['item_category', 'location_id'] if by_location else ['item_category']
+    df = snapshots.rollup_frame()
+    if start_date is not None:
+        df = df[df['date'] >= pd.Timestamp(start_date)]
+    if end_date is not None:
+        df = df[df['date'] <= pd.Timestamp(end_date)]
+    if df.empty:
+        return pd.DataFrame()
+
+    panel = df.pivot_table(index='date', columns=keys, values='quantity', aggfunc='sum', fill_value=0, observed=True)
+    # Plain string labels rather than categoricals, so series keys are ordinary values
+    if by_location:
+        panel.columns = pd.MultiIndex.from_tuples(list(panel.columns), names=keys)
+    else:
+        panel.columns = pd.Index(list(panel.columns), name='item_category', dtype=object)
+    panel = panel.sort_index(axis=1)
+    full_range = pd.date_range(panel.index.min(), panel.index.max(), freq='D')
+    return panel.reindex(full_range, fill_value=0).astype(float)
+
+
+def load_exogenous(start_date, end_date):
+    """
+    Daily weather, local events and reservations for [start_date, end_date].
+    Days without events/bookings are 0; weather gaps carry the last reading
+    forward, which also covers future days in the forecast horizon.
+    """
+    dates = pd.date_range(start_date, end_date, freq='D')
+    exog = pd.DataFrame(index=dates, columns=EXOGENOUS_FEATURES, dtype=float)
+
+    weather = (
+        WeatherSignal.objects.annotate(date=TruncDate('timestamp'))
+        .filter(date__range=(start_date, end_date))
+        .values('date').annotate(temperature=Avg('temperature'), precipitation=Sum('precipitation'))
+        .order_by()
+    )
+    events = (
+        LocalEvent.objects.filter(date__range=(start_date, end_date))
+        .values('date').annotate(event_impact=Sum('impact_score'), event_count=Count('id'))
+        .order_by()
+    )
+    bookings = (
+        ReservationSignal.objects.filter(target_date__range=(start_date, end_date))
+        .values('target_date').annotate(bookings=Sum('booking_count'), party_size=Sum('party_size_total'))
+        .order_by()
+    )
+
+    for rows, date_key, cols in [
+        (weather, 'date', ['temperature', 'precipitation']),
+        (events, 'date', ['event_impact', 'event_count']),
+        (bookings, 'target_date', ['bookings', 'party_size']),
+    ]:
+        frame = pd.DataFrame(list(rows))
+        if frame.empty:
+            continue
+        frame.index = pd.to_datetime(frame.pop(date_key))
+        exog.update(frame[cols].reindex(dates))
+
+    exog[['temperature', 'precipitation']] = exog[['temperature', 'precipitation']].ffill()
+    return exog.fillna(0.0)
+
+
+def exogenous_watermark():
+    """
+    (row count, max id) per market-signal table. Moves when signals are added
+    or removed; edits to existing rows don't, so retrain with force after those.
+    """
+    return {
+        model.__name__: list(model.objects.aggregate(rows=Count('id'), last_id=Max('id')).values())
+        for model in (WeatherSignal, LocalEvent, ReservationSignal)
+    }
+
+
+def calendar_flags(dates):
+    return {
+        'dow': dates.dayofweek,
+        'month': dates.month,
+        'day': dates.day,
+        'is_weekend': dates.dayofweek >= 5,
+        'is_month_start': dates.is_month_start,
+        'is_month_end': dates.is_month_end,
+    }
+
+
+def compute_features(panel, exog=None, start=0, stop=None):
+    """
+    Features for panel rows [start:stop], one output row per (date, series), in
+    date-major order. Only the MAX_LOOKBACK rows before `start` are read, so
+    computing a new day costs the same regardless of history length.
+    Early rows without enough history get NaN lags.
+    """
+    lo = max(0, start - MAX_LOOKBACK)
+    window = panel.iloc[lo:stop]
+    offset = start - lo
+    values = window.to_numpy(dtype=float)
+    n_rows, n_series = values.shape
+    dates = window.index[offset:]
+    n_out = len(dates)
+
+    cols = {}
+    for lag in LAGS:
+        shifted = np.full((n_rows, n_series), np.nan)
+        if lag < n_rows:
+            shifted[lag:] = values[:-lag]
+        cols[f'lag_{lag}'] = shifted[offset:]
+
+    # Rolling stats over days strictly before the target day
+    previous = window.shift(1)
+    for w in WINDOWS:
+        rolling = previous.rolling(w, min_periods=1)
+        cols[f'roll_mean_{w}'] = rolling.mean().to_numpy()[offset:]
+        cols[f'roll_std_{w}'] = rolling.std().to_numpy()[offset:]
+
+    # Per-date features are repeated across series
+    per_date = {name: np.asarray(v, dtype=float) for name, v in calendar_flags(dates).items()}
+    if exog is not None:
+        aligned = exog.reindex(dates)
+        for name in EXOGENOUS_FEATURES:
+            per_date[name] = aligned[name].to_numpy(dtype=float)
+    else:
+        for name in EXOGENOUS_FEATURES:
+            per_date[name] = np.zeros(n_out)
+
+    key_names = [name or 'series' for name in panel.columns.names]
+    out = {'date': np.repeat(dates.to_numpy(), n_series)}
+    if len(key_names) == 1:
+        out[key_names[0]] = np.tile(panel.columns.to_numpy(dtype=object), n_out)
+    else:
+        for level, name in enumerate(key_names):
+            out[name] = np.tile(panel.columns.get_level_values(level).to_numpy(dtype=object), n_out)
+    out['quantity'] = values[offset:].ravel()
+    for name, arr in cols.items():
+        out[name] = arr.ravel().astype(np.float32)
+    for name, arr in per_date.items():
+        out[name] = np.repeat(arr, n_series).astype(np.float32)
+
+    return pd.DataFrame(out)
+
+
+def extend_panel(panel, days):
+    """Panel with `days` NaN rows appended, to be filled by a recursive forecast."""
+    future = pd.date_range(panel.index.max() + timedelta(days=1), periods=days, freq='D')
+    return pd.concat([panel, pd.DataFrame(np.nan, index=future, columns=panel.columns)])
@@ -0,0 +1,157 @@
+"""
+Per (item_category, location_id) forecasting.
+
+Every series gets its own small RandomForest on calendar features. The fits
+are independent, so they fan out over a joblib process pool and wall-clock
+time scales with core count. Store-level forecasts are reconciled bottom-up:
+the all-location total for an item is the sum of its store forecasts, so
+totals and store numbers always agree.
+"""
+import time
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.metrics import mean_absolute_error
+
+from django.conf import settings
+from .engines import get_engine
+from .features import load_sales_panel
+from .training import TrainingError, mape_nonzero, predict_interval, save_run
+
+CALENDAR_COLUMNS = ['dow', 'month', 'day']
+VALUE_COLUMNS = ['predicted_qty', 'confidence_lower', 'confidence_upper']
+TEST_FRACTION = 0.2
+
+
+def calendar_matrix(dates):
+    return np.column_stack([dates.dayofweek, dates.month, dates.day]).astype(float)
+
+
+def load_series_panel():
+    """Dense date x (item_category, location_id) matrix of daily quantities, zero-filled."""
+    panel = load_sales_panel(by_location=True)
+    if panel.empty:
+        raise TrainingError('No sales data to train on.')
+    return panel
+
+
+def make_series_model(engine=None, params=None):
+    return get_engine(engine).make(n_jobs=1, **(params or {}))
+
+
+def fit_series(key, y, calendar, future_calendar, test_size, engine=None, params=None):
+    """
+    Fits one series; runs in a joblib worker. The forecast is a 3 x horizon
+    array of point, lower and upper predictions; `forecast_seconds` is the
+    time it took.
+    """
+    split = len(y) - test_size
+    model = make_series_model(engine, params)
+    model.fit(calendar[:split], y[:split])
+    holdout = model.predict(calendar[split:]) if test_size else np.empty(0)
+    start = time.perf_counter()
+    forecast = np.stack(predict_interval(model, future_calendar))
+    forecast_seconds = time.perf_counter() - start
+    return key, y[split:], holdout, forecast, model, forecast_seconds
+
+
+def reconcile(store_forecast):
+    """
+    Adds bottom-up all-location totals (location_id=None) per item and date.
+    Summed store bounds make a conservative interval for the total: they
+    assume stores are off in the same direction on the same day.
+    """
+    totals = store_forecast.groupby(['item_category', 'target_date'], as_index=False)[VALUE_COLUMNS].sum(min_count=1)
+    totals['location_id'] = None
+    return pd.concat([store_forecast, totals], ignore_index=True)
+
+
+def train_hierarchical(progress, horizon, fingerprint='', engine=None):
+    # 1. Fetch Data
+    progress(5, 'Fetching sales data')
+    panel = load_series_panel()
+    series = list(panel.columns)
+
+    # 2. Feature Engineering (shared by all series)
+    progress(15, 'Building features')
+    calendar = calendar_matrix(panel.index)
+    last_date = panel.index.max().tz_localize('UTC')
+    future_dates = pd.date_range(last_date + timedelta(days=1), periods=horizon, freq='D')
+    future_calendar = calendar_matrix(future_dates)
+    test_size = int(len(panel) * TEST_FRACTION)
+
+    # 3. Train every series in parallel
+    progress(20, f'Fitting {len(series)} series')
+    # Params of the latest tuning search for this engine, if any (forecast.tuning)
+    from .tuning import tuned_params
+    params = tuned_params(get_engine(engine).name)
+    start = time.perf_counter()
+    tasks = (
+        delayed(fit_series)(key, panel[key].to_numpy(), calendar, future_calendar, test_size, engine, params)
+        for key in series
+    )
+    results = Parallel(n_jobs=settings.FORECAST_SERIES_N_JOBS, return_as='generator_unordered')(tasks)
+
+    models = {}
+    y_true, y_pred, forecasts = [], [], []
+    forecast_seconds = 0.0
+    report_every = max(1, len(series) // 20)
+    for done, (key, actual, holdout, forecast, model, seconds) in enumerate(results, start=1):
+        models[key] = model
+        y_true.append(actual)
+        y_pred.append(holdout)
+        forecasts.append((key, forecast))
+        forecast_seconds += seconds
+        if done % report_every == 0:
+            progress(20 + 65 * done / len(series), f'Fitted {done}/{len(series)} series')
+    # Series forecast inside their fit task, so this wall-clock covers both;
+    # predict_ms is the forecasting time summed over series
+    fit_seconds = time.perf_counter() - start
+    predict_ms = forecast_seconds * 1000
+
+    # 4. Metrics over all series' holdout days
+    progress(85, 'Scoring holdout')
+    y_true = np.concatenate(y_true)
+    y_pred = np.concatenate(y_pred)
+    mae = mean_absolute_error(y_true, y_pred) if len(y_true) else 0.0
+    mape = mape_nonzero(y_true, y_pred)
+
+    # 5. Store forecasts plus reconciled totals
+    progress(90, 'Reconciling forecasts')
+    forecasts.sort(key=lambda f: f[0])
+    store_forecast = _forecast_frame(forecasts, future_dates)
+
+    progress(95, 'Saving run')
+    return save_run(
+        'hierarchical', models, reconcile(store_forecast), mae, mape, fingerprint,
+        engine=get_engine(engine).name, fit_seconds=fit_seconds, predict_ms=predict_ms,
+        columns=CALENDAR_COLUMNS,
+        params=params,
+        series=sorted(series),
+        last_date=last_date,
+    )
+
+
+def _forecast_frame(forecasts, future_dates):
+    keys = [key for key, _ in forecasts]
+    horizon = len(future_dates)
+    values = np.concatenate([f for _, f in forecasts], axis=1) if forecasts else np.empty((3, 0))
+    frame = pd.DataFrame({
+        'item_category': np.repeat([k[0] for k in keys], horizon),
+        'location_id': np.repeat([k[1] for k in keys], horizon),
+        'target_date': np.tile(future_dates, len(keys)),
+    })
+    frame[VALUE_COLUMNS] = values.T
+    return frame
+
+
+def predict_hierarchical(bundle, last_date, horizon):
+    future_dates = pd.date_range(last_date + timedelta(days=1), periods=horizon, freq='D')
+    future_calendar = calendar_matrix(future_dates)
+    forecasts = [
+        (key, np.stack(predict_interval(bundle['model'][key], future_calendar)))
+        for key in bundle['series']
+    ]
+    return reconcile(_forecast_frame(forecasts, future_dates))
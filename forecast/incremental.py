@@ -0,0 +1,248 @@
+"""
+Incremental updates of the latest forecast run.
+
+A full retrain refits on the whole history every time a day of sales lands.
+An incremental update starts from the latest run's stored model instead and
+only touches what the new days change, so its cost follows the amount of new
+data rather than the length of the history:
+
+- global runs grow their forest with warm_start: FORECAST_INCREMENTAL_TREES
+  new trees are fitted on the last FORECAST_INCREMENTAL_WINDOW_DAYS days (or
+  all new days, if more), and the oldest trees are retired beyond
+  FORECAST_INCREMENTAL_MAX_TREES so the forest tracks recent demand. The
+  whole horizon is forecast again: every item's lags move with the new days
+  and every prediction goes through the grown forest, so no stored forecast
+  stays valid to copy forward. Only random forest runs can warm start, so
+  global runs of other engines are passed over for the latest one that can.
+- hierarchical runs refit only the series that sold something in the new
+  days. The other series keep their model, and since their forecasts depend on
+  the calendar alone, forecasts already stored for dates still in the horizon
+  are copied from the parent run; only dates newly entering it are predicted.
+
+The MAE/MAPE of an update are prequential: the parent model scored on the new
+days before it saw them. Items that first appear after the parent run are
+left out of global updates; they are picked up by the next full retrain.
+"""
+import copy
+import time
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.metrics import mean_absolute_error
+
+from django.conf import settings
+from django.db.models import Q
+from . import features, registry, snapshots
+from .engines import DEFAULT_ENGINE
+from .models import TrainingRun, SalesPrediction
+from .training import (
+    TrainingError, cached_run, encode_features, hash_inputs, mape_nonzero, predict_interval, recursive_forecast,
+    run_summary, save_run,
+)
+
+
+def incremental_config():
+    return {
+        'trees': settings.FORECAST_INCREMENTAL_TREES,
+        'max_trees': settings.FORECAST_INCREMENTAL_MAX_TREES,
+        'window_days': settings.FORECAST_INCREMENTAL_WINDOW_DAYS,
+    }
+
+
+def latest_run():
+    """
+    Most recent run that can be updated and whose model artifact is still on
+    disk, or None. Global runs grow by warm start, which only the random
+    forest engine has; hierarchical runs refit series with any engine.
+    """
+    updatable = TrainingRun.objects.filter(Q(mode='hierarchical') | Q(engine='random_forest'))
+    for run in updatable.order_by('-training_date').iterator():
+        if registry.artifact_exists(run.model_path):
+            return run
+    return None
+
+
+def incremental_fingerprint(base, horizon):
+    return hash_inputs({
+        'mode': 'incremental',
+        'base': str(base.model_id),
+        'horizon': horizon,
+        'data': {'sales': snapshots.watermark(), 'signals': features.exogenous_watermark()},
+        'incremental': incremental_config(),
+    })
+
+
+def update_latest_run(progress, horizon, force=False):
+    """
+    Updates the latest run with the sales added since it was trained and saves
+    the result as a new run of the same mode, with the latest run as parent.
+    Returns the latest run itself (cached) when there are no new days.
+    """
+    base = latest_run()
+    if base is None:
+        raise TrainingError('No trained run to update; run a full random forest or hierarchical training first.')
+
+    fingerprint = incremental_fingerprint(base, horizon)
+    if not force:
+        run = cached_run(fingerprint)
+        if run is not None:
+            return run_summary(run, cached=True)
+
+    progress(5, 'Loading latest model')
+    bundle = registry.load_model(base.model_path)
+    if bundle.get('mode') == 'hierarchical':
+        return update_hierarchical(progress, base, bundle, horizon, fingerprint)
+    if bundle.get('feature_config') != features.FEATURE_CONFIG:
+        raise TrainingError(f'Run {base.model_id} uses other features; run a full training first.')
+    if bundle.get('engine', DEFAULT_ENGINE) != 'random_forest':
+        raise TrainingError(f'Run {base.model_id} is not a random forest; run a full training instead.')
+    return update_global(progress, base, bundle, horizon, fingerprint)
+
+
+def update_global(progress, base, bundle, horizon, fingerprint):
+    # 1. Fetch only the tail of history the window's features look back on
+    progress(10, 'Fetching new sales')
+    base_end = bundle['last_date'].tz_localize(None).normalize()
+    window = settings.FORECAST_INCREMENTAL_WINDOW_DAYS
+    categories = pd.Index(bundle['categories'], name='item_category')
+    panel = features.load_sales_panel(start_date=(base_end - timedelta(days=features.MAX_LOOKBACK + window)).date())
+    if panel.empty or panel.index.max() <= base_end:
+        return run_summary(base, cached=True)
+    panel = panel.reindex(columns=categories, fill_value=0)
+    last_day = panel.index.max()
+    new_days = (last_day - base_end).days
+
+    # 2. Features for the training window only
+    progress(20, 'Building features')
+    exog = features.load_exogenous(panel.index.min(), last_day + timedelta(days=horizon))
+    start = max(len(panel) - max(window, new_days), 0)
+    feats = features.compute_features(panel, exog, start=start)
+    X = encode_features(feats, list(categories))[bundle['columns']]
+    y = feats['quantity']
+
+    # 3. Score the parent model on the days it has not seen
+    progress(35, 'Scoring new days')
+    new = (feats['date'] > base_end).to_numpy()
+    preds_new = bundle['model'].predict(X[new])
+    mae = mean_absolute_error(y[new], preds_new)
+    mape = mape_nonzero(y[new].to_numpy(), preds_new)
+
+    # 4. Grow the forest on the window; the parent's model is left untouched
+    progress(50, 'Adding trees')
+    model = copy.copy(bundle['model'])
+    model.estimators_ = list(model.estimators_)
+    model.set_params(warm_start=True, n_estimators=len(model.estimators_) + settings.FORECAST_INCREMENTAL_TREES)
+    start = time.perf_counter()
+    model.fit(X, y)
+    fit_seconds = time.perf_counter() - start
+    max_trees = settings.FORECAST_INCREMENTAL_MAX_TREES
+    if len(model.estimators_) > max_trees:
+        model.estimators_ = model.estimators_[-max_trees:]
+    model.set_params(warm_start=False, n_estimators=len(model.estimators_))
+
+    # 5. Forecast from the new last day
+    progress(80, 'Generating forecast')
+    start = time.perf_counter()
+    grid = recursive_forecast(model, panel, exog, horizon, list(categories))
+    predict_ms = (time.perf_counter() - start) * 1000
+
+    progress(95, 'Saving run')
+    return save_run(
+        base.mode, model, grid, mae, mape, fingerprint, parent=base,
+        engine='random_forest', fit_seconds=fit_seconds, predict_ms=predict_ms,
+        columns=bundle['columns'],
+        categories=list(categories),
+        feature_config=features.FEATURE_CONFIG,
+        last_date=last_day.tz_localize('UTC'),
+    )
+
+
+def update_hierarchical(progress, base, bundle, horizon, fingerprint):
+    from .hierarchical import (
+        CALENDAR_COLUMNS, VALUE_COLUMNS, calendar_matrix, fit_series, load_series_panel, reconcile,
+    )
+
+    # 1. Fetch Data
+    progress(10, 'Fetching new sales')
+    base_end = bundle['last_date'].tz_localize(None).normalize()
+    panel = load_series_panel()
+    if panel.index.max() <= base_end:
+        return run_summary(base, cached=True)
+    last_date = panel.index.max().tz_localize('UTC')
+    future_dates = pd.date_range(last_date + timedelta(days=1), periods=horizon, freq='D')
+    future_calendar = calendar_matrix(future_dates)
+
+    # 2. Score the parent models on the new days; series that sold refit
+    progress(20, 'Scoring new days')
+    recent = panel.loc[panel.index > base_end]
+    new_calendar = calendar_matrix(recent.index)
+    y_true, y_pred = [], []
+    for key in bundle['series']:
+        if key in recent:
+            y_true.append(recent[key].to_numpy())
+            y_pred.append(bundle['model'][key].predict(new_calendar))
+    y_true = np.concatenate(y_true) if y_true else np.empty(0)
+    y_pred = np.concatenate(y_pred) if y_pred else np.empty(0)
+    mae = mean_absolute_error(y_true, y_pred) if len(y_true) else 0.0
+    mape = mape_nonzero(y_true, y_pred)
+
+    known = set(bundle['series'])
+    changed = [key for key in panel.columns if key not in known or recent[key].any()]
+    kept = [key for key in bundle['series'] if key not in set(changed)]
+
+    progress(30, f'Refitting {len(changed)} of {len(panel.columns)} series')
+    engine = bundle.get('engine', DEFAULT_ENGINE)
+    # Refits use the params the parent's series were fitted with
+    params = bundle.get('params', {})
+    calendar = calendar_matrix(panel.index)
+    start = time.perf_counter()
+    results = Parallel(n_jobs=settings.FORECAST_SERIES_N_JOBS)(
+        delayed(fit_series)(key, panel[key].to_numpy(), calendar, future_calendar, 0, engine, params)
+        for key in changed
+    )
+    fit_seconds = time.perf_counter() - start
+    models = dict(bundle['model'])
+    forecasts = []
+    forecast_seconds = 0.0
+    for key, _, _, forecast, model, seconds in results:
+        models[key] = model
+        forecast_seconds += seconds
+        frame = pd.DataFrame({'item_category': key[0], 'location_id': key[1], 'target_date': future_dates})
+        frame[VALUE_COLUMNS] = forecast.T
+        forecasts.append(frame)
+
+    # 3. Unchanged series: reuse stored forecasts, predict dates new to the horizon
+    progress(80, 'Refreshing unchanged series')
+    stored = pd.DataFrame(list(
+        SalesPrediction.objects.filter(
+            training_run=base, location_id__isnull=False, target_date__in=list(future_dates.to_pydatetime()),
+        ).values_list('item_category', 'location_id', 'target_date', *VALUE_COLUMNS)
+    ), columns=['item_category', 'location_id', 'target_date', *VALUE_COLUMNS])
+    if len(stored):
+        stored['target_date'] = pd.to_datetime(stored['target_date'], utc=True)
+        stored = stored[pd.Series(list(zip(stored['item_category'], stored['location_id']))).isin(kept).to_numpy()]
+    covered = set(zip(stored['item_category'], stored['location_id'], stored['target_date']))
+    forecasts.append(stored)
+    start = time.perf_counter()
+    for key in kept:
+        missing = future_dates[[(key[0], key[1], d) not in covered for d in future_dates]]
+        if len(missing):
+            frame = pd.DataFrame({'item_category': key[0], 'location_id': key[1], 'target_date': missing})
+            frame[VALUE_COLUMNS] = np.stack(predict_interval(models[key], calendar_matrix(missing))).T
+            forecasts.append(frame)
+    predict_ms = (forecast_seconds + time.perf_counter() - start) * 1000
+
+    store_forecast = pd.concat(forecasts, ignore_index=True).sort_values(
+        ['item_category', 'location_id', 'target_date'], ignore_index=True,
+    )
+    progress(95, 'Saving run')
+    return save_run(
+        'hierarchical', models, reconcile(store_forecast), mae, mape, fingerprint, parent=base,
+        engine=engine, fit_seconds=fit_seconds, predict_ms=predict_ms,
+        columns=CALENDAR_COLUMNS,
+        params=params,
+        series=sorted(models),
+        last_date=last_date,
+    )
@@ -0,0 +1,202 @@
+"""
+In-process job runner for model training.
+
+Jobs are persisted as TrainingJob rows and executed on a process pool, so the
+web tier only inserts a row and returns. Workers report progress and check for
+cancellation through the same row, which is what the status endpoint polls.
+
+The pool lives in the web process that queued the job and dies with it, so
+that process keeps a heartbeat on the rows of its unfinished jobs. Jobs whose
+heartbeat went stale lost their process (a restart or crash) and are marked
+failed by fail_orphaned_jobs() instead of showing queued or running forever.
+"""
+import logging
+import multiprocessing
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import TrainingJob
+
+logger = logging.getLogger(__name__)
+
+JOB_HANDLERS = {
+    'forecast': 'forecast.training.train_forecast_model',
+    'noshow': 'reservations.training.train_noshow_model',
+    'tuning': 'forecast.tuning.tune_model',
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+# pks of jobs this process submitted to the pool that have not finished yet
+_live_jobs = set()
+_heartbeat = None
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn rather than fork: the web process is multi-threaded and
+            # holds DB connections that must not be shared with children.
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.TRAINING_JOB_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=django.setup,
+            )
+        global _heartbeat
+        if _heartbeat is None:
+            _heartbeat = threading.Thread(target=_beat, name='training-job-heartbeat', daemon=True)
+            _heartbeat.start()
+        return _executor
+
+
+def _beat():
+    """Refreshes heartbeat_at of this process's live jobs for as long as it runs."""
+    while True:
+        time.sleep(settings.TRAINING_JOB_HEARTBEAT_SECONDS)
+        with _executor_lock:
+            live = list(_live_jobs)
+        if not live:
+            continue
+        try:
+            close_old_connections()
+            TrainingJob.objects.filter(pk__in=live).exclude(status__in=TrainingJob.FINISHED_STATUSES).update(
+                heartbeat_at=timezone.now()
+            )
+        except Exception:
+            logger.exception("Training job heartbeat failed")
+
+
+def _reset_executor():
+    global _executor
+    with _executor_lock:
+        _executor = None
+
+
+def _progress_reporter(job_pk):
+    def progress(pct, stage):
+        TrainingJob.objects.filter(pk=job_pk).update(progress=pct, stage=stage)
+        if TrainingJob.objects.filter(pk=job_pk, cancel_requested=True).exists():
+            raise JobCancelled()
+    return progress
+
+
+def run_job(job_pk):
+    """Executes one job. Runs inside a pool worker (or inline when eager)."""
+    from forecast.training import TrainingError
+
+    close_old_connections()
+    try:
+        started = TrainingJob.objects.filter(pk=job_pk, status='queued').update(
+            status='running', started_at=timezone.now()
+        )
+        if not started:
+            # Cancelled while it was still waiting in the queue
+            return
+
+        job = TrainingJob.objects.get(pk=job_pk)
+        handler = import_string(JOB_HANDLERS[job.kind])
+        try:
+            result = handler(progress=_progress_reporter(job_pk), **job.params)
+        except JobCancelled:
+            _finish(job_pk, 'cancelled', message='Cancelled by user.')
+        except TrainingError as e:
+            _finish(job_pk, 'failed', message=str(e))
+        except Exception as e:
+            logger.exception("Training job %s failed", job.job_id)
+            _finish(job_pk, 'failed', message=f"{e}\n{traceback.format_exc(limit=5)}")
+        else:
+            _finish(job_pk, 'succeeded', result=result, progress=100, stage='Done')
+    finally:
+        close_old_connections()
+
+
+def _finish(job_pk, status, **fields):
+    TrainingJob.objects.filter(pk=job_pk).update(status=status, finished_at=timezone.now(), **fields)
+
+
+def _on_done(job_pk):
+    def callback(future):
+        with _executor_lock:
+            _live_jobs.discard(job_pk)
+        exc = future.exception()
+        if exc is not None:
+            # The worker died (e.g. BrokenProcessPool); run_job never got to record it
+            logger.error("Training worker crashed on job %s: %s", job_pk, exc)
+            TrainingJob.objects.filter(pk=job_pk).exclude(status__in=TrainingJob.FINISHED_STATUSES).update(
+                status='failed', finished_at=timezone.now(), message=f"Worker crashed: {exc}"
+            )
+            _reset_executor()
+    return callback
+
+
+def submit_job(kind, user=None, **params):
+    """Queues a training job and returns its TrainingJob row immediately."""
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+
+    job = TrainingJob.objects.create(
+        kind=kind,
+        params=params,
+        requested_by=user if user is not None and user.is_authenticated else None,
+        # Eager jobs run inside this call and never wait unowned
+        heartbeat_at=None if settings.TRAINING_JOBS_EAGER else timezone.now(),
+    )
+
+    if settings.TRAINING_JOBS_EAGER:
+        run_job(job.pk)
+        job.refresh_from_db()
+        return job
+
+    def enqueue():
+        executor = _get_executor()
+        with _executor_lock:
+            _live_jobs.add(job.pk)
+        future = executor.submit(run_job, job.pk)
+        future.add_done_callback(_on_done(job.pk))
+
+    transaction.on_commit(enqueue)
+    return job
+
+
+def fail_orphaned_jobs():
+    """
+    Marks failed the queued and running jobs whose heartbeat is older than
+    TRAINING_JOB_STALE_SECONDS. Returns how many were marked.
+    """
+    now = timezone.now()
+    return TrainingJob.objects.filter(
+        status__in=('queued', 'running'),
+        heartbeat_at__lt=now - timedelta(seconds=settings.TRAINING_JOB_STALE_SECONDS),
+    ).update(
+        status='failed', finished_at=now,
+        message='Interrupted: the process running the job stopped (e.g. a server restart).',
+    )
+
+
+def cancel_job(job):
+    """
+    Queued jobs are cancelled outright; running jobs are flagged and stop at
+    their next progress checkpoint.
+    """
+    cancelled = TrainingJob.objects.filter(pk=job.pk, status='queued').update(
+        status='cancelled', cancel_requested=True, finished_at=timezone.now(),
+        message='Cancelled before start.'
+    )
+    if not cancelled:
+        TrainingJob.objects.filter(pk=job.pk, status='running').update(cancel_requested=True)
+    job.refresh_from_db()
+    return job
@@ -0,0 +1,61 @@
+import time
+
+import pandas as pd
+from django.core.management.base import BaseCommand, CommandError
+
+from forecast.backtest import run_backtest, summarize
+from forecast.training import TrainingError
+from generate_sales_csv import build_sales_frame
+
+
+def synthetic_panel(rows, seed):
+    """Date x item quantity panel from the dummy sales generator."""
+    df = build_sales_frame(rows, '2025-01-01', randomness=0.5, seed=seed)
+    df['date'] = pd.to_datetime(df['T-Date']).dt.normalize()
+    panel = df.pivot_table(index='date', columns='Category', values='Units', aggfunc='sum', fill_value=0)
+    panel.columns.name = 'item_category'
+    full_range = pd.date_range(panel.index.min(), panel.index.max(), freq='D')
+    return panel.reindex(full_range, fill_value=0).astype(float)
+
+
+class Command(BaseCommand):
+    help = 'Rolling-origin backtest of the forecast model; results are stored in BacktestResult'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+',
+                            help='Backtest synthetic datasets of these row counts instead of the sales DB')
+        parser.add_argument('--folds', type=int, default=3)
+        parser.add_argument('--horizon', type=int, default=None, help='Days per fold (default: FORECAST_HORIZON_DAYS)')
+        parser.add_argument('--seed', type=int, default=42, help='Seed for the synthetic datasets')
+        parser.add_argument('--n-jobs', type=int, default=None, help='Parallel folds (default: BACKTEST_N_JOBS)')
+
+    def handle(self, *args, **options):
+        if options['sizes']:
+            datasets = (
+                (f'synthetic-{rows}', rows, lambda rows=rows: synthetic_panel(rows, options['seed']))
+                for rows in options['sizes']
+            )
+        else:
+            datasets = [('db', None, lambda: None)]
+
+        for label, rows, load in datasets:
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            start = time.perf_counter()
+            try:
+                results = run_backtest(
+                    panel=load(), n_folds=options['folds'], horizon=options['horizon'],
+                    label=label, data_rows=rows or 0, n_jobs=options['n_jobs'],
+                )
+            except TrainingError as e:
+                raise CommandError(str(e))
+
+            for r in results:
+                self.stdout.write(
+                    f'  fold {r.fold} cutoff {r.cutoff}: MAE {r.mae:8.2f}  MAPE {r.mape:6.3f}  '
+                    f'fit {r.fit_seconds:6.2f}s  predict {r.predict_ms:7.1f}ms  peak {r.peak_memory_mb:7.1f}MB'
+                )
+            mean = summarize(results)
+            self.stdout.write(self.style.SUCCESS(
+                f'  mean: MAE {mean["mae"]:.2f}  MAPE {mean["mape"]:.3f}  fit {mean["fit_seconds"]:.2f}s  '
+                f'predict {mean["predict_ms"]:.1f}ms  ({time.perf_counter() - start:.1f}s total)'
+            ))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from forecast.models import TrainingRun
+from forecast.training import TrainingError
+from forecast.tuning import tune_model
+
+
+class Command(BaseCommand):
+    help = 'Successive-halving hyperparameter search for the forecast model; the winner is used by later training runs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--engine', choices=[name for name, _ in TrainingRun.ENGINE_CHOICES], default=None)
+        parser.add_argument('--budget', type=float, default=None, help='Wall-clock seconds (default: TUNING_BUDGET_SECONDS)')
+        parser.add_argument('--candidates', type=int, default=None, help='Configurations sampled (default: TUNING_CANDIDATES)')
+        parser.add_argument('--folds', type=int, default=None, help='Time-series CV folds (default: TUNING_FOLDS)')
+        parser.add_argument('--workers', type=int, default=None, help='Pool processes (default: TUNING_WORKERS)')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        def progress(pct, stage):
+            self.stdout.write(f'  [{pct:3.0f}%] {stage}')
+
+        try:
+            result = tune_model(
+                progress, engine=options['engine'], budget=options['budget'], candidates=options['candidates'],
+                n_folds=options['folds'], seed=options['seed'], workers=options['workers'],
+            )
+        except TrainingError as e:
+            raise CommandError(str(e))
+
+        baseline = f'{result["baseline_mae"]:.2f}' if result['baseline_mae'] is not None else 'n/a'
+        self.stdout.write(self.style.SUCCESS(
+            f'{result["engine"]}: MAE {result["mae"]:.2f} (defaults {baseline}) with {result["params"] or "defaults"}; '
+            f'{result["n_fits"]} fits in {result["elapsed_seconds"]:.1f}s'
+            + (' (budget exhausted)' if result['budget_exhausted'] else '')
+        ))
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forecast', '0002_trainingjob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='salesprediction',
+            index=models.Index(fields=['training_run', 'target_date'], name='prediction_run_date_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forecast', '0003_time_series_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='salesprediction',
+            name='location_id',
+            field=models.CharField(blank=True, help_text='Empty for all-location totals', max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name='trainingrun',
+            name='mode',
+            field=models.CharField(choices=[('global', 'Global (one model, all items)'), ('hierarchical', 'Per item & location')], default='global', max_length=20),
+        ),
+    ]
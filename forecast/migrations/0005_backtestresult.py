@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forecast', '0004_hierarchical_forecasts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BacktestResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('batch_id', models.UUIDField(db_index=True)),
+                ('label', models.CharField(blank=True, help_text="Data source, e.g. 'db' or 'synthetic-100000'", max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('data_rows', models.BigIntegerField(help_text='Sales transactions the panel was built from')),
+                ('n_series', models.IntegerField()),
+                ('fold', models.IntegerField()),
+                ('cutoff', models.DateField(help_text='Last day of training data')),
+                ('train_days', models.IntegerField()),
+                ('horizon', models.IntegerField()),
+                ('mae', models.FloatField()),
+                ('mape', models.FloatField(help_text='Over days with non-zero sales')),
+                ('fit_seconds', models.FloatField()),
+                ('predict_ms', models.FloatField(help_text='Latency of the full recursive horizon forecast')),
+                ('peak_memory_mb', models.FloatField(help_text='Peak RSS growth of the worker during the fold')),
+            ],
+            options={
+                'ordering': ['-created_at', 'fold'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forecast', '0005_backtestresult'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trainingrun',
+            name='fingerprint',
+            field=models.CharField(blank=True, db_index=True, help_text='Hash of the training inputs (data watermark, features, estimator)', max_length=64),
+        ),
+    ]
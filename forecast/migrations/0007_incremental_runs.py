@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forecast', '0006_trainingrun_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trainingrun',
+            name='parent',
+            field=models.ForeignKey(blank=True, help_text='Run this one incrementally updated', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='updates', to='forecast.trainingrun'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forecast', '0008_trainingrun_engine'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TuningResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('engine', models.CharField(choices=[('random_forest', 'Random forest'), ('hist_gb', 'Histogram gradient boosting')], db_index=True, max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('params', models.JSONField(help_text='Winning estimator params')),
+                ('mae', models.FloatField(help_text='Mean validation MAE of the winner over the CV folds')),
+                ('baseline_mae', models.FloatField(blank=True, help_text='Engine defaults on the same folds and rung as the winner', null=True)),
+                ('n_candidates', models.IntegerField()),
+                ('n_fits', models.IntegerField(help_text='Fits completed within the budget')),
+                ('folds', models.IntegerField()),
+                ('budget_seconds', models.FloatField()),
+                ('elapsed_seconds', models.FloatField()),
+                ('budget_exhausted', models.BooleanField(default=False)),
+                ('data_fingerprint', models.CharField(blank=True, max_length=64)),
+                ('rungs', models.JSONField(default=list, help_text='Per rung: train days, candidates and their MAE')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='trainingjob',
+            name='kind',
+            field=models.CharField(choices=[('forecast', 'Sales Forecast'), ('noshow', 'No-Show Model'), ('tuning', 'Hyperparameter Search')], max_length=20),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forecast', '0009_tuningresult'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trainingjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
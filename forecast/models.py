@@ -2,11 +2,33 @@ from django.db import models
 import uuid
 
 class TrainingRun(models.Model):
+    MODE_CHOICES = [
+        ('global', 'Global (one model, all items)'),
+        ('hierarchical', 'Per item & location'),
+    ]
+    # Modes a training request can ask for; 'incremental' updates the latest
+    # run in place of a full refit and records the result under that run's mode.
+    TRAIN_MODE_CHOICES = MODE_CHOICES + [
+        ('incremental', 'Incremental update (latest run)'),
+    ]
+    # Estimators a run can be trained with, see forecast.engines
+    ENGINE_CHOICES = [
+        ('random_forest', 'Random forest'),
+        ('hist_gb', 'Histogram gradient boosting'),
+    ]
+
     model_id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
+    mode = models.CharField(max_length=20, choices=MODE_CHOICES, default='global')
     training_date = models.DateTimeField(auto_now_add=True)
     metric_mae = models.FloatField()
     metric_mape = models.FloatField()
     model_path = models.CharField(max_length=255)
+    parent = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='updates', help_text="Run this one incrementally updated")
+    fingerprint = models.CharField(max_length=64, blank=True, db_index=True, help_text="Hash of the training inputs (data watermark, features, estimator)")
+    engine = models.CharField(max_length=20, choices=ENGINE_CHOICES, default='random_forest')
+    fit_seconds = models.FloatField(null=True, blank=True, help_text="Wall-clock time of the model fit")
+    predict_ms = models.FloatField(null=True, blank=True, help_text="Wall-clock time of generating the forecast")
+    artifact_bytes = models.BigIntegerField(null=True, blank=True, help_text="Size of the stored model artifact")
 
     def __str__(self):
         return f"Run {self.model_id} - MAE: {self.metric_mae}"
@@ -14,10 +36,116 @@ class TrainingRun(models.Model):
 class SalesPrediction(models.Model):
     training_run = models.ForeignKey(TrainingRun, on_delete=models.CASCADE, null=True, blank=True)
     item_category = models.CharField(max_length=100)
+    location_id = models.CharField(max_length=100, null=True, blank=True, help_text="Empty for all-location totals")
     target_date = models.DateTimeField()
     predicted_qty = models.FloatField()
     confidence_upper = models.FloatField(null=True, blank=True)
     confidence_lower = models.FloatField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['training_run', 'target_date'], name='prediction_run_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.item_category} on {self.target_date}: {self.predicted_qty}"
+
+class TrainingJob(models.Model):
+    """A background training request; see forecast.jobs for the runner."""
+    KIND_CHOICES = [
+        ('forecast', 'Sales Forecast'),
+        ('noshow', 'No-Show Model'),
+        ('tuning', 'Hyperparameter Search'),
+    ]
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+        ('cancelled', 'Cancelled'),
+    ]
+    FINISHED_STATUSES = ('succeeded', 'failed', 'cancelled')
+
+    job_id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    progress = models.FloatField(default=0) # 0-100
+    stage = models.CharField(max_length=100, blank=True)
+    message = models.TextField(blank=True)
+    result = models.JSONField(null=True, blank=True)
+    cancel_requested = models.BooleanField(default=False)
+    requested_by = models.ForeignKey('auth.User', on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Refreshed by the process that owns a pooled job until it finishes; see forecast.jobs
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+
+    @property
+    def is_finished(self):
+        return self.status in self.FINISHED_STATUSES
+
+    def to_dict(self):
+        return {
+            'job_id': str(self.job_id),
+            'kind': self.kind,
+            'status': self.status,
+            'progress': self.progress,
+            'stage': self.stage,
+            'message': self.message,
+            'result': self.result,
+            'cancel_requested': self.cancel_requested,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+    def __str__(self):
+        return f"{self.get_kind_display()} job {self.job_id} ({self.status})"
+
+class BacktestResult(models.Model):
+    """One rolling-origin fold of a backtest; folds of the same invocation share batch_id."""
+    batch_id = models.UUIDField(db_index=True)
+    label = models.CharField(max_length=100, blank=True, help_text="Data source, e.g. 'db' or 'synthetic-100000'")
+    created_at = models.DateTimeField(auto_now_add=True)
+    data_rows = models.BigIntegerField(help_text="Sales transactions the panel was built from")
+    n_series = models.IntegerField()
+    fold = models.IntegerField()
+    cutoff = models.DateField(help_text="Last day of training data")
+    train_days = models.IntegerField()
+    horizon = models.IntegerField()
+    mae = models.FloatField()
+    mape = models.FloatField(help_text="Over days with non-zero sales")
+    fit_seconds = models.FloatField()
+    predict_ms = models.FloatField(help_text="Latency of the full recursive horizon forecast")
+    peak_memory_mb = models.FloatField(help_text="Peak RSS growth of the worker during the fold")
+
+    class Meta:
+        ordering = ['-created_at', 'fold']
+
+    def __str__(self):
+        return f"Backtest {self.label} fold {self.fold} (cutoff {self.cutoff}): MAE {self.mae:.2f}"
+
+
+class TuningResult(models.Model):
+    """Outcome of one forecast.tuning search; the latest per engine is used by training runs."""
+    engine = models.CharField(max_length=20, choices=TrainingRun.ENGINE_CHOICES, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    params = models.JSONField(help_text="Winning estimator params")
+    mae = models.FloatField(help_text="Mean validation MAE of the winner over the CV folds")
+    baseline_mae = models.FloatField(null=True, blank=True, help_text="Engine defaults on the same folds and rung as the winner")
+    n_candidates = models.IntegerField()
+    n_fits = models.IntegerField(help_text="Fits completed within the budget")
+    folds = models.IntegerField()
+    budget_seconds = models.FloatField()
+    elapsed_seconds = models.FloatField()
+    budget_exhausted = models.BooleanField(default=False)
+    data_fingerprint = models.CharField(max_length=64, blank=True)
+    rungs = models.JSONField(default=list, help_text="Per rung: train days, candidates and their MAE")
+
+    class Meta:
+        ordering = ['-created_at']
+
     def __str__(self):
-        return f"{self.item_category} on {self.target_date}: {self.predicted_qty}"
\ No newline at end of file
+        return f"Tuning {self.engine} ({self.created_at:%Y-%m-%d}): MAE {self.mae:.2f}"
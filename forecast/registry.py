@@ -0,0 +1,127 @@
+"""
+Versioned model artifacts on disk plus a per-process LRU cache of loaded models.
+
+Artifacts are joblib bundles stored under MODEL_ARTIFACT_DIR/<kind>/<model_id>.joblib,
+so every training run keeps its own file instead of overwriting a shared one.
+Large artifacts are memory-mapped on load: the tree arrays stay in the page
+cache and are shared between worker processes instead of being copied.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import joblib
+from django.conf import settings
+
+ARTIFACT_FORMAT_VERSION = 1
+
+
+def artifact_path(kind, model_id):
+    return os.path.join(settings.MODEL_ARTIFACT_DIR, kind, f'{model_id}.joblib')
+
+
+def save_model(kind, model_id, model, **metadata):
+    """
+    Writes `model` and its metadata (training columns, last date, ...) as one
+    bundle and returns the artifact path. The file is written under a temporary
+    name and renamed so readers never see a partial artifact.
+    """
+    path = artifact_path(kind, model_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    bundle = dict(metadata, model=model, kind=kind, model_id=str(model_id), format_version=ARTIFACT_FORMAT_VERSION)
+    tmp_path = f'{path}.tmp'
+    # No compression: compressed pickles cannot be memory-mapped
+    joblib.dump(bundle, tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+
+def artifact_exists(path):
+    return bool(path) and os.path.isfile(path)
+
+
+class ModelCache:
+    """
+    LRU of loaded bundles keyed by artifact path. Bounded both by entry count
+    and by the summed artifact size, so a few huge forests push out the
+    least recently used models instead of growing the process without limit.
+    """
+
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None:
+                return None
+            self._entries.move_to_end(path)
+            return entry[0]
+
+    def put(self, path, bundle, nbytes):
+        with self._lock:
+            if path in self._entries:
+                self._bytes -= self._entries.pop(path)[1]
+            self._entries[path] = (bundle, nbytes)
+            self._bytes += nbytes
+            self._evict()
+
+    def evict(self, path):
+        with self._lock:
+            entry = self._entries.pop(path, None)
+            if entry is not None:
+                self._bytes -= entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _evict(self):
+        # Always keep the most recent entry, even if it alone exceeds the budget
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            _, (_, nbytes) = self._entries.popitem(last=False)
+            self._bytes -= nbytes
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def total_bytes(self):
+        return self._bytes
+
+
+_cache = None
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        _cache = ModelCache(settings.MODEL_CACHE_MAX_ENTRIES, settings.MODEL_CACHE_MAX_BYTES)
+    return _cache
+
+
+def load_model(path):
+    """Returns the artifact bundle at `path`, from the cache when it is warm."""
+    cache = get_cache()
+    bundle = cache.get(path)
+    if bundle is not None:
+        return bundle
+
+    nbytes = os.path.getsize(path)
+    mmap_mode = 'r' if nbytes >= settings.MODEL_MMAP_MIN_BYTES else None
+    bundle = joblib.load(path, mmap_mode=mmap_mode)
+    cache.put(path, bundle, nbytes)
+    return bundle
+
+
+def delete_model(path):
+    get_cache().evict(path)
+    if artifact_exists(path):
+        os.remove(path)
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from sales.signals import sales_imported
+
+
+@receiver(sales_imported)
+def update_forecast_after_import(sender, first_day, last_day, **kwargs):
+    # Only sales past the latest run's last day change an incremental update;
+    # the job itself returns the latest run when nothing new landed.
+    if settings.FORECAST_UPDATE_ON_IMPORT:
+        from .jobs import submit_job
+        submit_job('forecast', mode='incremental')
+
+
+@receiver(post_delete, sender='forecast.TrainingRun')
+@receiver(post_delete, sender='reservations.NoShowTrainingRun')
+def delete_run_artifact(sender, instance, **kwargs):
+    # Each run owns its artifact file; drop it once the delete is committed
+    from .registry import delete_model
+    transaction.on_commit(lambda: delete_model(instance.model_path))
@@ -1,3 +1,572 @@
-from django.test import TestCase
+import os
+import tempfile
+import threading
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from sales.models import BillOfMaterial, DailySalesRollup, Ingredient, SalesData
+from sales.rollup import refresh_rollup
+from . import features, jobs, registry, snapshots, tuning
+from .models import SalesPrediction, TrainingJob, TrainingRun, TuningResult
+from .training import TrainingError, build_forecast_features, encode_features, mape_nonzero, predict_interval, train_forecast_model
+
+
+@override_settings(VIEW_CACHE_ENABLED=False)
+class TrainingHubTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('analyst', password='pw'))
+        run = TrainingRun.objects.create(metric_mae=1, metric_mape=0.1, model_path='none')
+        SalesPrediction.objects.create(
+            training_run=run, item_category='Pizza', target_date=timezone.make_aware(datetime(2025, 3, 1)), predicted_qty=10,
+        )
+
+    def test_bom_cycle_leaves_needs_empty(self):
+        # Saved past BillOfMaterial.clean(), as a rename or a script could
+        dough, pizza = Ingredient.objects.create(name='Dough', unit='kg'), Ingredient.objects.create(name='Pizza', unit='pc')
+        BillOfMaterial.objects.create(item_category='Pizza', ingredient=dough, quantity_per_unit=0.3)
+        BillOfMaterial.objects.create(item_category='Dough', ingredient=pizza, quantity_per_unit=1)
+
+        response = self.client.get(reverse('training_hub'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['ingredient_needs'], [])
+        self.assertIn('cycle', ' '.join(str(m) for m in response.context['messages']))
+
+
+class EncodeFeaturesTests(TestCase):
+    def test_native_categories_are_capped(self):
+        categories = [f'Item {i}' for i in range(300)]
+        feats = pd.DataFrame(0.0, index=range(300), columns=features.feature_columns())
+        feats['item_category'] = categories
+        self.assertEqual(encode_features(feats, categories).shape, (300, len(features.feature_columns()) + 300))
+        with self.assertRaises(TrainingError):
+            encode_features(feats, categories, categorical=True)
+
+    def test_one_hot_columns_are_one_block(self):
+        categories = [f'Item {i}' for i in range(200)]
+        feats = pd.DataFrame(1.0, index=range(3), columns=features.feature_columns())
+        feats['item_category'] = ['Item 0', 'Item 199', 'Unseen']
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', pd.errors.PerformanceWarning)
+            X = encode_features(feats, categories)
+        onehot = X[[f'item_{cat}' for cat in categories]].to_numpy()
+        self.assertEqual(onehot.sum(axis=1).tolist(), [1, 1, 0])
+        self.assertEqual((onehot[0, 0], onehot[1, 199]), (1, 1))
+        self.assertTrue((X[features.feature_columns()] == 1.0).all().all())
+
+
+class ComputeFeaturesTests(SimpleTestCase):
+    def setUp(self):
+        days = pd.date_range('2025-01-01', periods=60, freq='D')
+        self.panel = pd.DataFrame(
+            {'Pizza': np.arange(60.0), 'Salad': (np.arange(60.0) * 3) % 11},
+            index=days,
+        )
+        self.panel.columns = pd.Index(self.panel.columns, name='item_category', dtype=object)
+        self.exog = pd.DataFrame(
+            {name: np.arange(60.0) + i for i, name in enumerate(features.EXOGENOUS_FEATURES)}, index=days,
+        )
+
+    def row(self, feats, day, item):
+        return feats[(feats['date'] == self.panel.index[day]) & (feats['item_category'] == item)].iloc[0]
+
+    def test_lags_and_rolling_stats_look_only_at_earlier_days(self):
+        feats = features.compute_features(self.panel, self.exog)
+        salad = self.panel['Salad'].to_numpy()
+        row = self.row(feats, 40, 'Salad')
+        for lag in features.LAGS:
+            self.assertEqual(row[f'lag_{lag}'], salad[40 - lag])
+        for w in features.WINDOWS:
+            self.assertAlmostEqual(row[f'roll_mean_{w}'], salad[40 - w:40].mean(), places=5)
+            self.assertAlmostEqual(row[f'roll_std_{w}'], salad[40 - w:40].std(ddof=1), places=5)
+        self.assertEqual(row['quantity'], salad[40])
+        self.assertEqual(row['temperature'], self.exog['temperature'].iloc[40])
+
+        # Too early for the longer lags
+        early = self.row(feats, 10, 'Pizza')
+        self.assertEqual(early['lag_7'], 3)
+        self.assertTrue(np.isnan(early['lag_14']) and np.isnan(early['lag_28']))
+
+    def test_a_tail_matches_the_full_computation(self):
+        full = features.compute_features(self.panel, self.exog)
+        for start, stop in [(45, None), (59, 60), (20, 30)]:
+            with self.subTest(start=start, stop=stop):
+                tail = features.compute_features(self.panel, self.exog, start=start, stop=stop)
+                n = len(self.panel.columns)
+                expected = full.iloc[start * n:(stop or len(self.panel)) * n].reset_index(drop=True)
+                pd.testing.assert_frame_equal(tail, expected)
+
+
+class LegacyForecastFeaturesTests(SimpleTestCase):
+    def test_one_batched_predict_equals_per_row_predictions(self):
+        from sklearn.ensemble import RandomForestRegressor
+
+        columns = ['dow', 'month', 'day', 'item_Pizza', 'item_Salad']
+        rng = np.random.default_rng(0)
+        train = pd.DataFrame(rng.integers(0, 2, (200, len(columns))), columns=columns).astype(float)
+        train[['dow', 'month', 'day']] = rng.integers(1, 29, (200, 3))
+        model = RandomForestRegressor(n_estimators=10, random_state=0).fit(train, rng.random(200) * 20)
+
+        # Soup is unknown to the model and keeps an all-zero item block
+        categories = ['Pizza', 'Salad', 'Soup']
+        last_date = pd.Timestamp('2025-01-31', tz='UTC')
+        grid, X = build_forecast_features(categories, last_date, 7, columns)
+        self.assertEqual(len(grid), len(X))
+        batched = model.predict(X)
+
+        for i, (item, day) in enumerate(zip(grid['item_category'], grid['target_date'])):
+            row = dict.fromkeys(columns, 0.0)
+            row.update(dow=day.dayofweek, month=day.month, day=day.day)
+            if f'item_{item}' in row:
+                row[f'item_{item}'] = 1.0
+            self.assertEqual(model.predict(pd.DataFrame([row], columns=columns))[0], batched[i])
+        self.assertEqual(sorted(set(grid['target_date'].dt.date)), [date(2025, 2, d) for d in range(1, 8)])
+
+
+class ArtifactTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.enterContext(self.settings(MODEL_ARTIFACT_DIR=tmp.name))
+        registry.get_cache().clear()
+
+    def test_every_run_gets_its_own_artifact(self):
+        first = registry.save_model('forecast', 'm1', {'coef': 1}, columns=['a'])
+        second = registry.save_model('forecast', 'm2', {'coef': 2}, columns=['a'])
+        self.assertNotEqual(first, second)
+        # Written under a temporary name and renamed: nothing else is left behind
+        self.assertEqual(sorted(os.listdir(os.path.dirname(first))), ['m1.joblib', 'm2.joblib'])
+        bundle = registry.load_model(first)
+        self.assertEqual((bundle['model'], bundle['columns'], bundle['model_id']), ({'coef': 1}, ['a'], 'm1'))
+        # Warm: the same object comes back without touching the file
+        os.remove(first)
+        self.assertIs(registry.load_model(first), bundle)
+
+    def test_large_artifacts_are_memory_mapped(self):
+        path = registry.save_model('forecast', 'big', np.arange(1000, dtype=float))
+        with self.settings(MODEL_MMAP_MIN_BYTES=1):
+            self.assertIsInstance(registry.load_model(path)['model'], np.memmap)
+
+    def test_cache_evicts_least_recently_used(self):
+        cache = registry.ModelCache(max_entries=2, max_bytes=100)
+        cache.put('a', 'A', 10)
+        cache.put('b', 'B', 10)
+        cache.get('a')
+        cache.put('c', 'C', 10)
+        self.assertEqual((cache.get('a'), cache.get('b'), cache.get('c')), ('A', None, 'C'))
+        # Over the byte budget only the newest entry stays, even if too big alone
+        cache.put('d', 'D', 500)
+        self.assertEqual((len(cache), cache.total_bytes, cache.get('d')), (1, 500, 'D'))
+
+    def test_deleting_a_run_deletes_its_artifact(self):
+        path = registry.save_model('forecast', 'm1', {'coef': 1})
+        run = TrainingRun.objects.create(metric_mae=1, metric_mape=0.1, model_path=path)
+        registry.load_model(path)
+        with self.captureOnCommitCallbacks(execute=True):
+            run.delete()
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(len(registry.get_cache()), 0)
+
+
+class PredictViewTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('analyst', password='pw'))
+
+    def test_malformed_start_is_rejected(self):
+        run = TrainingRun.objects.create(metric_mae=1, metric_mape=0.1, model_path='none')
+        for start in ('2025-13-45', 'yesterday'):
+            response = self.client.get(reverse('forecast_predict'), {'model_id': run.model_id, 'start': start})
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json(), {'status': 'error', 'message': 'Invalid start date or horizon.'})
+
+    def test_malformed_model_id_is_rejected(self):
+        response = self.client.get(reverse('forecast_predict'), {'model_id': 'bad'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'status': 'error', 'message': 'Invalid model_id.'})
+
+
+class MapeTests(TestCase):
+    def test_zero_sale_days_are_left_out(self):
+        # Plain MAPE would divide the 3 predicted on a zero day by machine epsilon
+        self.assertAlmostEqual(mape_nonzero(pd.Series([0, 10, 20]), np.array([3, 11, 18])), 0.1)
+        self.assertEqual(mape_nonzero(np.zeros(3), np.ones(3)), 0.0)
+
+
+def fake_training(progress, fail=None, cancel=False, **params):
+    """Stand-in job handler: reports progress, optionally fails or is cancelled midway."""
+    progress(50, 'Halfway')
+    if cancel:
+        TrainingJob.objects.update(cancel_requested=True)
+        progress(60, 'Checkpoint')
+    if fail:
+        raise TrainingError(fail)
+    return {'params': params}
+
+
+@mock.patch.dict(jobs.JOB_HANDLERS, {'forecast': 'forecast.tests.fake_training'})
+class TrainingJobTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('analyst', password='pw')
+        self.client.force_login(self.user)
+
+    def test_submit_queues_and_returns_at_once(self):
+        response = self.client.post(reverse('train_model'), {'mode': 'global', 'force': '1'})
+        self.assertEqual(response.status_code, 202)
+        job = TrainingJob.objects.get()
+        self.assertEqual((job.status, job.requested_by), ('queued', self.user))
+        self.assertEqual(job.params, {'mode': 'global', 'engine': 'random_forest', 'force': True})
+
+        # The worker's side, run inline
+        jobs.run_job(job.pk)
+        status = self.client.get(response.json()['status_url']).json()
+        self.assertEqual((status['status'], status['progress'], status['stage']), ('succeeded', 100, 'Done'))
+        self.assertEqual(status['result'], {'params': {'mode': 'global', 'engine': 'random_forest', 'force': True}})
+
+    @override_settings(TRAINING_JOBS_EAGER=True)
+    def test_failures_and_cancellation_are_recorded(self):
+        job = jobs.submit_job('forecast', fail='No sales data to train on.')
+        self.assertEqual((job.status, job.message, job.stage), ('failed', 'No sales data to train on.', 'Halfway'))
+
+        job = jobs.submit_job('forecast', cancel=True)
+        self.assertEqual((job.status, job.progress), ('cancelled', 60))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_queued_jobs_cancel_before_they_start(self):
+        job = jobs.submit_job('forecast')
+        response = self.client.post(reverse('cancel_training_job', args=[job.job_id]))
+        self.assertEqual(response.json()['status'], 'cancelled')
+        jobs.run_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.progress), ('cancelled', 0))
+
+    def test_jobs_without_a_heartbeat_are_failed_when_read(self):
+        now = timezone.now()
+        orphan = TrainingJob.objects.create(kind='forecast', status='running', heartbeat_at=now - timedelta(minutes=10))
+        live = TrainingJob.objects.create(kind='forecast', status='queued', heartbeat_at=now)
+        eager = TrainingJob.objects.create(kind='forecast', status='running')
+
+        status = self.client.get(reverse('training_job_status', args=[orphan.job_id])).json()
+        self.assertEqual(status['status'], 'failed')
+        self.assertIn('Interrupted', status['message'])
+        live.refresh_from_db()
+        eager.refresh_from_db()
+        self.assertEqual((live.status, eager.status), ('queued', 'running'))
+
+
+def seed_sales(start, days, series=(('Pizza', 'Loc_A'), ('Pizza', 'Loc_B'), ('Salad', 'Loc_A'), ('Salad', 'Loc_B'))):
+    """One sale per series and day, with a weekly pattern; the rollup is refreshed for the range."""
+    SalesData.objects.bulk_create([
+        SalesData(
+            transaction_date=timezone.make_aware(datetime.combine(start + timedelta(days=d), datetime.min.time()) + timedelta(hours=12)),
+            order_id=f'{d}-{item}-{loc}', item_category=item, location_id=loc,
+            quantity_sold=5 + (d % 7) + 3 * i, total_price=10,
+        )
+        for d in range(days) for i, (item, loc) in enumerate(series)
+    ])
+    refresh_rollup(start, start + timedelta(days=days - 1))
+
+
+class SnapshotTests(TestCase):
+    def setUp(self):
+        self.dir = self.enterContext(tempfile.TemporaryDirectory())
+        # Small batches, so the item/location dictionaries grow across them
+        self.enterContext(self.settings(DATASET_SNAPSHOT_DIR=self.dir, DATASET_SNAPSHOT_FETCH_SIZE=7))
+        self.start = date(2025, 1, 1)
+        seed_sales(self.start, 10)
+
+    def test_reused_while_the_watermark_is_unchanged(self):
+        path = snapshots.rollup_snapshot()
+        with mock.patch.object(snapshots, 'build_snapshot') as build:
+            self.assertEqual(snapshots.rollup_snapshot(), path)
+        build.assert_not_called()
+
+    def test_rebuilt_after_a_rollup_write(self):
+        path = snapshots.rollup_snapshot()
+        day = self.start + timedelta(days=3)
+        SalesData.objects.create(
+            transaction_date=timezone.make_aware(datetime.combine(day, datetime.min.time()) + timedelta(hours=18)),
+            order_id='late-order', item_category='Soup', location_id='Loc_C', quantity_sold=4, total_price=8,
+        )
+        rebuilt = snapshots.rollup_snapshot()
+        self.assertNotEqual(rebuilt, path)
+        # The stale snapshot is cleaned up
+        self.assertEqual(os.listdir(self.dir), [os.path.basename(rebuilt)])
+        frame = snapshots.read_snapshot(rebuilt)
+        self.assertEqual(frame[frame['item_category'] == 'Soup']['quantity'].tolist(), [4])
+
+    def test_columns_are_typed_and_match_the_rollup(self):
+        frame = snapshots.rollup_frame()
+        self.assertTrue(pd.api.types.is_datetime64_dtype(frame['date']))
+        self.assertEqual(
+            [str(frame[col].dtype) for col in ('item_category', 'location_id', 'quantity', 'revenue')],
+            ['category', 'category', 'float32', 'float32'],
+        )
+        rows = DailySalesRollup.objects.order_by('id').values_list('date', 'item_category', 'location_id', 'quantity', 'revenue')
+        self.assertEqual(
+            list(zip(frame['date'].dt.date, frame['item_category'], frame['location_id'], frame['quantity'], frame['revenue'])),
+            [(d, item, loc, float(qty), float(revenue)) for d, item, loc, qty, revenue in rows],
+        )
+
+
+@override_settings(FORECAST_SERIES_N_JOBS=1, FORECAST_INCREMENTAL_TREES=5)
+class IncrementalUpdateTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.enterContext(self.settings(
+            MODEL_ARTIFACT_DIR=os.path.join(tmp.name, 'models'), DATASET_SNAPSHOT_DIR=os.path.join(tmp.name, 'snapshots'),
+        ))
+        registry.get_cache().clear()
+        self.start = date(2025, 1, 1)
+        seed_sales(self.start, 90)
+
+    def test_global_update_warm_starts_the_forest(self):
+        base = TrainingRun.objects.get(pk=train_forecast_model(horizon=7)['run_id'])
+        seed_sales(self.start + timedelta(days=90), 3)
+        result = train_forecast_model(horizon=7, mode='incremental')
+
+        run = TrainingRun.objects.get(pk=result['run_id'])
+        self.assertEqual((run.parent, run.mode), (base, 'global'))
+        self.assertEqual(len(registry.load_model(run.model_path)['model'].estimators_), 105)
+        # The parent's model is left as it was
+        self.assertEqual(len(registry.load_model(base.model_path)['model'].estimators_), 100)
+        dates = sorted({p.target_date.date() for p in run.salesprediction_set.all()})
+        self.assertEqual(dates, [self.start + timedelta(days=93 + d) for d in range(7)])
+
+        # Nothing new since: the update itself is handed back
+        self.assertTrue(train_forecast_model(horizon=7, mode='incremental')['cached'])
+
+    def test_runs_that_cannot_warm_start_are_passed_over(self):
+        forest = TrainingRun.objects.get(pk=train_forecast_model(horizon=7)['run_id'])
+        train_forecast_model(horizon=7, engine='hist_gb')
+        seed_sales(self.start + timedelta(days=90), 3)
+        result = train_forecast_model(horizon=7, mode='incremental')
+        self.assertEqual(TrainingRun.objects.get(pk=result['run_id']).parent, forest)
+
+    def test_hierarchical_update_refits_only_series_that_sold(self):
+        from . import hierarchical
+
+        base = TrainingRun.objects.get(pk=train_forecast_model(horizon=7, mode='hierarchical')['run_id'])
+        seed_sales(self.start + timedelta(days=90), 2, series=[('Pizza', 'Loc_A')])
+        with mock.patch.object(hierarchical, 'fit_series', wraps=hierarchical.fit_series) as fit_series:
+            result = train_forecast_model(horizon=7, mode='incremental')
+        self.assertEqual([c.args[0] for c in fit_series.call_args_list], [('Pizza', 'Loc_A')])
+
+        def forecasts(run, item, loc):
+            return dict(run.salesprediction_set.filter(item_category=item, location_id=loc).values_list('target_date', 'predicted_qty'))
+
+        run = TrainingRun.objects.get(pk=result['run_id'])
+        self.assertEqual(run.parent, base)
+        kept, parent_kept = forecasts(run, 'Salad', 'Loc_B'), forecasts(base, 'Salad', 'Loc_B')
+        self.assertEqual(len(kept), 7)
+        # Dates still in the horizon are copied; the two new ones are predicted
+        overlap = set(kept) & set(parent_kept)
+        self.assertEqual(len(overlap), 5)
+        self.assertEqual({d: kept[d] for d in overlap}, {d: parent_kept[d] for d in overlap})
+
+
+class TrainingCacheTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.enterContext(self.settings(
+            MODEL_ARTIFACT_DIR=os.path.join(tmp.name, 'models'), DATASET_SNAPSHOT_DIR=os.path.join(tmp.name, 'snapshots'),
+        ))
+        registry.get_cache().clear()
+        self.client.force_login(User.objects.create_user('analyst', password='pw'))
+        self.start = date(2025, 1, 1)
+        seed_sales(self.start, 60)
+        self.run = TrainingRun.objects.get(pk=train_forecast_model(horizon=7)['run_id'])
+
+    def train(self, **data):
+        return self.client.post(reverse('train_model'), dict({'mode': 'global', 'horizon': 7}, **data))
+
+    def test_unchanged_inputs_return_the_run_without_a_job(self):
+        response = self.train()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['status'], response.json()['run_id']), ('cached', self.run.pk))
+        self.assertFalse(TrainingJob.objects.exists())
+        # Other settings are other inputs
+        self.assertEqual(self.train(horizon=14).status_code, 202)
+
+    def test_force_queues_a_retrain(self):
+        response = self.train(force='1')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(TrainingJob.objects.get().params, {'mode': 'global', 'horizon': 7, 'engine': 'random_forest', 'force': True})
+
+    def test_rollup_changes_invalidate_the_run(self):
+        day = self.start + timedelta(days=30)
+        SalesData.objects.create(
+            transaction_date=timezone.make_aware(datetime.combine(day, datetime.min.time()) + timedelta(hours=18)),
+            order_id='late-order', item_category='Pizza', location_id='Loc_A', quantity_sold=2, total_price=4,
+        )  # Its post_save receiver refreshes the day's rollup
+        self.assertEqual(self.train().status_code, 202)
+        self.assertFalse(train_forecast_model(horizon=7)['cached'])
+
+
+class HierarchicalTrainingTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.enterContext(self.settings(
+            MODEL_ARTIFACT_DIR=os.path.join(tmp.name, 'models'), DATASET_SNAPSHOT_DIR=os.path.join(tmp.name, 'snapshots'),
+        ))
+        registry.get_cache().clear()
+        self.start = date(2025, 1, 1)
+        seed_sales(self.start, 90)
+
+    def test_stores_and_reconciled_totals_are_saved(self):
+        run = TrainingRun.objects.get(pk=train_forecast_model(horizon=7, mode='hierarchical')['run_id'])
+        self.assertEqual((run.mode, run.engine), ('hierarchical', 'random_forest'))
+        rows = list(run.salesprediction_set.values_list('item_category', 'location_id', 'target_date', 'predicted_qty'))
+        stores = [r for r in rows if r[1] is not None]
+        totals = {(item, day): qty for item, loc, day, qty in rows if loc is None}
+        self.assertEqual(len(stores), 4 * 7)
+        self.assertEqual(len(totals), 2 * 7)
+        self.assertEqual(
+            {day.date() for _, _, day, _ in stores}, {self.start + timedelta(days=90 + d) for d in range(7)},
+        )
+
+        summed = {}
+        for item, _, day, qty in stores:
+            summed[item, day] = summed.get((item, day), 0) + qty
+        self.assertEqual(totals.keys(), summed.keys())
+        for key, qty in totals.items():
+            self.assertAlmostEqual(qty, summed[key], places=6)
+        # One model per store series
+        self.assertEqual(sorted(registry.load_model(run.model_path)['series']), sorted({r[:2] for r in stores}))
+
+    def test_series_use_tuned_params_and_time_the_forecast(self):
+        TuningResult.objects.create(
+            engine='random_forest', params={'n_estimators': 7}, mae=1.0, n_candidates=1, n_fits=1,
+            folds=1, budget_seconds=1, elapsed_seconds=1,
+        )
+        run = TrainingRun.objects.get(pk=train_forecast_model(horizon=7, mode='hierarchical')['run_id'])
+        bundle = registry.load_model(run.model_path)
+        self.assertEqual(bundle['params'], {'n_estimators': 7})
+        self.assertEqual({len(model.estimators_) for model in bundle['model'].values()}, {7})
+        self.assertGreater(run.predict_ms, 0)
+
+        # Refits in an update keep the parent's params even after a new search
+        TuningResult.objects.create(
+            engine='random_forest', params={'n_estimators': 9}, mae=1.0, n_candidates=1, n_fits=1,
+            folds=1, budget_seconds=1, elapsed_seconds=1,
+        )
+        seed_sales(self.start + timedelta(days=90), 2, series=[('Pizza', 'Loc_A')])
+        update = TrainingRun.objects.get(pk=train_forecast_model(horizon=7, mode='incremental')['run_id'])
+        refit = registry.load_model(update.model_path)['model'][('Pizza', 'Loc_A')]
+        self.assertEqual(len(refit.estimators_), 7)
+        self.assertGreater(update.predict_ms, 0)
+
+
+class PredictionIntervalTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.enterContext(self.settings(
+            MODEL_ARTIFACT_DIR=os.path.join(tmp.name, 'models'), DATASET_SNAPSHOT_DIR=os.path.join(tmp.name, 'snapshots'),
+        ))
+        registry.get_cache().clear()
+        seed_sales(date(2025, 1, 1), 90)
+
+    def assertBoundsHoldPoints(self, run):
+        rows = list(run.salesprediction_set.values_list('confidence_lower', 'predicted_qty', 'confidence_upper'))
+        self.assertTrue(rows)
+        for lower, point, upper in rows:
+            self.assertIsNotNone(lower)
+            self.assertLessEqual(lower, point)
+            self.assertLessEqual(point, upper)
+
+    def test_forest_runs_store_bounds_around_the_point(self):
+        for mode in ('global', 'hierarchical'):
+            with self.subTest(mode=mode):
+                result = train_forecast_model(horizon=7, mode=mode)
+                self.assertBoundsHoldPoints(TrainingRun.objects.get(pk=result['run_id']))
+
+    def test_hierarchical_total_bounds_are_store_sums(self):
+        run = TrainingRun.objects.get(pk=train_forecast_model(horizon=7, mode='hierarchical')['run_id'])
+        rows = pd.DataFrame(list(run.salesprediction_set.values(
+            'item_category', 'location_id', 'target_date', 'predicted_qty', 'confidence_lower', 'confidence_upper',
+        )))
+        stores = rows[rows['location_id'].notna()].groupby(['item_category', 'target_date']).sum(numeric_only=True)
+        totals = rows[rows['location_id'].isna()].set_index(['item_category', 'target_date']).drop(columns='location_id')
+        self.assertEqual(len(totals), 2 * 7)
+        pd.testing.assert_frame_equal(totals.sort_index(), stores.sort_index()[totals.columns])
+
+    def test_hist_gb_runs_store_bounds(self):
+        for mode in ('global', 'hierarchical'):
+            with self.subTest(mode=mode):
+                result = train_forecast_model(horizon=7, mode=mode, engine='hist_gb')
+                self.assertBoundsHoldPoints(TrainingRun.objects.get(pk=result['run_id']))
+
+    def test_models_without_trees_get_no_bounds(self):
+        model = mock.Mock(estimators_=[], spec=['estimators_', 'predict'])
+        model.predict.return_value = np.ones(3)
+        point, lower, upper = predict_interval(model, np.zeros((3, 2)))
+        self.assertEqual(point.tolist(), [1, 1, 1])
+        self.assertTrue(np.isnan(lower).all() and np.isnan(upper).all())
+
+
+class TuningTests(TestCase):
+    """Successive halving with stand-in fits on threads, so scores and timing are controlled."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.enterContext(self.settings(
+            TUNING_CACHE_DIR=os.path.join(tmp.name, 'tuning'), DATASET_SNAPSHOT_DIR=os.path.join(tmp.name, 'snapshots'),
+        ))
+        self.enterContext(mock.patch.object(tuning, '_make_executor', lambda workers: ThreadPoolExecutor(workers)))
+        seed_sales(date(2025, 1, 1), 120)
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+
+    def tune(self, evaluate, budget=60):
+        with mock.patch.object(tuning, 'evaluate', evaluate):
+            return tuning.tune_model(budget=budget, candidates=9, n_folds=2, horizon=7, workers=2)
+
+    def test_best_candidate_of_the_last_rung_wins(self):
+        sampled = list(tuning.ParameterSampler(tuning.get_engine('random_forest').search_space, 8, random_state=0))
+        best = dict(sampled[3])
+
+        def evaluate(path, engine_name, params, fold, train_days):
+            return (0.5 if params == best else 1.0 if params == {} else 2.0), 0.0
+
+        result = self.tune(evaluate)
+        self.assertEqual((result['params'], result['mae'], result['baseline_mae']), (best, 0.5, 1.0))
+        self.assertFalse(result['budget_exhausted'])
+        rungs = TuningResult.objects.get().rungs
+        # 9 candidates, eta 3: 9 -> 3 -> 1 plus the defaults, on growing windows
+        self.assertEqual([len(r['candidates']) for r in rungs], [9, 3, 2])
+        self.assertEqual(sorted(r['train_days'] for r in rungs), [r['train_days'] for r in rungs])
+
+    def test_budget_stops_the_search_after_the_last_full_rung(self):
+        first_rung = []
+
+        def evaluate(path, engine_name, params, fold, train_days):
+            first_rung.append(first_rung[0] if first_rung else train_days)
+            if train_days > first_rung[0]:
+                self.release.wait()  # the full-window rung never finishes within the budget
+            return (1.0 if params == {} else 2.0), 0.0
+
+        result = self.tune(evaluate, budget=1)
+        self.assertTrue(result['budget_exhausted'])
+        self.assertEqual((result['params'], result['mae']), ({}, 1.0))
+        # Short rungs share the minimum window; the full-window one was cut off
+        self.assertEqual([r['finished'] for r in TuningResult.objects.get().rungs], [True, True, False])
+
+    def test_nothing_is_stored_when_the_first_rung_runs_out(self):
+        def evaluate(*args):
+            self.release.wait()
+
+        with self.assertRaises(TrainingError):
+            self.tune(evaluate, budget=0.2)
+        self.assertFalse(TuningResult.objects.exists())
@@ -0,0 +1,406 @@
+import hashlib
+import json
+import os
+import time
+import uuid
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_absolute_error, mean_absolute_percentage_error
+
+from django.conf import settings
+from django.db import transaction
+from core.caching import bump_versions
+from core.instrumentation import stage
+from . import features, registry, snapshots
+from .engines import MAX_NATIVE_CATEGORIES, get_engine
+from .models import TrainingRun, SalesPrediction
+
+
+HOLDOUT_FRACTION = 0.2
+
+
+class TrainingError(Exception):
+    """Raised when a training run cannot start, e.g. there is no data."""
+
+
+def _noop_progress(pct, stage):
+    pass
+
+
+def mape_nonzero(y_true, y_pred):
+    """
+    MAPE over days with sales; zero-sale days would divide by zero. The one
+    definition behind every run's and backtest's metric_mape, so they compare.
+    """
+    y_true, y_pred = np.asarray(y_true), np.asarray(y_pred)
+    sold = y_true != 0
+    return mean_absolute_percentage_error(y_true[sold], y_pred[sold]) if sold.any() else 0.0
+
+
+def make_forecast_model(n_jobs=-1, engine=None, params=None):
+    return get_engine(engine).make(n_jobs=n_jobs, **(params or {}))
+
+
+def training_fingerprint(mode, horizon, engine=None):
+    """
+    Hash of everything a run's output depends on: the data watermarks, the
+    feature configuration and the estimator params. Runs with equal
+    fingerprints produce the same forecasts, so one can stand in for another.
+    """
+    from .tuning import tuned_params
+    params = tuned_params(get_engine(engine).name)
+    if mode == 'hierarchical':
+        from .hierarchical import CALENDAR_COLUMNS, TEST_FRACTION, make_series_model
+        config = {'calendar': CALENDAR_COLUMNS, 'test_fraction': TEST_FRACTION}
+        model = make_series_model(engine, params)
+        data = {'sales': snapshots.watermark()}
+    else:
+        config = dict(features.FEATURE_CONFIG, holdout_fraction=HOLDOUT_FRACTION)
+        model = make_forecast_model(engine=engine, params=params)
+        data = {'sales': snapshots.watermark(), 'signals': features.exogenous_watermark()}
+
+    # n_jobs changes speed, not results
+    params = {k: v for k, v in model.get_params().items() if k != 'n_jobs'}
+    return hash_inputs({
+        'mode': mode,
+        'horizon': horizon,
+        'data': data,
+        'features': config,
+        'estimator': [type(model).__name__, params],
+    })
+
+
+def hash_inputs(payload):
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def cached_run(fingerprint):
+    """Latest run with this fingerprint, or None."""
+    return TrainingRun.objects.filter(fingerprint=fingerprint).order_by('-training_date').first()
+
+
+def run_summary(run, cached=False):
+    return {
+        'run_id': run.id, 'model_id': str(run.model_id), 'mode': run.mode, 'engine': run.engine,
+        'mae': run.metric_mae, 'mape': run.metric_mape, 'cached': cached,
+        'fit_seconds': run.fit_seconds, 'predict_ms': run.predict_ms, 'artifact_bytes': run.artifact_bytes,
+    }
+
+
+def build_forecast_features(categories, last_date, horizon, columns):
+    """
+    Calendar-only feature matrix for runs trained before lag features existed
+    (their bundles have no 'feature_config'). Returns (grid, X) where grid holds
+    the item_category/target_date of each row of X.
+    """
+    dates = pd.date_range(last_date + timedelta(days=1), periods=horizon, freq='D')
+    grid = pd.DataFrame({
+        'item_category': np.repeat(np.asarray(categories, dtype=object), len(dates)),
+        'target_date': np.tile(dates, len(categories)),
+    })
+
+    columns = list(columns)
+    col_index = {col: i for i, col in enumerate(columns)}
+    values = np.zeros((len(grid), len(columns)))
+
+    calendar = {
+        'dow': grid['target_date'].dt.dayofweek,
+        'month': grid['target_date'].dt.month,
+        'day': grid['target_date'].dt.day,
+    }
+    for col, series in calendar.items():
+        if col in col_index:
+            values[:, col_index[col]] = series.to_numpy()
+
+    # One-hot item columns; categories unseen at fit time keep an all-zero row
+    item_cols = np.array([col_index.get(f'item_{cat}', -1) for cat in categories])
+    rows_item_col = np.repeat(item_cols, len(dates))
+    known = rows_item_col >= 0
+    values[np.flatnonzero(known), rows_item_col[known]] = 1
+
+    return grid, pd.DataFrame(values, columns=columns)
+
+
+def encode_features(feats, categories, categorical=False):
+    """
+    Model matrix for a features.compute_features frame: feature columns plus
+    one-hot items, or with `categorical` one 'item' column of categorical
+    dtype for engines that split on categories natively.
+    """
+    X = feats[features.feature_columns()]
+    if categorical:
+        if len(categories) > MAX_NATIVE_CATEGORIES:
+            raise TrainingError(
+                f'{len(categories)} items exceed the {MAX_NATIVE_CATEGORIES} categories an engine with native '
+                'categorical support can split on; train with random_forest instead.'
+            )
+        return X.assign(item=pd.Categorical(feats['item_category'], categories=categories))
+    codes = pd.Categorical(feats['item_category'], categories=categories).codes
+    onehot = np.zeros((len(feats), len(categories)), dtype=np.float32)
+    known = codes >= 0
+    onehot[np.flatnonzero(known), codes[known]] = 1
+    # One block for all items: assigning hundreds of columns into X fragments it
+    onehot = pd.DataFrame(onehot, index=X.index, columns=[f'item_{cat}' for cat in categories])
+    return pd.concat([X, onehot], axis=1)
+
+
+def predict_interval(model, X, quantiles=None):
+    """
+    (point, lower, upper) predictions for the rows of X. For forests every
+    tree scores all rows once into a trees x rows matrix: its mean is the
+    forest's own prediction and its quantiles across trees (default
+    FORECAST_INTERVAL_QUANTILES) are the interval, so the bounds cost no more
+    than the point forecast. Models with their own predict_interval (the
+    hist_gb quantile models) supply the bounds; any other model gets NaN
+    bounds (stored as NULL).
+    """
+    quantiles = quantiles or settings.FORECAST_INTERVAL_QUANTILES
+    trees = getattr(model, 'estimators_', None)
+    if hasattr(model, 'predict_interval'):
+        point, lower, upper = model.predict_interval(X)
+    elif isinstance(trees, list) and trees and hasattr(trees[0], 'tree_'):
+        values = np.ascontiguousarray(X, dtype=np.float32)
+        per_tree = np.empty((len(trees), len(values)))
+        for i, tree in enumerate(trees):
+            per_tree[i] = tree.predict(values, check_input=False)
+        point = per_tree.mean(axis=0)
+        lower, upper = np.quantile(per_tree, quantiles, axis=0)
+    else:
+        point = np.clip(model.predict(X), 0, None)
+        return point, np.full(len(point), np.nan), np.full(len(point), np.nan)
+
+    # No negative sales, and the interval always holds the point forecast
+    point = np.clip(point, 0, None)
+    return point, np.clip(np.minimum(lower, point), 0, None), np.maximum(upper, point)
+
+
+def recursive_forecast(model, history, exog, horizon, categories, categorical=False):
+    """
+    Forecasts `horizon` days after the end of `history` (date x item panel).
+    Lag features for day t+1 depend on the prediction for day t, so days are
+    scored one at a time, each as one batched predict over all items.
+    Intervals are per day given the point forecasts before it; they don't
+    widen with the error the recursion accumulates.
+    """
+    panel = features.extend_panel(history, horizon)
+    start = len(history)
+    bounds = np.empty((2, horizon, panel.shape[1]))
+    for t in range(start, start + horizon):
+        feats = features.compute_features(panel, exog, start=t, stop=t + 1)
+        panel.iloc[t], bounds[0, t - start], bounds[1, t - start] = predict_interval(
+            model, encode_features(feats, categories, categorical),
+        )
+
+    future = panel.iloc[start:]
+    return pd.DataFrame({
+        'item_category': np.tile(np.asarray(future.columns, dtype=object), len(future)),
+        'target_date': np.repeat(future.index.tz_localize('UTC'), len(future.columns)),
+        'predicted_qty': future.to_numpy().ravel(),
+        'confidence_lower': bounds[0].ravel(),
+        'confidence_upper': bounds[1].ravel(),
+    })
+
+
+def train_forecast_model(progress=_noop_progress, horizon=None, mode='global', force=False, engine=None):
+    """
+    Fetch -> feature engineering -> fit -> forecast for the next `horizon`
+    days (FORECAST_HORIZON_DAYS by default).
+    `progress(pct, stage)` is called between stages so a job runner can report
+    status and abort the run.
+
+    If an earlier run has the same training_fingerprint, it is returned as is
+    (result['cached'] is True) unless `force` is set.
+
+    mode='hierarchical' fits one model per (item_category, location_id)
+    series instead, see forecast.hierarchical. mode='incremental' updates the
+    latest run with the days added since, see forecast.incremental.
+
+    `engine` picks the estimator (forecast.engines; default random_forest).
+    """
+    horizon = horizon or settings.FORECAST_HORIZON_DAYS
+    if mode == 'incremental':
+        from .incremental import update_latest_run
+        return update_latest_run(progress, horizon, force)
+    if mode not in ('global', 'hierarchical'):
+        raise TrainingError(f'Unknown training mode: {mode}')
+    try:
+        engine = get_engine(engine)
+    except ValueError as e:
+        raise TrainingError(str(e))
+
+    fingerprint = training_fingerprint(mode, horizon, engine.name)
+    if not force:
+        run = cached_run(fingerprint)
+        if run is not None:
+            return run_summary(run, cached=True)
+
+    if mode == 'hierarchical':
+        from .hierarchical import train_hierarchical
+        return train_hierarchical(progress, horizon, fingerprint, engine.name)
+
+    # 1. Fetch Data
+    progress(5, 'Fetching sales data')
+    # Daily Sales per Item, summed over locations from the precomputed rollup
+    panel = features.load_sales_panel()
+    if panel.empty:
+        raise TrainingError('No sales data to train on.')
+    categories = list(panel.columns)
+
+    # 2. Feature Engineering: lags, rolling stats, calendar and market signals
+    progress(20, 'Building features')
+    first_day, last_day = panel.index.min(), panel.index.max()
+    exog = features.load_exogenous(first_day, last_day + timedelta(days=horizon))
+    feats = features.compute_features(panel, exog)
+
+    # Target
+    y = feats['quantity']
+    X = encode_features(feats, categories, engine.categorical)
+
+    # 3. Train on every day up to a calendar cutoff, hold out the rest for all items
+    progress(35, 'Fitting model')
+    cutoff = panel.index[int(len(panel) * (1 - HOLDOUT_FRACTION)) - 1]
+    train = (feats['date'] <= cutoff).to_numpy()
+    X_train, X_test, y_train, y_test = X[train], X[~train], y[train], y[~train]
+
+    # Params of the latest tuning search for this engine, if any (forecast.tuning)
+    from .tuning import tuned_params
+    model = engine.make(**tuned_params(engine.name))
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+
+    # 4. Metrics
+    progress(70, 'Scoring holdout')
+    preds_test = model.predict(X_test)
+    mae = mean_absolute_error(y_test, preds_test)
+    mape = mape_nonzero(y_test, preds_test)
+
+    # 5. Forecast Future (next `horizon` days), one batched predict per day
+    progress(80, 'Generating forecast')
+    start = time.perf_counter()
+    grid = recursive_forecast(model, panel, exog, horizon, categories, engine.categorical)
+    predict_ms = (time.perf_counter() - start) * 1000
+
+    # 6. Save Run (last, so a cancelled job leaves nothing half-written)
+    progress(95, 'Saving run')
+    return save_run(
+        'global', model, grid, mae, mape, fingerprint,
+        engine=engine.name, fit_seconds=fit_seconds, predict_ms=predict_ms,
+        columns=list(X.columns),
+        categories=categories,
+        feature_config=features.FEATURE_CONFIG,
+        last_date=last_day.tz_localize('UTC'),
+    )
+
+
+def save_run(mode, model, forecast, mae, mape, fingerprint='', parent=None, engine='random_forest',
+             fit_seconds=None, predict_ms=None, **metadata):
+    """
+    Stores the model artifact, then the TrainingRun and its SalesPrediction rows
+    in one transaction. `forecast` has item_category, target_date,
+    predicted_qty and optionally location_id (missing/None = all locations)
+    and confidence_lower/confidence_upper (NaN = no interval).
+    """
+    model_id = uuid.uuid4()
+    model_path = registry.save_model('forecast', model_id, model, mode=mode, engine=engine, **metadata)
+
+    def column(name):
+        if name not in forecast:
+            return [None] * len(forecast)
+        values = forecast[name]
+        return values.astype(object).where(values.notna(), None).tolist()
+
+    bulk_preds = [
+        SalesPrediction(
+            item_category=cat, location_id=loc, target_date=date, predicted_qty=qty,
+            confidence_lower=lower, confidence_upper=upper,
+        )
+        for cat, loc, date, qty, lower, upper in zip(
+            forecast['item_category'], column('location_id'),
+            forecast['target_date'].dt.to_pydatetime(), forecast['predicted_qty'].tolist(),
+            column('confidence_lower'), column('confidence_upper'),
+        )
+    ]
+    try:
+        with transaction.atomic():
+            run = TrainingRun.objects.create(
+                model_id=model_id,
+                mode=mode,
+                metric_mae=mae,
+                metric_mape=mape,
+                model_path=model_path,
+                fingerprint=fingerprint,
+                parent=parent,
+                engine=engine,
+                fit_seconds=fit_seconds,
+                predict_ms=predict_ms,
+                artifact_bytes=os.path.getsize(model_path),
+            )
+            for pred in bulk_preds:
+                pred.training_run = run
+            SalesPrediction.objects.bulk_create(bulk_preds, batch_size=5000)
+            bump_versions(SalesPrediction)
+    except Exception:
+        # No run points at the artifact; don't leave it behind
+        registry.delete_model(model_path)
+        raise
+
+    return run_summary(run)
+
+
+def predict_from_run(run, start_date=None, horizon=None):
+    """
+    Predict-only path: scores `horizon` days from `start_date` (default: the day
+    after the training data ends) with the run's stored model, no refit.
+    Returns a DataFrame of item_category, target_date, predicted_qty,
+    confidence_lower, confidence_upper (plus location_id for hierarchical runs).
+    """
+    if not registry.artifact_exists(run.model_path):
+        raise TrainingError(f'Run {run.model_id} has no stored model artifact.')
+    horizon = horizon or settings.FORECAST_HORIZON_DAYS
+
+    with stage('load_model'):
+        bundle = registry.load_model(run.model_path)
+    if start_date is None:
+        last_date = bundle['last_date']
+    else:
+        last_date = pd.Timestamp(start_date, tz='UTC') - timedelta(days=1)
+
+    if bundle.get('mode') == 'hierarchical':
+        from .hierarchical import predict_hierarchical
+        with stage('predict'):
+            return predict_hierarchical(bundle, last_date, horizon)
+
+    if 'feature_config' not in bundle:
+        with stage('features'):
+            grid, feat = build_forecast_features(bundle['categories'], last_date, horizon, bundle['columns'])
+        with stage('predict'):
+            grid['predicted_qty'], grid['confidence_lower'], grid['confidence_upper'] = \
+                predict_interval(bundle['model'], feat)
+        return grid
+
+    # Lags need the actual sales just before the window; if the window starts
+    # after the data ends, the gap is forecast recursively too.
+    categories = pd.Index(bundle['categories'], name='item_category')
+    history_end = last_date.tz_localize(None).normalize()
+    with stage('fetch'):
+        history = features.load_sales_panel(
+            start_date=(history_end - timedelta(days=features.MAX_LOOKBACK)).date(),
+            end_date=history_end.date(),
+        )
+    if not history.empty:
+        history_end = min(history_end, history.index.max())
+    history_dates = pd.date_range(history_end - timedelta(days=features.MAX_LOOKBACK - 1), history_end, freq='D')
+    history = history.reindex(index=history_dates, columns=categories, fill_value=0) if not history.empty \
+        else pd.DataFrame(0.0, index=history_dates, columns=categories)
+
+    gap = (last_date.tz_localize(None).normalize() - history_end).days
+    with stage('fetch'):
+        exog = features.load_exogenous(history_dates[0], history_end + timedelta(days=gap + horizon))
+    categorical = get_engine(bundle.get('engine')).categorical
+    # Features are rebuilt day by day inside the recursive forecast
+    with stage('predict'):
+        grid = recursive_forecast(bundle['model'], history, exog, gap + horizon, categories, categorical)
+    return grid[grid['target_date'] > last_date].reset_index(drop=True)
@@ -0,0 +1,243 @@
+"""
+Hyperparameter search for the global forecast model.
+
+Candidates are sampled from the engine's search_space (forecast.engines) and
+raced with successive halving: every rung fits all surviving candidates on
+each time-series CV fold, keeps the best 1/TUNING_ETA by mean validation MAE
+and gives the survivors eta times more history in the next rung; the last
+rung trains on the full history before each fold's cutoff. The engine's
+default params race along in every rung as the baseline. Validation is
+one-step ahead (actual lags) over the `horizon` days after each cutoff, which
+ranks candidates like the recursive backtest at a fraction of the cost.
+
+The fold datasets (features of the whole panel, encoded once) are written to
+one joblib file keyed by the data watermark; pool workers memory-map it, so no
+candidate rebuilds features. Fits run on a process pool and the search stops
+at a wall-clock budget: pending fits are cancelled and the best candidate of
+the last finished rung wins. The winner is stored as a TuningResult, whose
+params every later training run of that engine starts from (tuned_params).
+"""
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import timedelta
+
+import django
+import joblib
+import numpy as np
+from sklearn.metrics import mean_absolute_error
+from sklearn.model_selection import ParameterSampler
+
+from django.conf import settings
+from . import features, snapshots
+from .backtest import fold_cutoffs
+from .engines import get_engine
+from .models import TuningResult
+from .training import TrainingError, _noop_progress, encode_features, hash_inputs
+
+# Fold datasets already loaded by this (worker) process, keyed by path
+_fold_data = {}
+
+
+def tuned_params(engine):
+    """Params of the latest TuningResult for `engine`, or {} (engine defaults)."""
+    result = TuningResult.objects.filter(engine=engine).order_by('-created_at').first()
+    return dict(result.params) if result is not None else {}
+
+
+def fold_cache_prefix(engine):
+    # One-hot and categorical encodings are cached side by side
+    return 'folds-categorical-' if engine.categorical else 'folds-onehot-'
+
+
+def build_fold_data(engine, n_folds, horizon):
+    """
+    Encoded features for the whole sales panel plus the fold cutoffs, written
+    once per data version and reused by every candidate. Returns the path.
+    """
+    key = hash_inputs({
+        'sales': snapshots.watermark(),
+        'signals': features.exogenous_watermark(),
+        'features': features.FEATURE_CONFIG,
+        'categorical': engine.categorical,
+        'folds': n_folds,
+        'horizon': horizon,
+    })[:16]
+    prefix = fold_cache_prefix(engine)
+    path = os.path.join(settings.TUNING_CACHE_DIR, f'{prefix}{key}.joblib')
+    if os.path.isfile(path):
+        return path
+
+    panel = features.load_sales_panel()
+    if panel.empty:
+        raise TrainingError('No sales data to tune on.')
+    exog = features.load_exogenous(panel.index.min(), panel.index.max())
+    feats = features.compute_features(panel, exog)
+    cutoffs = fold_cutoffs(panel.index, n_folds, horizon, 2 * features.MAX_LOOKBACK)
+
+    epoch = panel.index.min()
+    data = {
+        'X': encode_features(feats, list(panel.columns), engine.categorical),
+        'y': feats['quantity'].to_numpy(),
+        # Days since the first day, so fold masks are integer comparisons
+        'day': ((feats['date'] - epoch) // timedelta(days=1)).to_numpy(),
+        'cutoffs': [(c - epoch).days for c in cutoffs],
+        'horizon': horizon,
+    }
+    os.makedirs(settings.TUNING_CACHE_DIR, exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    joblib.dump(data, tmp_path)
+    os.replace(tmp_path, path)
+    # Older data versions are never read again
+    for name in os.listdir(settings.TUNING_CACHE_DIR):
+        if name.startswith(prefix) and name.endswith('.joblib') and name != os.path.basename(path):
+            os.remove(os.path.join(settings.TUNING_CACHE_DIR, name))
+    return path
+
+
+def _load_fold_data(path):
+    if path not in _fold_data:
+        _fold_data.clear()
+        _fold_data[path] = joblib.load(path, mmap_mode='r')
+    return _fold_data[path]
+
+
+def evaluate(path, engine_name, params, fold, train_days):
+    """
+    Validation MAE of one candidate on one fold, trained on the `train_days`
+    days before the fold's cutoff. Runs in a pool worker.
+    """
+    data = _load_fold_data(path)
+    day, cutoff = data['day'], data['cutoffs'][fold]
+    train = (day <= cutoff) & (day > cutoff - train_days)
+    valid = (day > cutoff) & (day <= cutoff + data['horizon'])
+
+    # Candidates are scored on the point forecast; bound models would only add fit time
+    model = get_engine(engine_name).make(n_jobs=1, intervals=False, **params)
+    start = time.perf_counter()
+    model.fit(data['X'][train], data['y'][train])
+    mae = mean_absolute_error(data['y'][valid], model.predict(data['X'][valid]))
+    return mae, time.perf_counter() - start
+
+
+def rung_train_days(max_days, n_rungs, eta, min_days):
+    """Training days per rung: the last rung gets everything, each earlier one 1/eta of the next."""
+    return [max(min_days, int(max_days / eta ** (n_rungs - 1 - r))) for r in range(n_rungs)]
+
+
+def _make_executor(workers):
+    # spawn, like forecast.jobs: tuning may itself run inside a pool worker
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=django.setup,
+    )
+
+
+def tune_model(progress=_noop_progress, engine=None, budget=None, candidates=None, n_folds=None,
+               horizon=None, seed=0, workers=None):
+    """
+    Successive-halving search for `engine` within `budget` seconds; stores and
+    returns the winner as a TuningResult summary dict.
+    """
+    try:
+        engine = get_engine(engine)
+    except ValueError as e:
+        raise TrainingError(str(e))
+    budget = budget or settings.TUNING_BUDGET_SECONDS
+    candidates = candidates or settings.TUNING_CANDIDATES
+    n_folds = n_folds or settings.TUNING_FOLDS
+    horizon = horizon or settings.FORECAST_HORIZON_DAYS
+    workers = workers or settings.TUNING_WORKERS
+    eta = settings.TUNING_ETA
+    start = time.monotonic()
+    deadline = start + budget
+
+    # 1. Fold datasets, built once per data version
+    progress(5, 'Building fold datasets')
+    path = build_fold_data(engine, n_folds, horizon)
+    data = _load_fold_data(path)
+    folds = range(len(data['cutoffs']))
+    max_days = max(data['cutoffs']) + 1
+
+    # 2. Candidates: the engine defaults plus sampled configurations
+    sampled = ParameterSampler(engine.search_space, candidates - 1, random_state=seed)
+    configs = [{}] + [dict(p) for p in sampled if dict(p)]
+    n_rungs = int(math.log(len(configs), eta) + 1e-9) + 1
+    days_per_rung = rung_train_days(max_days, n_rungs, eta, min_days=2 * features.MAX_LOOKBACK)
+
+    # 3. Successive halving over the pool
+    rungs, survivors, best, n_fits, baseline_mae = [], list(range(len(configs))), None, 0, None
+    exhausted = False
+    executor = _make_executor(workers)
+    try:
+        for r, train_days in enumerate(days_per_rung):
+            if time.monotonic() >= deadline:
+                exhausted = True
+                break
+            progress(10 + 80 * r / n_rungs, f'Rung {r + 1}/{n_rungs}: {len(survivors)} candidates, {train_days} days')
+            futures = {
+                executor.submit(evaluate, path, engine.name, configs[c], fold, train_days): c
+                for c in survivors for fold in folds
+            }
+            scores = {c: [] for c in survivors}
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+                if not done:
+                    exhausted = True
+                    for future in pending:
+                        future.cancel()
+                    break
+                for future in done:
+                    mae, _ = future.result()
+                    scores[futures[future]].append(mae)
+                    n_fits += 1
+
+            complete = {c: float(np.mean(s)) for c, s in scores.items() if len(s) == len(folds)}
+            ranked = sorted(complete, key=complete.get)
+            rungs.append({
+                'train_days': train_days,
+                'finished': not exhausted,
+                'candidates': [{'params': configs[c], 'mae': complete[c]} for c in ranked],
+            })
+            if exhausted:
+                # A partly raced rung is kept for the record but can't pick the winner
+                break
+            best = (ranked[0], complete[ranked[0]])
+            baseline_mae = complete.get(0)
+            # The defaults always run along, so the winner is never worse than them
+            survivors = ranked[:max(1, math.ceil(len(ranked) / eta))]
+            if 0 not in survivors:
+                survivors.append(0)
+    finally:
+        # Fits already running finish in the background; nothing waits for them
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    if best is None:
+        raise TrainingError(f'The first rung did not finish within the {budget:.0f}s tuning budget.')
+
+    # 4. Store the winner for later training runs
+    progress(95, 'Saving tuning result')
+    winner, mae = best
+    result = TuningResult.objects.create(
+        engine=engine.name,
+        params=configs[winner],
+        mae=mae,
+        baseline_mae=baseline_mae,
+        n_candidates=len(configs),
+        n_fits=n_fits,
+        folds=len(folds),
+        budget_seconds=budget,
+        elapsed_seconds=time.monotonic() - start,
+        budget_exhausted=exhausted,
+        data_fingerprint=os.path.basename(path)[len(fold_cache_prefix(engine)):-len('.joblib')],
+        rungs=rungs,
+    )
+    return {
+        'tuning_id': result.id, 'engine': result.engine, 'params': result.params, 'mae': result.mae,
+        'baseline_mae': result.baseline_mae, 'n_fits': result.n_fits,
+        'elapsed_seconds': result.elapsed_seconds, 'budget_exhausted': result.budget_exhausted,
+    }
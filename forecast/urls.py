@@ -4,4 +4,7 @@ from . import views
 urlpatterns = [
     path('', views.training_hub, name='training_hub'),
     path('train/', views.train_model, name='train_model'),
+    path('predict/', views.predict, name='forecast_predict'),
+    path('jobs/<uuid:job_id>/', views.job_status, name='training_job_status'),
+    path('jobs/<uuid:job_id>/cancel/', views.cancel_training_job, name='cancel_training_job'),
 ]
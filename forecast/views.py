@@ -1,154 +1,194 @@
-from django.shortcuts import render, redirect
+from django.shortcuts import render, redirect, get_object_or_404
 from django.http import JsonResponse
+from django.urls import reverse
+from django.conf import settings
+from django.utils.dateparse import parse_date
+from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from sales.models import SalesData, BillOfMaterial
-from .models import TrainingRun, SalesPrediction
-import pandas as pd
-import numpy as np
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_absolute_error, mean_absolute_percentage_error
-from datetime import timedelta
+from django.core.exceptions import ValidationError
+from django.db.models import Sum
+from .models import TrainingRun, SalesPrediction, TrainingJob
+from .jobs import submit_job, cancel_job, fail_orphaned_jobs
+from core.caching import cached
+from core.instrumentation import stage
+from sales.models import BillOfMaterial, Ingredient
 import json
 
 @login_required
 def training_hub(request):
     runs = TrainingRun.objects.order_by('-training_date')[:5]
     
-    # Prepare data for charts (Last Run)
+    # Prepare data for charts (Last Run, or the run picked via ?run=<model_id>)
     last_run = runs.first()
-    predictions = []
+    if request.GET.get('run'):
+        try:
+            last_run = TrainingRun.objects.filter(model_id=request.GET['run']).first() or last_run
+        except ValidationError:
+            pass
+    # Chart data and ingredient needs only change with the run's predictions or the BOM
+    hub = {'predictions_json': '[]', 'horizon_days': settings.FORECAST_HORIZON_DAYS, 'ingredient_needs': []}
     if last_run:
-        preds = SalesPrediction.objects.filter(training_run=last_run).order_by('target_date')
-        for p in preds:
-            predictions.append({
-                'date': p.target_date.strftime('%Y-%m-%d'),
-                'item': p.item_category,
-                'qty': p.predicted_qty
-            })
-            
-    # Ingredient Forecast
-    ingredient_needs = []
-    if predictions:
-        # Group predictions by item
-        df_pred = pd.DataFrame(predictions)
-        if not df_pred.empty:
-            summary = df_pred.groupby('item')['qty'].sum().reset_index()
-            
-            for _, row in summary.iterrows():
-                boms = BillOfMaterial.objects.filter(item_category=row['item'])
-                for bom in boms:
-                    ingredient_needs.append({
-                        'ingredient': bom.ingredient.name,
-                        'unit': bom.ingredient.unit,
-                        'qty': row['qty'] * bom.quantity_per_unit
-                    })
-                    
-    # Aggregate ingredients
-    if ingredient_needs:
-        df_ing = pd.DataFrame(ingredient_needs)
-        ing_summary = df_ing.groupby(['ingredient', 'unit'])['qty'].sum().reset_index().to_dict('records')
-    else:
-        ing_summary = []
+        hub = cached(
+            'forecast:training_hub', [TrainingRun, SalesPrediction, BillOfMaterial, Ingredient],
+            lambda: training_hub_data(last_run), last_run.pk,
+        )
+        if hub.get('bom_error'):
+            messages.error(request, f"Ingredient needs unavailable: {hub['bom_error']}")
+
+    fail_orphaned_jobs()
+    active_job = TrainingJob.objects.filter(kind='forecast', status__in=['queued', 'running']).order_by('-created_at').first()
 
     context = {
         'runs': runs,
+        'shown_run': last_run,
+        'training_modes': TrainingRun.TRAIN_MODE_CHOICES,
+        'engines': TrainingRun.ENGINE_CHOICES,
+        'horizon_days': hub['horizon_days'],
+        'active_job': active_job,
+        'predictions_json': hub['predictions_json'],
+        'ingredient_needs': hub['ingredient_needs']
+    }
+    with stage('render'):
+        return render(request, 'forecast/training_hub.html', context)
+
+
+def training_hub_data(run):
+    predictions = []
+    # All-location rows only; hierarchical runs also hold per-store rows
+    with stage('fetch'):
+        preds = list(SalesPrediction.objects.filter(training_run=run, location_id__isnull=True).order_by('target_date'))
+    for p in preds:
+        predictions.append({
+            'date': p.target_date.strftime('%Y-%m-%d'),
+            'item': p.item_category,
+            'qty': p.predicted_qty,
+            'lower': p.confidence_lower,
+            'upper': p.confidence_upper,
+        })
+
+    # Ingredient Forecast: forecast totals per item x exploded BOM matrix
+    # A BOM cycle (e.g. an Ingredient renamed after its recipe) leaves the needs empty
+    bom_error = None
+    with stage('bom'):
+        from sales.bom import BomCycleError, get_bom_explosion
+        totals = SalesPrediction.objects.filter(training_run=run, location_id__isnull=True).values('item_category').annotate(qty=Sum('predicted_qty')).order_by()
+        try:
+            ing_summary = get_bom_explosion().requirements({t['item_category']: t['qty'] for t in totals})
+        except BomCycleError as e:
+            ing_summary, bom_error = [], str(e)
+
+    return {
         'predictions_json': json.dumps(predictions),
-        'ingredient_needs': ing_summary
+        'horizon_days': len({p['date'] for p in predictions}) or settings.FORECAST_HORIZON_DAYS,
+        'ingredient_needs': ing_summary,
+        'bom_error': bom_error,
     }
-    return render(request, 'forecast/training_hub.html', context)
 
 @login_required
 def train_model(request):
     if request.method == 'POST':
-        # 1. Fetch Data
-        sales_qs = SalesData.objects.all().values('transaction_date', 'item_category', 'quantity_sold')
-        if not sales_qs:
-             return JsonResponse({'status': 'error', 'message': 'No sales data to train on.'})
-             
-        df = pd.DataFrame(list(sales_qs))
-        df['transaction_date'] = pd.to_datetime(df['transaction_date'])
-        
-        # Aggregate to Daily Sales per Item
-        df = df.groupby(['transaction_date', 'item_category'])['quantity_sold'].sum().reset_index()
-        
-        # 2. Feature Engineering
-        df['dow'] = df['transaction_date'].dt.dayofweek
-        df['month'] = df['transaction_date'].dt.month
-        df['day'] = df['transaction_date'].dt.day
-        
-        # One-hot encode Item Category
-        df = pd.get_dummies(df, columns=['item_category'], prefix='item', drop_first=False) # Keep all for simple reconstruction if needed
-        
-        # Target
-        y = df['quantity_sold']
-        X = df.drop(['quantity_sold', 'transaction_date'], axis=1)
-        
-        # 3. Train
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, shuffle=False) # Time series split roughly
-        
-        model = RandomForestRegressor(n_estimators=100, random_state=42)
-        model.fit(X_train, y_train)
-        
-        # 4. Metrics
-        preds_test = model.predict(X_test)
-        mae = mean_absolute_error(y_test, preds_test)
-        mape = mean_absolute_percentage_error(y_test, preds_test)
-        
-        # Save Run
-        run = TrainingRun.objects.create(
-            metric_mae=mae,
-            metric_mape=mape,
-            model_path="memory_only_for_prototype"
-        )
-        
-        # 5. Forecast Future (Next 14 Days) for each Item Category
-        # We need a list of categories.
-        # Re-fetch unique categories from DB to be sure
-        categories = SalesData.objects.values_list('item_category', flat=True).distinct()
-        
-        last_date = df['transaction_date'].max()
-        future_dates = [last_date + timedelta(days=x) for x in range(1, 15)]
-        
-        bulk_preds = []
-        
-        for cat in categories:
-            for date in future_dates:
-                # Construct feature vector
-                # This is a bit simplified. In reality we need exact same columns.
-                # We'll create a single row DF and fill missing cols with 0
-                
-                row = {
-                    'dow': date.dayofweek,
-                    'month': date.month,
-                    'day': date.day,
-                }
-                # Set item_{cat} = 1, others 0
-                for c in categories:
-                    col_name = f'item_{c}'
-                    if col_name in X.columns:
-                        row[col_name] = 1 if c == cat else 0
-                        
-                # Ensure all X columns are present
-                feat_df = pd.DataFrame([row])
-                for col in X.columns:
-                    if col not in feat_df.columns:
-                        feat_df[col] = 0
-                
-                # Align columns
-                feat_df = feat_df[X.columns]
-                
-                pred_qty = model.predict(feat_df)[0]
-                
-                bulk_preds.append(SalesPrediction(
-                    training_run=run,
-                    item_category=cat,
-                    target_date=date,
-                    predicted_qty=max(0, pred_qty) # No negative sales
-                ))
-                
-        SalesPrediction.objects.bulk_create(bulk_preds)
-        
-        return JsonResponse({'status': 'success', 'mae': mae, 'mape': mape})
+        params = {}
+        if request.POST.get('horizon'):
+            try:
+                params['horizon'] = int(request.POST['horizon'])
+            except ValueError:
+                params['horizon'] = 0
+            if not 1 <= params['horizon'] <= 365:
+                return JsonResponse({'status': 'error', 'message': 'Horizon must be between 1 and 365 days.'})
+        mode = request.POST.get('mode') or 'global'
+        if mode not in dict(TrainingRun.TRAIN_MODE_CHOICES):
+            return JsonResponse({'status': 'error', 'message': f'Unknown training mode: {mode}'})
+        params['mode'] = mode
+        engine = request.POST.get('engine') or 'random_forest'
+        if engine not in dict(TrainingRun.ENGINE_CHOICES):
+            return JsonResponse({'status': 'error', 'message': f'Unknown engine: {engine}'})
+        params['engine'] = engine
+
+        # Inputs unchanged since an earlier run: hand that run back, no job
+        if request.POST.get('force'):
+            params['force'] = True
+        elif mode != 'incremental':  # depends on the latest run; the job checks it
+            from .training import cached_run, training_fingerprint
+            horizon = params.get('horizon') or settings.FORECAST_HORIZON_DAYS
+            run = cached_run(training_fingerprint(mode, horizon, engine))
+            if run is not None:
+                return JsonResponse({
+                    'status': 'cached',
+                    'run_id': run.id,
+                    'model_id': str(run.model_id),
+                    'mae': run.metric_mae,
+                    'mape': run.metric_mape,
+                    'run_url': f"{reverse('training_hub')}?run={run.model_id}",
+                })
+
+        job = submit_job('forecast', user=request.user, **params)
+        return JsonResponse({
+            'status': 'queued',
+            'job_id': str(job.job_id),
+            'status_url': reverse('training_job_status', args=[job.job_id]),
+            'cancel_url': reverse('cancel_training_job', args=[job.job_id]),
+        }, status=202)
         
-    return JsonResponse({'status': 'error', 'message': 'Invalid method'})
\ No newline at end of file
+    return JsonResponse({'status': 'error', 'message': 'Invalid method'})
+
+@login_required
+def job_status(request, job_id):
+    fail_orphaned_jobs()
+    job = get_object_or_404(TrainingJob, job_id=job_id)
+    return JsonResponse(job.to_dict())
+
+@login_required
+def cancel_training_job(request, job_id):
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error', 'message': 'Invalid method'})
+    job = get_object_or_404(TrainingJob, job_id=job_id)
+    cancel_job(job)
+    return JsonResponse(job.to_dict())
+
+
+@login_required
+def predict(request):
+    """Scores new dates with a stored model (latest run by default) without refitting."""
+    from .registry import artifact_exists
+    from .training import TrainingError, predict_from_run
+
+    if request.GET.get('model_id'):
+        try:
+            run = get_object_or_404(TrainingRun, model_id=request.GET['model_id'])
+        except (ValidationError, KeyError):
+            return JsonResponse({'status': 'error', 'message': 'Invalid model_id.'}, status=400)
+    else:
+        run = next((r for r in TrainingRun.objects.order_by('-training_date')[:20] if artifact_exists(r.model_path)), None)
+        if run is None:
+            return JsonResponse({'status': 'error', 'message': 'No trained model available. Run a training first.'})
+
+    try:
+        start_date = parse_date(request.GET['start']) if request.GET.get('start') else None
+        horizon = int(request.GET.get('horizon') or settings.FORECAST_HORIZON_DAYS)
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Invalid start date or horizon.'}, status=400)
+    if request.GET.get('start') and start_date is None:
+        return JsonResponse({'status': 'error', 'message': 'Invalid start date or horizon.'}, status=400)
+    if not 1 <= horizon <= 365:
+        return JsonResponse({'status': 'error', 'message': 'Horizon must be between 1 and 365 days.'}, status=400)
+
+    try:
+        grid = predict_from_run(run, start_date=start_date, horizon=horizon)
+    except TrainingError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)})
+
+    return JsonResponse({
+        'status': 'success',
+        'model_id': str(run.model_id),
+        'predictions': [
+            {'date': d.strftime('%Y-%m-%d'), 'item': item, 'location': loc, 'qty': qty, 'lower': lower, 'upper': upper}
+            for item, loc, d, qty, lower, upper in zip(
+                grid['item_category'],
+                grid['location_id'] if 'location_id' in grid else [None] * len(grid),
+                grid['target_date'],
+                grid['predicted_qty'].tolist(),
+                grid['confidence_lower'].tolist(),
+                grid['confidence_upper'].tolist(),
+            )
+        ],
+    })
@@ -1,60 +1,188 @@
 import pandas as pd
 import numpy as np
 import argparse
-from datetime import datetime, timedelta
-import uuid
-import random
+import gzip
+from datetime import datetime
 
-def generate_sales_data(rows, output_file, start_date_str, randomness):
+ITEMS = [
+    ('Pizza', 12.0),
+    ('Burger', 8.0),
+    ('Salad', 7.0),
+    ('Soda', 2.0)
+]
+# How strongly each item's demand follows temperature (per degree C above 15)
+ITEM_HEAT_SENSITIVITY = np.array([-0.01, 0.0, 0.03, 0.04])
+
+HEX_DIGITS = np.frombuffer(b'0123456789ABCDEF', dtype=np.uint8)
+DAY_SECONDS = 86400
+OPEN_HOURS = (8, 22)
+
+
+def location_names(count):
+    return [f'Loc_{chr(ord("A") + i)}' if i < 26 else f'Loc_{i:03d}' for i in range(count)]
+
+
+def hex_ids(values):
+    """8-char uppercase hex strings for uint32 values, without per-value formatting."""
+    nibbles = (values[:, None] >> np.arange(28, -4, -4, dtype=np.uint64)) & 0xF
+    return HEX_DIGITS[nibbles].view('S8').ravel().astype('U8')
+
+
+def simulate_signals(days, start_date_str, seed=None):
     """
-    Generates a dummy CSV file for the Foreat platform.
+    Daily market signals for the simulated period: temperature with an annual
+    cycle, rain on ~30% of days and occasional local events with an impact
+    score. One row per day, in the layout of WeatherSignal/LocalEvent.
     """
-    items = [
-        ('Pizza', 12.0),
-        ('Burger', 8.0),
-        ('Salad', 7.0),
-        ('Soda', 2.0)
-    ]
-    locations = ['Loc_A', 'Loc_B', 'Loc_C', 'Loc_D']
-    
-    start_date = datetime.strptime(start_date_str, '%Y-%m-%d')
-    data = []
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start_date_str, periods=days, freq='D')
+    day_of_year = dates.dayofyear.to_numpy()
 
-    print(f"Generating {rows} rows of data...")
+    temperature = 15 + 10 * np.sin(2 * np.pi * (day_of_year - 105) / 365) + rng.normal(0, 3, days)
+    precipitation = np.where(rng.random(days) < 0.3, rng.gamma(2.0, 3.0, days), 0.0)
+    has_event = rng.random(days) < 0.05
+    return pd.DataFrame({
+        'date': dates,
+        'temperature': temperature.round(1),
+        'precipitation': precipitation.round(1),
+        'event_impact': np.where(has_event, rng.integers(1, 11, days), 0),
+    })
+
+
+def demand_weights(signals):
+    """
+    Relative demand per (day, item): weekly and annual seasonality, plus the
+    weather and event effects. Rows are days, columns are ITEMS.
+    """
+    dates = pd.DatetimeIndex(signals['date'])
+    weekly = np.where(dates.dayofweek >= 4, 1.35, 1.0)  # Fri-Sun rush
+    annual = 1 + 0.15 * np.sin(2 * np.pi * (dates.dayofyear.to_numpy() - 80) / 365)
+    rain = 1 - 0.02 * np.minimum(signals['precipitation'].to_numpy(), 15)
+    events = 1 + 0.05 * signals['event_impact'].to_numpy()
+
+    heat = 1 + np.outer(signals['temperature'].to_numpy() - 15, ITEM_HEAT_SENSITIVITY)
+    weights = (weekly * annual * rain * events)[:, None] * np.clip(heat, 0.2, None)
+    return weights / weights.sum()
+
+
+def iter_sales_chunks(rows, start_date_str, randomness, seed=None, days=366, locations=4, chunk_size=1_000_000,
+                      signals=None):
+    """
+    Yields the dummy sales data as DataFrames of up to chunk_size rows, in the
+    CSV header layout. Everything is drawn with vectorized NumPy calls, so
+    memory is bounded by chunk_size and the output is reproducible for a seed.
+    Demand follows `signals` (simulate_signals output); pass the frame that is
+    also stored, so unseeded runs weight sales by the weather that is saved.
+    """
+    rng = np.random.default_rng(seed)
+    if signals is None:
+        signals = simulate_signals(days, start_date_str, seed)
+    flat_weights = demand_weights(signals).ravel()
+
+    item_names = np.array([name for name, _ in ITEMS], dtype=object)
+    base_prices = np.array([price for _, price in ITEMS])
+    shops = np.array(location_names(locations), dtype=object)
+    # Some stores are busier than others
+    shop_weights = rng.uniform(0.5, 1.5, locations)
+    shop_weights /= shop_weights.sum()
+
+    start = np.datetime64(datetime.strptime(start_date_str, '%Y-%m-%d'), 's')
+    for offset in range(0, rows, chunk_size):
+        n = min(chunk_size, rows - offset)
+        cell = rng.choice(len(flat_weights), size=n, p=flat_weights)
+        day, item = np.divmod(cell, len(ITEMS))
+        seconds = rng.integers(OPEN_HOURS[0] * 3600, OPEN_HOURS[1] * 3600, n)
+        stamps = start + (day * DAY_SECONDS + seconds).astype('timedelta64[s]')
 
-    for i in range(rows):
-        # Calculate a date
-        date_offset = random.randint(0, 365)
-        current_date = start_date + timedelta(days=date_offset)
-        
-        item_name, base_price = random.choice(items)
-        
         # Apply randomness factor to quantity and price
         # randomness=0 means strict defaults, randomness=1.0 means high variance
-        qty = max(1, int(random.gauss(3, 1 + randomness)))
-        price_variation = random.uniform(1 - (randomness * 0.2), 1 + (randomness * 0.2))
-        total_price = round(base_price * qty * price_variation, 2)
-        
-        data.append({
-            'T-Date': current_date.strftime('%Y-%m-%d %H:%M:%S'),
-            'Order_ID': str(uuid.uuid4())[:8].upper(),
-            'Category': item_name,
+        qty = np.maximum(1, rng.normal(3, 1 + randomness, n).astype(int))
+        price_variation = rng.uniform(1 - (randomness * 0.2), 1 + (randomness * 0.2), n)
+        total_price = np.round(base_prices[item] * qty * price_variation, 2)
+
+        yield pd.DataFrame({
+            'T-Date': np.char.replace(np.datetime_as_string(stamps, unit='s'), 'T', ' '),
+            'Order_ID': hex_ids(rng.integers(0, 2**32, n, dtype=np.uint64)),
+            'Category': item_names[item],
             'Price': total_price,
-            'Shop_ID': random.choice(locations),
-            'Units': qty
+            'Shop_ID': shops[rng.choice(locations, size=n, p=shop_weights)],
+            'Units': qty,
         })
 
-    df = pd.DataFrame(data)
-    df.to_csv(output_file, index=False)
-    print(f"Successfully saved {rows} rows to {output_file}")
+
+def build_sales_frame(rows, start_date_str, randomness, seed=None, **options):
+    """
+    Builds the whole dummy sales DataFrame in memory; see iter_sales_chunks.
+    """
+    return pd.concat(iter_sales_chunks(rows, start_date_str, randomness, seed, **options), ignore_index=True)
+
+
+def write_chunks(chunks, output_file):
+    """Writes chunks to .csv, .csv.gz or .parquet (needs pyarrow), inferred from the file name."""
+    written = 0
+    if output_file.endswith('.parquet'):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit('Parquet output needs pyarrow: pip install pyarrow')
+        writer = None
+        try:
+            for chunk in chunks:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(output_file, table.schema)
+                writer.write_table(table)
+                written += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+        return written
+
+    if output_file.endswith('.gz'):
+        # Level 3 compresses ~5x faster than gzip's default 9 for a few % more bytes
+        f = gzip.open(output_file, 'wt', newline='', compresslevel=3)
+    else:
+        f = open(output_file, 'w', newline='')
+    with f:
+        for i, chunk in enumerate(chunks):
+            chunk.to_csv(f, index=False, header=(i == 0))
+            written += len(chunk)
+    return written
+
+
+def generate_sales_data(rows, output_file, start_date_str, randomness, seed=None, days=366,
+                        locations=4, chunk_size=1_000_000, signals_output=None):
+    """
+    Generates a dummy sales file for the Foreat platform.
+    """
+    print(f"Generating {rows} rows of data...")
+    signals = simulate_signals(days, start_date_str, seed)
+    chunks = iter_sales_chunks(rows, start_date_str, randomness, seed, days, locations, chunk_size, signals)
+    written = write_chunks(chunks, output_file)
+    print(f"Successfully saved {written} rows to {output_file}")
+
+    if signals_output:
+        signals.to_csv(signals_output, index=False)
+        print(f"Saved {days} days of weather/event signals to {signals_output}")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Generate dummy sales CSV for Foreat.')
     parser.add_argument('--rows', type=int, default=1000, help='Number of rows to generate')
-    parser.add_argument('--output', type=str, default='dummy_sales_upload.csv', help='Output filename')
+    parser.add_argument('--output', type=str, default='dummy_sales_upload.csv',
+                        help='Output filename; .csv, .csv.gz or .parquet')
     parser.add_argument('--start-date', type=str, default='2025-01-01', help='Start date (YYYY-MM-DD)')
+    parser.add_argument('--days', type=int, default=366, help='Days of history')
+    parser.add_argument('--locations', type=int, default=4, help='Number of store locations')
     parser.add_argument('--randomness', type=float, default=0.5, help='Randomness factor (0.0 to 1.0)')
+    parser.add_argument('--seed', type=int, default=None, help='Random seed for reproducible output')
+    parser.add_argument('--chunk-size', type=int, default=1_000_000, help='Rows generated and written per chunk')
+    parser.add_argument('--signals-output', type=str, default=None,
+                        help='Also write the simulated daily weather/event signals to this CSV')
 
     args = parser.parse_args()
-    
-    generate_sales_data(args.rows, args.output, args.start_date, args.randomness)
+
+    generate_sales_data(
+        args.rows, args.output, args.start_date, args.randomness, args.seed, args.days,
+        args.locations, args.chunk_size, args.signals_output,
+    )
@@ -3,11 +3,11 @@ from .models import WeatherSignal, LocalEvent
 
 @admin.register(WeatherSignal)
 class WeatherSignalAdmin(admin.ModelAdmin):
-    list_display = ('timestamp', 'temperature', 'precipitation')
-    list_filter = ('timestamp',)
+    list_display = ('timestamp', 'temperature', 'precipitation', 'source')
+    list_filter = ('source', 'timestamp')
 
 @admin.register(LocalEvent)
 class LocalEventAdmin(admin.ModelAdmin):
-    list_display = ('event_name', 'date', 'impact_score')
-    list_filter = ('date',)
+    list_display = ('event_name', 'date', 'impact_score', 'source')
+    list_filter = ('source', 'date')
     search_fields = ('event_name',)
\ No newline at end of file
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:59
+
+from django.db import migrations, models
+
+
+def tag_simulated_events(apps, schema_editor):
+    # Events written by import_dummy_sales so far all carry this name; earlier
+    # simulated weather can't be told from real readings and stays untagged
+    LocalEvent = apps.get_model('market_signals', 'LocalEvent')
+    LocalEvent.objects.filter(event_name='Local event').update(source='simulated')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market_signals', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='localevent',
+            name='source',
+            field=models.CharField(blank=True, default='', help_text="'simulated' for rows made by import_dummy_sales", max_length=50),
+        ),
+        migrations.AddField(
+            model_name='weathersignal',
+            name='source',
+            field=models.CharField(blank=True, default='', help_text="'simulated' for rows made by import_dummy_sales", max_length=50),
+        ),
+        migrations.RunPython(tag_simulated_events, reverse_code=migrations.RunPython.noop),
+    ]
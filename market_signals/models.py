@@ -4,6 +4,7 @@ class WeatherSignal(models.Model):
     timestamp = models.DateTimeField()
     temperature = models.FloatField()
     precipitation = models.FloatField()
+    source = models.CharField(max_length=50, blank=True, default='', help_text="'simulated' for rows made by import_dummy_sales")
 
     def __str__(self):
         return f"Weather at {self.timestamp}"
@@ -12,6 +13,7 @@ class LocalEvent(models.Model):
     date = models.DateField()
     event_name = models.CharField(max_length=200)
     impact_score = models.IntegerField(help_text="1-10 impact score")
+    source = models.CharField(max_length=50, blank=True, default='', help_text="'simulated' for rows made by import_dummy_sales")
 
     def __str__(self):
         return f"{self.event_name} on {self.date}"
\ No newline at end of file
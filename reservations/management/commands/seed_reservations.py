@@ -1,28 +1,38 @@
 from django.core.management.base import BaseCommand
+from core.caching import bump_versions
 from reservations.models import ReservationSignal
 from datetime import date, timedelta
-import random
+import numpy as np
 
 class Command(BaseCommand):
     help = 'Seed dummy reservation data'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help='Days of reservations, ending today')
+        parser.add_argument('--seed', type=int, default=None, help='Random seed for reproducible data')
+
     def handle(self, *args, **kwargs):
         ReservationSignal.objects.all().delete()
         
-        platforms = ['OpenTable', 'Internal', 'Resy']
-        
-        for i in range(30):
-            target_date = date.today() - timedelta(days=i)
-            booking_count = random.randint(20, 100)
-            # Simulate some no-shows (90% to 100% show rate)
-            actual_arrivals = int(booking_count * random.uniform(0.7, 1.0))
-            
-            ReservationSignal.objects.create(
-                target_date=target_date,
-                booking_count=booking_count,
-                party_size_total=booking_count * 2,
-                actual_arrivals=actual_arrivals,
-                platform=random.choice(platforms)
+        platforms = np.array(['OpenTable', 'Internal', 'Resy'], dtype=object)
+        days = kwargs['days']
+        rng = np.random.default_rng(kwargs['seed'])
+
+        booking_count = rng.integers(20, 101, days)
+        # Simulate some no-shows (70% to 100% show rate)
+        actual_arrivals = (booking_count * rng.uniform(0.7, 1.0, days)).astype(int)
+        platform = platforms[rng.integers(0, len(platforms), days)]
+
+        ReservationSignal.objects.bulk_create([
+            ReservationSignal(
+                target_date=date.today() - timedelta(days=i),
+                booking_count=int(booking_count[i]),
+                party_size_total=int(booking_count[i]) * 2,
+                actual_arrivals=int(actual_arrivals[i]),
+                platform=platform[i]
             )
+            for i in range(days)
+        ], batch_size=1000)
+        bump_versions(ReservationSignal)
             
-        self.stdout.write(self.style.SUCCESS('Successfully seeded 30 days of reservation data'))
+        self.stdout.write(self.style.SUCCESS(f'Successfully seeded {days} days of reservation data'))
@@ -0,0 +1,31 @@
+import uuid
+
+from django.db import migrations, models
+
+
+def gen_model_ids(apps, schema_editor):
+    NoShowTrainingRun = apps.get_model("reservations", "NoShowTrainingRun")
+    for run in NoShowTrainingRun.objects.all():
+        run.model_id = uuid.uuid4()
+        run.save(update_fields=["model_id"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reservations", "0002_noshowtrainingrun"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="noshowtrainingrun",
+            name="model_id",
+            field=models.UUIDField(default=uuid.uuid4, editable=False, null=True),
+        ),
+        migrations.RunPython(gen_model_ids, reverse_code=migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="noshowtrainingrun",
+            name="model_id",
+            field=models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0003_noshowtrainingrun_model_id'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reservationsignal',
+            name='target_date',
+            field=models.DateField(db_index=True),
+        ),
+    ]
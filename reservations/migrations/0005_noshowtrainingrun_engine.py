@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0004_time_series_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='noshowtrainingrun',
+            name='artifact_bytes',
+            field=models.BigIntegerField(blank=True, help_text='Size of the stored model artifact', null=True),
+        ),
+        migrations.AddField(
+            model_name='noshowtrainingrun',
+            name='engine',
+            field=models.CharField(choices=[('random_forest', 'Random forest'), ('hist_gb', 'Histogram gradient boosting')], default='random_forest', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='noshowtrainingrun',
+            name='fit_seconds',
+            field=models.FloatField(blank=True, help_text='Wall-clock time of the model fit', null=True),
+        ),
+        migrations.AddField(
+            model_name='noshowtrainingrun',
+            name='predict_ms',
+            field=models.FloatField(blank=True, help_text='Wall-clock time of scoring the training rows', null=True),
+        ),
+    ]
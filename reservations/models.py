@@ -1,7 +1,10 @@
 from django.db import models
+import uuid
+
+from forecast.models import TrainingRun
 
 class ReservationSignal(models.Model):
-    target_date = models.DateField()
+    target_date = models.DateField(db_index=True)
     booking_count = models.IntegerField()
     party_size_total = models.IntegerField()
     actual_arrivals = models.IntegerField(default=0)
@@ -17,9 +20,14 @@ class ReservationSignal(models.Model):
         return f"{self.target_date} - {self.platform} ({self.booking_count} bookings)"
 
 class NoShowTrainingRun(models.Model):
+    model_id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     training_date = models.DateTimeField(auto_now_add=True)
     mae = models.FloatField()
     model_path = models.CharField(max_length=200)
+    engine = models.CharField(max_length=20, choices=TrainingRun.ENGINE_CHOICES, default='random_forest')
+    fit_seconds = models.FloatField(null=True, blank=True, help_text="Wall-clock time of the model fit")
+    predict_ms = models.FloatField(null=True, blank=True, help_text="Wall-clock time of scoring the training rows")
+    artifact_bytes = models.BigIntegerField(null=True, blank=True, help_text="Size of the stored model artifact")
 
     def __cl__(self):
         return f"Training on {self.training_date}"
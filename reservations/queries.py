@@ -0,0 +1,35 @@
+"""Aggregate queries behind the reservation dashboard."""
+from django.db.models import Case, F, FloatField, Sum, Value, When
+from django.db.models.functions import Greatest
+
+from core.queries import window_start
+from .models import ReservationSignal
+
+
+def daily_noshow_stats(days=None):
+    """
+    Per target date in the dashboard window (all platforms combined): bookings,
+    actual arrivals, no-shows and no-show rate in percent, computed in SQL.
+    Returns a list of dicts ordered by date.
+    """
+    start = window_start(ReservationSignal.objects.all(), 'target_date', days)
+    if start is None:
+        return []
+
+    no_shows = Greatest(F('booking_count') - F('actual_arrivals'), Value(0))
+    rows = (
+        ReservationSignal.objects.filter(target_date__gte=start)
+        .values('target_date')
+        .annotate(
+            bookings=Sum('booking_count'),
+            actuals=Sum('actual_arrivals'),
+            no_shows=Sum(no_shows),
+        )
+        .annotate(no_show_rate=Case(
+            When(bookings__gt=0, then=100.0 * F('no_shows') / F('bookings')),
+            default=Value(0.0),
+            output_field=FloatField(),
+        ))
+        .order_by('target_date')
+    )
+    return list(rows)
@@ -1,3 +1,57 @@
-from django.test import TestCase
+from datetime import date, timedelta
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import ReservationSignal
+from .queries import daily_noshow_stats
+
+
+def seed(start, days, platforms=('OpenTable', 'Internal')):
+    ReservationSignal.objects.bulk_create([
+        ReservationSignal(
+            target_date=start + timedelta(days=d), booking_count=20, party_size_total=50,
+            actual_arrivals=15, platform=platform,
+        )
+        for d in range(days) for platform in platforms
+    ])
+
+
+class NoShowStatsTests(TestCase):
+    def test_aggregates_platforms_per_day(self):
+        day = date(2025, 3, 1)
+        ReservationSignal.objects.create(target_date=day, booking_count=10, party_size_total=20, actual_arrivals=8, platform='OpenTable')
+        ReservationSignal.objects.create(target_date=day, booking_count=10, party_size_total=20, actual_arrivals=12, platform='Internal')
+        ReservationSignal.objects.create(target_date=day + timedelta(days=1), booking_count=0, party_size_total=0, actual_arrivals=0, platform='Internal')
+
+        first, second = daily_noshow_stats()
+        self.assertEqual((first['bookings'], first['actuals'], first['no_shows']), (20, 20, 2))
+        # Over-arrivals on one platform don't cancel no-shows on another
+        self.assertAlmostEqual(first['no_show_rate'], 10.0)
+        self.assertEqual(second['no_show_rate'], 0.0)
+
+    def test_window_ends_at_latest_date(self):
+        seed(date(2025, 1, 1), 30)
+        with self.settings(DASHBOARD_WINDOW_DAYS=7):
+            stats = daily_noshow_stats()
+        self.assertEqual([s['target_date'] for s in stats], [date(2025, 1, 24) + timedelta(days=d) for d in range(7)])
+
+
+# Measures the queries behind the page, so the view cache stays out of the way
+@override_settings(VIEW_CACHE_ENABLED=False)
+class ReservationDashboardQueryTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('analyst', password='pw'))
+
+    def test_query_count_is_constant(self):
+        seed(date(2025, 1, 1), 5)
+        with CaptureQueriesContext(connection) as captured:
+            self.client.get(reverse('reservation_dashboard'))
+
+        seed(date(2025, 1, 6), 200, platforms=('OpenTable', 'Internal', 'Phone'))
+        with self.assertNumQueries(len(captured)):
+            response = self.client.get(reverse('reservation_dashboard'))
+        self.assertEqual(response.status_code, 200)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import SalesData, Ingredient, BillOfMaterial
+from .models import SalesData, Ingredient, BillOfMaterial, DailySalesRollup
 
 @admin.register(SalesData)
 class SalesDataAdmin(admin.ModelAdmin):
@@ -16,4 +16,9 @@ class IngredientAdmin(admin.ModelAdmin):
 class BillOfMaterialAdmin(admin.ModelAdmin):
     list_display = ('item_category', 'ingredient', 'quantity_per_unit')
     list_filter = ('item_category', 'ingredient')
-    search_fields = ('item_category', 'ingredient__name')
\ No newline at end of file
+    search_fields = ('item_category', 'ingredient__name')
+
+@admin.register(DailySalesRollup)
+class DailySalesRollupAdmin(admin.ModelAdmin):
+    list_display = ('date', 'item_category', 'location_id', 'quantity', 'revenue')
+    list_filter = ('item_category', 'location_id', 'date')
\ No newline at end of file
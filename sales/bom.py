@@ -0,0 +1,101 @@
+"""
+Bill-of-materials explosion.
+
+The whole BOM is loaded once into a sparse item x ingredient matrix, so
+ingredient requirements for any forecast are a single vector-matrix product.
+
+Recipes can be nested: an Ingredient whose name is also an item_category in
+BillOfMaterial is a prep item (e.g. "Pizza Dough"), and is expanded into its
+own ingredients when the matrix is built. Only raw ingredients remain in the
+exploded matrix.
+"""
+import numpy as np
+from scipy import sparse
+from core.caching import cached
+
+from .models import BillOfMaterial, Ingredient
+
+MAX_DEPTH = 10
+
+
+class BomCycleError(ValueError):
+    pass
+
+
+class BomExplosion:
+    def __init__(self, items, ingredients, matrix):
+        self.items = items                  # row labels: item_category
+        self.ingredients = ingredients      # column labels: (name, unit) of raw ingredients
+        self.matrix = matrix                # csr_matrix, raw qty per unit of item
+        self.item_index = {name: i for i, name in enumerate(items)}
+
+    def requirements(self, item_quantities):
+        """
+        Maps {item_category: forecast qty} to a list of
+        {'ingredient', 'unit', 'qty'} dicts for the raw ingredients needed.
+        Items without a BOM are ignored.
+        """
+        demand = np.zeros(len(self.items))
+        for item, qty in item_quantities.items():
+            i = self.item_index.get(item)
+            if i is not None:
+                demand[i] += qty
+
+        totals = self.matrix.T @ demand
+        needs = [
+            {'ingredient': name, 'unit': unit, 'qty': float(qty)}
+            for (name, unit), qty in zip(self.ingredients, totals)
+            if qty
+        ]
+        return sorted(needs, key=lambda n: (n['ingredient'], n['unit']))
+
+
+def build_bom_explosion():
+    ingredients = list(Ingredient.objects.values_list('id', 'name', 'unit').order_by('id'))
+    lines = list(BillOfMaterial.objects.values_list('item_category', 'ingredient_id', 'quantity_per_unit'))
+    if not lines:
+        return BomExplosion([], [], sparse.csr_matrix((0, 0)))
+
+    recipes = sorted({item for item, _, _ in lines})
+    recipe_index = {name: i for i, name in enumerate(recipes)}
+    ing_index = {ing_id: j for j, (ing_id, _, _) in enumerate(ingredients)}
+
+    # Direct usage: recipe x ingredient
+    rows = [recipe_index[item] for item, _, _ in lines]
+    cols = [ing_index[ing_id] for _, ing_id, _ in lines]
+    direct = sparse.csr_matrix(
+        ([qty for _, _, qty in lines], (rows, cols)),
+        shape=(len(recipes), len(ingredients)),
+    )
+
+    # Prep ingredients map onto the recipe of the same name
+    prep = [(j, recipe_index[name]) for j, (_, name, _) in enumerate(ingredients) if name in recipe_index]
+    is_prep = np.zeros(len(ingredients), dtype=bool)
+    is_prep[[j for j, _ in prep]] = True
+    to_recipe = sparse.csr_matrix(
+        (np.ones(len(prep)), ([j for j, _ in prep], [r for _, r in prep])),
+        shape=(len(ingredients), len(recipes)),
+    )
+    keep_raw = sparse.diags((~is_prep).astype(float))
+
+    # Expand prep columns level by level: F <- F*raw + (F*to_recipe)*direct
+    exploded = direct
+    for _ in range(MAX_DEPTH):
+        nested = exploded @ to_recipe
+        if nested.nnz == 0:
+            break
+        exploded = exploded @ keep_raw + nested @ direct
+    else:
+        raise BomCycleError(f'Sub-recipes nest deeper than {MAX_DEPTH} levels; check for a cycle.')
+
+    raw_cols = np.flatnonzero(~is_prep)
+    return BomExplosion(
+        items=recipes,
+        ingredients=[(ingredients[j][1], ingredients[j][2]) for j in raw_cols],
+        matrix=sparse.csr_matrix(exploded[:, raw_cols]),
+    )
+
+
+def get_bom_explosion():
+    """Exploded BOM, cached until a BillOfMaterial or Ingredient write (core.caching)."""
+    return cached('sales:bom_explosion', [BillOfMaterial, Ingredient], build_bom_explosion)
@@ -1,48 +1,75 @@
-import random
 from datetime import timedelta
-from django.utils import timezone
+
+import pandas as pd
 from django.core.management.base import BaseCommand
-from sales.models import SalesData
-import uuid
+from django.db import transaction
+from django.utils import timezone
+
+from generate_sales_csv import iter_sales_chunks, simulate_signals
+from market_signals.models import LocalEvent, WeatherSignal
+from sales.ingest import ingest_chunks
+
+# WeatherSignal/LocalEvent.source of the rows this command writes
+SIMULATED = 'simulated'
+
+# generate_sales_csv header -> SalesData field
+GENERATOR_MAPPING = {
+    'transaction_date': 'T-Date',
+    'order_id': 'Order_ID',
+    'item_category': 'Category',
+    'total_price': 'Price',
+    'location_id': 'Shop_ID',
+    'quantity_sold': 'Units',
+}
+
 
 class Command(BaseCommand):
-    help = 'Generate dummy sales data'
+    help = 'Generate dummy sales data (plus matching weather/event signals) for the past year'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=3650, help='Sales rows to generate')
+        parser.add_argument('--days', type=int, default=366, help='Days of history, ending today')
+        parser.add_argument('--locations', type=int, default=3)
+        parser.add_argument('--randomness', type=float, default=0.5)
+        parser.add_argument('--seed', type=int, default=None, help='Random seed for reproducible data')
+        parser.add_argument('--chunk-size', type=int, default=500_000, help='Rows generated and inserted per chunk')
+        parser.add_argument('--no-signals', action='store_true', help='Skip creating WeatherSignal/LocalEvent rows')
 
     def handle(self, *args, **options):
-        items = [
-            ('Pizza', 12.0),
-            ('Burger', 8.0),
-            ('Salad', 7.0),
-            ('Soda', 2.0)
-        ]
-        
-        locations = ['Loc_A', 'Loc_B', 'Loc_C']
-        
-        end_date = timezone.now()
-        start_date = end_date - timedelta(days=365)
-        
-        current_date = start_date
-        total_created = 0
-        
-        while current_date <= end_date:
-            # 5-15 orders per day
-            daily_orders = random.randint(5, 15)
-            
-            for _ in range(daily_orders):
-                item_name, base_price = random.choice(items)
-                qty = random.randint(1, 5)
-                price = base_price * qty
-                
-                SalesData.objects.create(
-                    transaction_date=current_date,
-                    order_id=str(uuid.uuid4())[:8],
-                    item_category=item_name,
-                    total_price=price,
-                    location_id=random.choice(locations),
-                    quantity_sold=qty
-                )
-                total_created += 1
-            
-            current_date += timedelta(days=1)
-            
-        self.stdout.write(self.style.SUCCESS(f'Successfully created {total_created} sales records.'))
+        days = options['days']
+        start_date = (timezone.now() - timedelta(days=days - 1)).date().isoformat()
+
+        # One draw of the signals both weights the sales and is stored
+        signals = simulate_signals(days, start_date, options['seed'])
+        chunks = iter_sales_chunks(
+            options['rows'], start_date, options['randomness'], options['seed'],
+            days=days, locations=options['locations'], chunk_size=options['chunk_size'], signals=signals,
+        )
+        stats = ingest_chunks(chunks, GENERATOR_MAPPING)
+
+        if not options['no_signals']:
+            self.load_signals(signals)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Successfully created {stats['rows']} sales records in {stats['seconds']:.1f}s "
+            f"({stats['rows_per_sec']:,.0f} rows/sec)."
+        ))
+
+    def load_signals(self, signals):
+        noon = (pd.DatetimeIndex(signals['date']) + pd.Timedelta(hours=12)).tz_localize(timezone.get_current_timezone())
+        events = signals[signals['event_impact'] > 0]
+        first, last = signals['date'].min().date(), signals['date'].max().date()
+        with transaction.atomic():
+            # Replace, don't add to, the simulated signals of a previous run (features
+            # sum them per day); real readings in the range are left alone
+            WeatherSignal.objects.filter(timestamp__date__range=(first, last), source=SIMULATED).delete()
+            LocalEvent.objects.filter(date__range=(first, last), source=SIMULATED).delete()
+            WeatherSignal.objects.bulk_create([
+                WeatherSignal(timestamp=ts, temperature=temp, precipitation=rain, source=SIMULATED)
+                for ts, temp, rain in zip(noon.to_pydatetime(), signals['temperature'].tolist(), signals['precipitation'].tolist())
+            ], batch_size=1000)
+            LocalEvent.objects.bulk_create([
+                LocalEvent(date=d.date(), event_name='Local event', impact_score=impact, source=SIMULATED)
+                for d, impact in zip(events['date'], events['event_impact'].tolist())
+            ], batch_size=1000)
+        self.stdout.write(f'Created {len(signals)} weather readings and {len(events)} local events.')
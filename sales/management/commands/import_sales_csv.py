@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from sales.ingest import SYSTEM_FIELDS, ingest_csv
+
+
+class Command(BaseCommand):
+    help = 'Stream a POS sales CSV into SalesData in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file_path', type=str)
+        parser.add_argument(
+            '--map', action='append', default=[], metavar='FIELD=HEADER',
+            help='Map a system field to a CSV header, e.g. --map item_category=Category'
+        )
+        parser.add_argument('--chunk-size', type=int, default=None, help='Rows read per chunk')
+        parser.add_argument('--batch-size', type=int, default=None, help='Rows per INSERT batch')
+
+    def handle(self, *args, **options):
+        mapping = {}
+        for entry in options['map']:
+            field, sep, header = entry.partition('=')
+            if not sep or field not in SYSTEM_FIELDS:
+                raise CommandError(f'Invalid mapping "{entry}". Fields: {", ".join(SYSTEM_FIELDS)}')
+            mapping[field] = header
+        if not mapping:
+            # Assume the CSV already uses the system field names
+            mapping = {field: field for field in SYSTEM_FIELDS}
+
+        stats = ingest_csv(
+            options['file_path'], mapping,
+            chunk_size=options['chunk_size'], batch_size=options['batch_size']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {stats['rows']} rows ({stats['skipped']} skipped) in {stats['seconds']:.1f}s: "
+            f"{stats['rows_per_sec']:,.0f} rows/sec, peak memory {stats['peak_memory_mb']:.1f} MB"
+        ))
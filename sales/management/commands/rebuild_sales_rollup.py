@@ -0,0 +1,15 @@
+import time
+
+from django.core.management.base import BaseCommand
+from sales.rollup import rebuild_rollup
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the DailySalesRollup table from scratch from SalesData'
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        written = rebuild_rollup()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt daily sales rollup: {written} rows in {time.perf_counter() - start:.1f}s'
+        ))
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:48
+
+from django.db import migrations, models
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+
+
+def fill_rollup(apps, schema_editor):
+    # Same aggregation as sales.rollup.refresh_rollup(), over the historical models
+    SalesData = apps.get_model('sales', 'SalesData')
+    DailySalesRollup = apps.get_model('sales', 'DailySalesRollup')
+    totals = (
+        SalesData.objects.annotate(date=TruncDate('transaction_date'))
+        .values('date', 'item_category', 'location_id')
+        .annotate(quantity=Sum('quantity_sold'), revenue=Sum('total_price'))
+        .order_by()
+    )
+    batch = []
+    for row in totals.iterator(chunk_size=5000):
+        batch.append(DailySalesRollup(**row))
+        if len(batch) >= 5000:
+            DailySalesRollup.objects.bulk_create(batch)
+            batch = []
+    DailySalesRollup.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('item_category', models.CharField(max_length=100)),
+                ('location_id', models.CharField(max_length=100)),
+                ('quantity', models.BigIntegerField()),
+                ('revenue', models.DecimalField(decimal_places=2, max_digits=14)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('date', 'item_category', 'location_id'), name='unique_daily_sales_rollup')],
+            },
+        ),
+        migrations.RunPython(fill_rollup, reverse_code=migrations.RunPython.noop),
+    ]
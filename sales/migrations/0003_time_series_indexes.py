@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0002_dailysalesrollup'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='salesdata',
+            name='transaction_date',
+            field=models.DateTimeField(db_index=True),
+        ),
+        migrations.AddIndex(
+            model_name='salesdata',
+            index=models.Index(fields=['item_category', 'transaction_date'], name='sales_item_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salesdata',
+            index=models.Index(fields=['location_id', 'transaction_date'], name='sales_location_date_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0003_time_series_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='billofmaterial',
+            name='item_category',
+            field=models.CharField(help_text='Matches item_category in SalesData, or the name of a prep Ingredient (sub-recipe)', max_length=100),
+        ),
+    ]
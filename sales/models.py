@@ -1,13 +1,20 @@
+from django.core.exceptions import ValidationError
 from django.db import models
 
 class SalesData(models.Model):
-    transaction_date = models.DateTimeField()
+    transaction_date = models.DateTimeField(db_index=True)
     order_id = models.CharField(max_length=100)
     item_category = models.CharField(max_length=100)
     total_price = models.DecimalField(max_digits=10, decimal_places=2)
     location_id = models.CharField(max_length=100)
     quantity_sold = models.IntegerField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['item_category', 'transaction_date'], name='sales_item_date_idx'),
+            models.Index(fields=['location_id', 'transaction_date'], name='sales_location_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.item_category} - {self.transaction_date}"
 
@@ -19,9 +26,44 @@ class Ingredient(models.Model):
         return self.name
 
 class BillOfMaterial(models.Model):
-    item_category = models.CharField(max_length=100, help_text="Matches item_category in SalesData")
+    item_category = models.CharField(max_length=100, help_text="Matches item_category in SalesData, or the name of a prep Ingredient (sub-recipe)")
     ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE)
     quantity_per_unit = models.FloatField()
 
     def __str__(self):
-        return f"{self.item_category} uses {self.ingredient.name}"
\ No newline at end of file
+        return f"{self.item_category} uses {self.ingredient.name}"
+
+    def clean(self):
+        # A sub-recipe that (indirectly) contains its own item can't be exploded
+        if self.ingredient_id is None:
+            return
+        uses = {}
+        for item, name in BillOfMaterial.objects.exclude(pk=self.pk).values_list('item_category', 'ingredient__name'):
+            uses.setdefault(item, set()).add(name)
+        seen, todo = set(), [self.ingredient.name]
+        while todo:
+            name = todo.pop()
+            if name == self.item_category:
+                raise ValidationError({'ingredient': f'{self.ingredient.name} contains {self.item_category}, which would make a cycle.'})
+            if name not in seen:
+                seen.add(name)
+                todo.extend(uses.get(name, ()))
+
+class DailySalesRollup(models.Model):
+    """
+    Per day / item / location totals of SalesData, maintained by sales.rollup.
+    Dashboards and training read this instead of scanning raw transactions.
+    """
+    date = models.DateField()
+    item_category = models.CharField(max_length=100)
+    location_id = models.CharField(max_length=100)
+    quantity = models.BigIntegerField()
+    revenue = models.DecimalField(max_digits=14, decimal_places=2)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'item_category', 'location_id'], name='unique_daily_sales_rollup'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.item_category} @ {self.location_id}: {self.quantity}"
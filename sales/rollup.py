@@ -0,0 +1,59 @@
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from core.caching import bump_versions
+from .models import SalesData, DailySalesRollup
+
+BATCH_SIZE = 5000
+
+
+def _day_start(d):
+    return timezone.make_aware(datetime.combine(d, time.min), timezone.get_current_timezone())
+
+
+def refresh_rollup(start_date=None, end_date=None):
+    """
+    Recomputes DailySalesRollup for the dates in [start_date, end_date] from
+    SalesData; both None rebuilds the whole table. Returns the number of rollup
+    rows written. Only the touched days are re-aggregated, so an import of one
+    new day costs one day's worth of work regardless of history length.
+    """
+    sales = SalesData.objects.all()
+    rollups = DailySalesRollup.objects.all()
+    if start_date is not None:
+        sales = sales.filter(transaction_date__gte=_day_start(start_date))
+        rollups = rollups.filter(date__gte=start_date)
+    if end_date is not None:
+        sales = sales.filter(transaction_date__lt=_day_start(end_date + timedelta(days=1)))
+        rollups = rollups.filter(date__lte=end_date)
+
+    totals = (
+        sales.annotate(date=TruncDate('transaction_date'))
+        .values('date', 'item_category', 'location_id')
+        .annotate(quantity=Sum('quantity_sold'), revenue=Sum('total_price'))
+        .order_by()
+    )
+
+    written = 0
+    with transaction.atomic():
+        rollups.delete()
+        batch = []
+        for row in totals.iterator(chunk_size=BATCH_SIZE):
+            batch.append(DailySalesRollup(**row))
+            if len(batch) >= BATCH_SIZE:
+                DailySalesRollup.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        DailySalesRollup.objects.bulk_create(batch)
+        written += len(batch)
+        # The rollup is what views read of SalesData; bulk imports send no signals
+        bump_versions(SalesData)
+    return written
+
+
+def rebuild_rollup():
+    return refresh_rollup()
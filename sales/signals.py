@@ -0,0 +1,34 @@
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from .models import SalesData
+from .rollup import refresh_rollup
+
+# Sent after a bulk import commits, with first_day/last_day of the imported
+# sales and the number of rows. Bulk inserts send no post_save, so listeners
+# that care about new sales (e.g. forecast updates) hook in here.
+sales_imported = Signal()
+
+
+def sale_day(dt):
+    return dt.date() if timezone.is_naive(dt) else timezone.localdate(dt)
+
+
+@receiver(pre_save, sender=SalesData)
+def remember_sale_day(sender, instance, **kwargs):
+    # An edit may move the sale to another day; that day's total must drop it
+    stored = None
+    if instance.pk is not None:
+        stored = SalesData.objects.filter(pk=instance.pk).values_list('transaction_date', flat=True).first()
+    instance._stored_day = sale_day(stored) if stored else None
+
+
+@receiver([post_save, post_delete], sender=SalesData)
+def refresh_rollup_for_sale(sender, instance, **kwargs):
+    # Single-row edits (admin, shell). Bulk imports refresh their date range
+    # once in sales.ingest instead, since bulk inserts don't send signals.
+    day = sale_day(instance.transaction_date)
+    stored = getattr(instance, '_stored_day', None)
+    for d in {day, stored} - {None}:
+        refresh_rollup(d, d)
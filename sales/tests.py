@@ -1,3 +1,201 @@
-from django.test import TestCase
+from datetime import date, datetime
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import pandas as pd
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from market_signals.models import LocalEvent, WeatherSignal
+from .ingest import coerce_chunk, ingest_chunks
+from .models import BillOfMaterial, DailySalesRollup, Ingredient, SalesData
+from .rollup import rebuild_rollup, refresh_rollup
+from .signals import sales_imported
+
+
+def sale(day, quantity=1, price=10, item='Pizza', location='Loc_A'):
+    return SalesData(
+        transaction_date=timezone.make_aware(datetime.combine(day, datetime.min.time().replace(hour=12))),
+        order_id=f'{day}-{item}', item_category=item, total_price=price,
+        location_id=location, quantity_sold=quantity,
+    )
+
+
+def rollup():
+    return {
+        (r.date, r.item_category, r.location_id): (r.quantity, r.revenue)
+        for r in DailySalesRollup.objects.all()
+    }
+
+
+class CoerceChunkTests(SimpleTestCase):
+    MAPPING = {'transaction_date': 'When', 'order_id': 'Ticket', 'item_category': 'Item', 'total_price': 'Total',
+               'location_id': 'Store', 'quantity_sold': 'Qty'}
+
+    def test_timestamps_in_several_formats_are_all_parsed(self):
+        chunk = pd.DataFrame({'When': ['2025-03-01 12:00', '2025-03-01T14:00:00+02:00', '2025-03-02', 'soon']})
+        out, skipped = coerce_chunk(chunk, {'transaction_date': 'When'})
+        self.assertEqual(skipped, 1)
+        self.assertEqual(
+            [str(ts) for ts in out['transaction_date']],
+            ['2025-03-01 12:00:00+00:00', '2025-03-01 12:00:00+00:00', '2025-03-02 00:00:00+00:00'],
+        )
+
+    def test_columns_are_mapped_and_cast(self):
+        chunk = pd.DataFrame({
+            'When': ['2025-03-01 12:00'], 'Ticket': ['A1'], 'Item': [' Pizza '], 'Total': ['12.346'],
+            'Store': ['Loc_A'], 'Qty': ['3'], 'Notes': ['ignored'],
+        })
+        out, skipped = coerce_chunk(chunk, self.MAPPING)
+        self.assertEqual(skipped, 0)
+        self.assertEqual(list(out.columns), ['transaction_date', 'item_category', 'location_id', 'total_price',
+                                             'quantity_sold', 'order_id'])
+        self.assertEqual(
+            out.iloc[0][['order_id', 'item_category', 'total_price', 'location_id', 'quantity_sold']].tolist(),
+            ['A1', 'Pizza', 12.35, 'Loc_A', 3],
+        )
+
+    def test_unmapped_and_missing_columns_get_defaults(self):
+        # Store is left unmapped; Qty is mapped but absent from the file
+        chunk = pd.DataFrame({'When': ['2025-03-01 12:00', '2025-03-01 13:00'], 'Item': ['Pizza', None],
+                              'Total': ['bad', '4']})
+        mapping = dict(self.MAPPING, location_id='')
+        out, skipped = coerce_chunk(chunk, mapping)
+        self.assertEqual(skipped, 0)
+        self.assertEqual(out['item_category'].tolist(), ['Pizza', 'Unknown'])
+        self.assertEqual(out['location_id'].tolist(), ['Default', 'Default'])
+        self.assertEqual(out['total_price'].tolist(), [0.0, 4.0])
+        self.assertEqual(out['quantity_sold'].tolist(), [0, 0])
+        # No order id column at all: every row gets its own
+        self.assertEqual(out['order_id'].map(len).tolist(), [8, 8])
+        self.assertEqual(out['order_id'].nunique(), 2)
+
+    def test_blank_order_ids_are_generated(self):
+        chunk = pd.DataFrame({'When': ['2025-03-01 12:00'] * 3, 'Ticket': ['A1', None, '  ']})
+        out, _ = coerce_chunk(chunk, self.MAPPING)
+        ids = out['order_id'].tolist()
+        self.assertEqual(ids[0], 'A1')
+        self.assertTrue(all(isinstance(i, str) and len(i) == 8 for i in ids[1:]))
+        self.assertNotEqual(ids[1], ids[2])
+
+    def test_naive_timestamps_are_utc_and_unparseable_rows_are_skipped(self):
+        chunk = pd.DataFrame({'When': ['2025-03-01 23:30', None, 'not a date', '2025-03-01 23:30:00-05:00']})
+        out, skipped = coerce_chunk(chunk, self.MAPPING)
+        self.assertEqual(skipped, 2)
+        self.assertEqual(str(out['transaction_date'].dt.tz), 'UTC')
+        self.assertEqual(
+            [ts.isoformat() for ts in out['transaction_date']],
+            ['2025-03-01T23:30:00+00:00', '2025-03-02T04:30:00+00:00'],
+        )
+
+
+class RollupRefreshTests(TestCase):
+    def test_refresh_rewrites_only_the_given_days(self):
+        # bulk_create sends no signals: the rollup only changes when refreshed
+        SalesData.objects.bulk_create([
+            sale(date(2025, 3, 1), quantity=2, price=20),
+            sale(date(2025, 3, 1), quantity=3, price=30),
+            sale(date(2025, 3, 2), quantity=1, price=10, location='Loc_B'),
+        ])
+        self.assertEqual(refresh_rollup(date(2025, 3, 2), date(2025, 3, 2)), 1)
+        self.assertEqual(rollup(), {(date(2025, 3, 2), 'Pizza', 'Loc_B'): (1, 10)})
+
+        self.assertEqual(rebuild_rollup(), 2)
+        self.assertEqual(rollup(), {
+            (date(2025, 3, 1), 'Pizza', 'Loc_A'): (5, 50),
+            (date(2025, 3, 2), 'Pizza', 'Loc_B'): (1, 10),
+        })
+
+    def test_import_folds_its_days_into_the_rollup(self):
+        sale(date(2025, 2, 1), quantity=4, price=40).save()
+        chunk = pd.DataFrame({
+            'transaction_date': ['2025-03-01T12:00:00Z', '2025-03-01T13:00:00Z', '2025-03-03T12:00:00Z', 'not a date'],
+            'item_category': ['Pizza', 'Pizza', 'Salad', 'Pizza'],
+            'total_price': ['10', '12.5', '8', '1'],
+            'location_id': ['Loc_A'] * 4,
+            'quantity_sold': ['1', '2', '1', '1'],
+        })
+        received = []
+        sales_imported.connect(lambda **kwargs: received.append(kwargs), weak=False, dispatch_uid='test-import')
+        self.addCleanup(sales_imported.disconnect, dispatch_uid='test-import')
+        with self.captureOnCommitCallbacks(execute=True):
+            stats = ingest_chunks([chunk], {field: field for field in chunk.columns})
+
+        self.assertEqual((stats['rows'], stats['skipped']), (3, 1))
+        self.assertEqual(rollup(), {
+            (date(2025, 2, 1), 'Pizza', 'Loc_A'): (4, 40),
+            (date(2025, 3, 1), 'Pizza', 'Loc_A'): (3, 22.5),
+            (date(2025, 3, 3), 'Salad', 'Loc_A'): (1, 8),
+        })
+        self.assertEqual(
+            [(r['first_day'], r['last_day'], r['rows']) for r in received],
+            [(date(2025, 3, 1), date(2025, 3, 3), 3)],
+        )
+
+
+class RollupSignalTests(TestCase):
+    def test_moving_a_sale_refreshes_both_days(self):
+        s = sale(date(2025, 3, 1), quantity=2, price=20)
+        s.save()
+        self.assertEqual(rollup(), {(date(2025, 3, 1), 'Pizza', 'Loc_A'): (2, 20)})
+
+        s.transaction_date = s.transaction_date.replace(day=2)
+        s.save()
+        self.assertEqual(rollup(), {(date(2025, 3, 2), 'Pizza', 'Loc_A'): (2, 20)})
+
+        s.delete()
+        self.assertEqual(rollup(), {})
+
+
+class BomValidationTests(TestCase):
+    def test_sub_recipe_cycles_are_rejected(self):
+        dough = Ingredient.objects.create(name='Pizza Dough', unit='kg')
+        flour = Ingredient.objects.create(name='Flour', unit='kg')
+        BillOfMaterial.objects.create(item_category='Pizza', ingredient=dough, quantity_per_unit=0.3)
+        BillOfMaterial(item_category='Pizza Dough', ingredient=flour, quantity_per_unit=0.6).full_clean()
+
+        pizza = Ingredient.objects.create(name='Pizza', unit='pc')
+        with self.assertRaises(ValidationError):
+            BillOfMaterial(item_category='Pizza Dough', ingredient=pizza, quantity_per_unit=1).full_clean()
+        with self.assertRaises(ValidationError):
+            BillOfMaterial(item_category='Pizza', ingredient=pizza, quantity_per_unit=1).full_clean()
+
+
+class ImportDummySalesTests(TestCase):
+    def test_rerun_replaces_signals(self):
+        counts = []
+        for _ in range(2):
+            call_command('import_dummy_sales', rows=50, days=120, seed=1, stdout=StringIO())
+            counts.append((WeatherSignal.objects.count(), LocalEvent.objects.count()))
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(counts[0][0], 120)
+
+    def test_real_signals_in_the_range_are_kept(self):
+        noon = timezone.now().replace(hour=12, minute=0, second=0, microsecond=0)
+        real = WeatherSignal.objects.create(timestamp=noon, temperature=21.5, precipitation=0)
+        event = LocalEvent.objects.create(date=noon.date(), event_name='Local event', impact_score=5)
+        call_command('import_dummy_sales', rows=50, days=30, seed=1, stdout=StringIO())
+        call_command('import_dummy_sales', rows=50, days=30, seed=1, stdout=StringIO())
+        self.assertTrue(WeatherSignal.objects.filter(pk=real.pk).exists())
+        self.assertTrue(LocalEvent.objects.filter(pk=event.pk).exists())
+        self.assertEqual(WeatherSignal.objects.filter(source='simulated').count(), 30)
+
+    def test_sales_and_stored_signals_share_one_draw(self):
+        import generate_sales_csv
+        from sales.management.commands import import_dummy_sales
+
+        drawn, original = [], generate_sales_csv.simulate_signals
+
+        def simulate(*args):
+            drawn.append(original(*args))
+            return drawn[-1]
+
+        # Unseeded: a second draw would differ from the one weighting the sales
+        with mock.patch.object(import_dummy_sales, 'simulate_signals', simulate), \
+                mock.patch.object(generate_sales_csv, 'simulate_signals', side_effect=AssertionError('drawn twice')):
+            call_command('import_dummy_sales', rows=50, days=30, stdout=StringIO())
+        self.assertEqual(len(drawn), 1)
+        stored = list(WeatherSignal.objects.order_by('timestamp').values_list('temperature', flat=True))
+        self.assertEqual(stored, drawn[0]['temperature'].tolist())
@@ -1,11 +1,8 @@
 import os
-import pandas as pd
 from django.shortcuts import render, redirect
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from .models import SalesData
-import uuid
 
 @login_required
 def upload_view(request):
@@ -29,6 +26,10 @@ def upload_view(request):
 
 @login_required
 def map_columns_view(request):
+    # pandas (and the ingest pipeline on top of it) load on first upload, not at startup
+    import pandas as pd
+    from .ingest import SYSTEM_FIELDS, ingest_csv
+
     file_path = request.session.get('uploaded_file_path')
     if not file_path or not os.path.exists(file_path):
         messages.error(request, "No file uploaded.")
@@ -41,38 +42,22 @@ def map_columns_view(request):
         messages.error(request, f"Error reading CSV: {e}")
         return redirect('sales_upload')
 
-    system_fields = ['transaction_date', 'order_id', 'item_category', 'total_price', 'location_id', 'quantity_sold']
+    system_fields = SYSTEM_FIELDS
 
     if request.method == 'POST':
         mapping = {}
         for field in system_fields:
             mapping[field] = request.POST.get(f'map_{field}')
         
-        # Process full file
+        # Stream the full file into SalesData in chunks
         try:
-            full_df = pd.read_csv(file_path)
-            # Rename columns
-            rename_map = {v: k for k, v in mapping.items() if v}
-            full_df.rename(columns=rename_map, inplace=True)
-            
-            # Filter only mapped columns that exist in DF
-            valid_cols = [c for c in system_fields if c in full_df.columns]
-            full_df = full_df[valid_cols]
-            
-            # Bulk create
-            sales_objects = []
-            for _, row in full_df.iterrows():
-                sales_objects.append(SalesData(
-                    transaction_date=pd.to_datetime(row.get('transaction_date')),
-                    order_id=row.get('order_id', str(uuid.uuid4())[:8]),
-                    item_category=row.get('item_category', 'Unknown'),
-                    total_price=row.get('total_price', 0.0),
-                    location_id=row.get('location_id', 'Default'),
-                    quantity_sold=row.get('quantity_sold', 0)
-                ))
-                
-            SalesData.objects.bulk_create(sales_objects)
-            messages.success(request, f"Successfully imported {len(sales_objects)} records.")
+            stats = ingest_csv(file_path, mapping)
+            messages.success(
+                request,
+                f"Successfully imported {stats['rows']} records "
+                f"({stats['rows_per_sec']:,.0f} rows/sec, peak memory {stats['peak_memory_mb']:.1f} MB)."
+                + (f" Skipped {stats['skipped']} rows with invalid dates." if stats['skipped'] else "")
+            )
             return redirect('dashboard')
             
         except Exception as e: